@@ -1,5 +1,5 @@
 import logging
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Callable, Any
 
 from deprecated.classic import deprecated
 
@@ -7,12 +7,17 @@ from AiOrchestration.AiModel import AiModel
 from AiOrchestration.ChatGptModel import ChatGptModel
 from AiOrchestration.GeminiModel import GeminiModel
 from AiOrchestration.ChatGptMessageBuilder import generate_messages
+from AiOrchestration.ResponseCache import ResponseCache
+from AiOrchestration.SemanticCache import SemanticCache
+from Constants.Constants import ERROR_RESPONSES
 from Constants.Exceptions import AI_RESOURCE_FAILURE, FUNCTION_SCHEMA_EMPTY, NO_RESPONSE_OPEN_AI_API
 from Data.Configuration import Configuration
-from Utilities.Contexts import set_functionality_context
+from Utilities.Contexts import set_functionality_context, get_functionality_context
 from Utilities.Decorators.Decorators import handle_errors, specify_functionality_context
-from Utilities.Utility import Utility
-from Utilities.models import determine_llm_client, find_model_enum_value
+from Utilities.Retry import RetryEngine
+from Utilities.Tracing import traced, annotate
+from Utilities.models import determine_llm_client, find_model_enum_value, determine_provider, \
+    find_fallback_model
 
 
 class AiOrchestrator:
@@ -51,6 +56,7 @@ class AiOrchestrator:
         )
         return find_model_enum_value(default_model_str)
 
+    @traced("llm.execute")
     @handle_errors(raise_errors=True)
     def execute(
         self,
@@ -61,7 +67,8 @@ class AiOrchestrator:
         judgement_criteria: list[str] | None = None,
         model: AiModel | None = None,
         assistant_messages: list[str] | None = None,
-        streaming: bool = False
+        streaming: bool = False,
+        cache: bool = False
     ) -> str:
         """
         Generates an LLM response based on the given prompts while supporting both parallel best-of and iterative loops.
@@ -78,14 +85,39 @@ class AiOrchestrator:
         :param model: Preferred AI model; falls back to default if not provided.
         :param assistant_messages: History of prior assistant responses.
         :param streaming: Flag for streaming vs. standard singular response.
+        :param cache: Reuse the response of an identical earlier call, skipping the provider and its cost. Only applies
+         to single, non-streamed calls.
         :return: Generated LLM response.
         :raises Exception: If no response is received from the AI API.
         """
         if not model:
             model = self._load_default_model()
         self.llm_client = determine_llm_client(model.value)
+        annotate(
+            model=model.value,
+            functionality=get_functionality_context() or "",
+            best_of=rerun_count,
+            loops=loop_count,
+        )
         assistant_messages = assistant_messages or []
 
+        cache_key = None
+        functionality = get_functionality_context()
+        if cache and rerun_count == 1 and loop_count == 1 and not streaming:
+            cache_key = ResponseCache.key(model, system_prompts, user_prompts, assistant_messages, functionality)
+            cached_response = ResponseCache().get(cache_key, functionality)
+            annotate(cache="hit" if cached_response is not None else "miss")
+            if cached_response is not None:
+                logging.info(f"Using cached response for {functionality or 'background'} call")
+                return cached_response
+
+            if not assistant_messages:
+                similar_response = SemanticCache().get(model, system_prompts, user_prompts, functionality)
+                if similar_response is not None:
+                    annotate(cache="similar")
+                    logging.info(f"Using response to a similar prompt for {functionality} call")
+                    return similar_response
+
         loop_responses = []
         previous_answer = None
 
@@ -118,6 +150,13 @@ class AiOrchestrator:
                 logging.error(f"No response from AI API during iteration {iteration} using client {self.llm_client}")
                 raise Exception(AI_RESOURCE_FAILURE)
 
+            if isinstance(iteration_response, str) and iteration_response in ERROR_RESPONSES:
+                # Error sentinels are returned to the caller as before but never refined or cached
+                logging.warning(f"Iteration {iteration} returned an error response, skipping remaining iterations")
+                if loop_count > 1:
+                    set_functionality_context(None)
+                return iteration_response
+
             logging.info(f"Iteration {iteration} completed with response")
             loop_responses.append(iteration_response)
             previous_answer = iteration_response
@@ -126,6 +165,10 @@ class AiOrchestrator:
             set_functionality_context(None)
 
         logging.info(f"Final consolidated response:\n{previous_answer}")
+        if cache_key:
+            ResponseCache().put(cache_key, previous_answer)
+            if not assistant_messages:
+                SemanticCache().put(model, system_prompts, user_prompts, functionality, previous_answer)
         return previous_answer
 
     def _handle_rerun(
@@ -149,11 +192,11 @@ class AiOrchestrator:
         """
         logging.info("EXECUTING PROMPT")
         if rerun_count == 1:
-            response_call = (
-                lambda: self.llm_client.get_ai_streaming_response(messages, model)
-                if streaming else self.llm_client.get_ai_response(messages, model)
+            return self._call_provider(
+                lambda client, call_model: client.get_ai_streaming_response(messages, call_model)
+                if streaming else client.get_ai_response(messages, call_model),
+                model
             )
-            return Utility.execute_with_retries(response_call)
 
         logging.info("Parallel reruns enabled: executing multiple API calls.")
         return self._handle_multiple_reruns(messages, model, rerun_count, judgement_criteria, streaming)
@@ -178,8 +221,9 @@ class AiOrchestrator:
         :param streaming: Whether the final call should be streamed.
         :return: The aggregated AI response.
         """
-        responses = Utility.execute_with_retries(
-            lambda: self.llm_client.get_ai_response(messages, model, rerun_count=rerun_count)
+        responses = self._call_provider(
+            lambda client, call_model: client.get_ai_response(messages, call_model, rerun_count=rerun_count),
+            model
         )
         logging.info(f"Re-run responses ({rerun_count}) : \n{responses}")
 
@@ -187,11 +231,34 @@ class AiOrchestrator:
         # ToDo: messages is added to specifically handle the case where the user refers to a prior message/file
         #  There may be some filtering that can be performed, for better performance.
         combined_messages = generate_messages("", judgement_criteria, responses, model) + messages
-        response_call = (
-            lambda: self.llm_client.get_ai_streaming_response(combined_messages, model)
-            if streaming else self.llm_client.get_ai_response(combined_messages, model)
+        return self._call_provider(
+            lambda client, call_model: client.get_ai_streaming_response(combined_messages, call_model)
+            if streaming else client.get_ai_response(combined_messages, call_model),
+            model
+        )
+
+    def _call_provider(self, call: Callable[[Any, AiModel], Any], model: AiModel) -> Any:
+        """
+        Makes a provider call through the RetryEngine. If optimisation.provider_fallback is enabled, calls the other
+        provider's equivalent model when the model's provider is unavailable.
+
+        :param call: Makes the call given the llm client and model to use
+        :param model: The selected AI model
+        :return: The AI response
+        """
+        fallback = None
+        fallback_model = None
+        if Configuration.load_config().get('optimisation', {}).get('provider_fallback', False):
+            fallback_model = find_fallback_model(model)
+        if fallback_model:
+            fallback = lambda: call(determine_llm_client(fallback_model.value), fallback_model)
+
+        return RetryEngine().execute(
+            lambda: call(self.llm_client, model),
+            determine_provider(model),
+            fallback=fallback,
+            fallback_provider=determine_provider(fallback_model) if fallback_model else None
         )
-        return Utility.execute_with_retries(response_call)
 
     @deprecated
     @handle_errors(raise_errors=True)
@@ -219,8 +286,9 @@ class AiOrchestrator:
             raise ValueError(FUNCTION_SCHEMA_EMPTY)
 
         messages = generate_messages(system_prompts, user_prompts, model=model)
-        response = Utility.execute_with_retries(
-            lambda: self.llm_client.get_ai_function_response(messages, function_schema, model)
+        response = RetryEngine().execute(
+            lambda: self.llm_client.get_ai_function_response(messages, function_schema, model),
+            determine_provider(model)
         )
         if response is None:
             logging.error("Failed to receive a valid response from the AI API.")
@@ -1,5 +1,8 @@
 import abc
+import functools
+import inspect
 import logging
+import threading
 from typing import List, Dict, Generator
 
 from deprecated.classic import deprecated
@@ -8,10 +11,57 @@ from AiOrchestration.AiModel import AiModel
 from AiOrchestration.ChatGptModel import ChatGptModel
 from AiOrchestration.GeminiModel import GeminiModel
 from Constants import Globals
+from Data.CostLedger import CostLedger
 from Data.Neo4j.NodeDatabaseManagement import NodeDatabaseManagement as NodeDB
 from Utilities.Contexts import get_message_context, get_functionality_context
 from Utilities.Utility import Utility
 
+# The CostLedger reservations of each provider call in progress on this thread, innermost call last
+_calls = threading.local()
+
+
+def releases_reservation():
+    """
+    Releases the cost estimates a provider call reserves in the request's CostLedger once the call ends, whether it was
+    charged or raised, so a failed call, e.g. an attempt the RetryEngine goes on to retry, doesn't keep its reservation
+    for the rest of the request.
+
+    Generators, i.e. streamed responses, release once they are exhausted or closed rather than when they are created.
+    """
+    def decorator(method):
+        def open_call() -> List[int]:
+            if not hasattr(_calls, "stack"):
+                _calls.stack = []
+            reservations = []
+            _calls.stack.append(reservations)
+            return reservations
+
+        def close_call(reservations: List[int]) -> None:
+            # By identity, calls that haven't reserved anything have equal lists
+            del _calls.stack[next(index for index, frame in enumerate(_calls.stack) if frame is reservations)]
+            for reservation in reservations:
+                CostLedger().release(reservation)
+
+        if inspect.isgeneratorfunction(method):
+            @functools.wraps(method)
+            def generator_wrapper(*args, **kwargs):
+                reservations = open_call()
+                try:
+                    return (yield from method(*args, **kwargs))
+                finally:
+                    close_call(reservations)
+            return generator_wrapper
+
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            reservations = open_call()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                close_call(reservations)
+        return wrapper
+    return decorator
+
 
 class AiWrapper(abc.ABC):
     """
@@ -21,6 +71,9 @@ class AiWrapper(abc.ABC):
       - get_ai_streaming_response: Get streaming responses as a generator.
       - get_ai_function_response: Get a structured (function) response.
       - calculate_prompt_cost: Calculate cost based on tokens and perform accounting.
+
+    Each of the get_ai_* methods is decorated with releases_reservation, which releases what can_afford_request
+    reserves once the call ends.
     """
 
     @abc.abstractmethod
@@ -56,6 +109,13 @@ class AiWrapper(abc.ABC):
     @staticmethod
     def can_afford_request(model: AiModel, messages: List[Dict[str, str]], rerun_count: int = 1) -> bool:
         cost_estimate = AiWrapper._cost_guesstimate(model, messages, rerun_count)
+
+        reservation = CostLedger().reserve(cost_estimate)
+        if reservation is not None:
+            if reservation and getattr(_calls, "stack", None):
+                _calls.stack[-1].append(reservation)
+            return bool(reservation)
+
         user_balance = NodeDB().get_user_balance()
 
         # 3 cents is the point where a possible overdraft is basically negligible
@@ -116,6 +176,21 @@ class AiWrapper(abc.ABC):
 
         Globals.current_request_cost += total_cost
 
+        functionality = get_functionality_context()
+        if CostLedger().record(total_cost, model, functionality):
+            logging.info(f"Ledgered ${total_cost} against [{get_message_context()}] {functionality or ''}")
+        else:
+            AiWrapper._expense_immediately(total_cost, model, functionality)
+
+        logging.info(
+            f"Request cost [{model}] - Input tokens: {input_tokens}, ${input_cost}, "
+            f"Output tokens: {output_tokens}, ${output_cost} \n"
+            f"Total cost: ${total_cost:.4f}"
+        )
+
+    @staticmethod
+    def _expense_immediately(total_cost: float, model: AiModel, functionality: str | None):
+        """Writes each charge of an LLM call straight to the database, for calls made outside a CostLedger"""
         NodeDB().deduct_from_user_balance(total_cost)
         if type(model) == GeminiModel:
             NodeDB().deduct_from_system_gemini_balance(total_cost)
@@ -127,13 +202,6 @@ class AiWrapper(abc.ABC):
             logging.info(f"Expensing ${total_cost} to USER_PROMPT Node[{message_id}]")
             NodeDB().expense_node(message_id, total_cost)
 
-        functionality = get_functionality_context()
         if functionality:
             logging.info(f"Expensing ${total_cost} against {functionality} functionality.")
             NodeDB().expense_functionality(functionality, total_cost)
-
-        logging.info(
-            f"Request cost [{model}] - Input tokens: {input_tokens}, ${input_cost}, "
-            f"Output tokens: {output_tokens}, ${output_cost} \n"
-            f"Total cost: ${total_cost:.4f}"
-        )
@@ -7,9 +7,9 @@ from deprecated.classic import deprecated
 from flask_socketio import emit
 from openai import OpenAI, BadRequestError
 
-from AiOrchestration.AiWrapper import AiWrapper
+from AiOrchestration.AiWrapper import AiWrapper, releases_reservation
 from AiOrchestration.ChatGptModel import ChatGptModel
-from Constants.Constants import CANNOT_AFFORD_REQUEST
+from Constants.Constants import CANNOT_AFFORD_REQUEST, OPEN_AI_FLAGGED_REQUEST
 from Constants.Exceptions import OPEN_AI_FLAGGED_REQUEST_INAPPROPRIATE, \
     SERVER_FAILURE_OPEN_AI_API, FAILURE_TO_STREAM, NO_USAGE_DATA_OPEN_AI
 from Utilities.Decorators.Decorators import handle_errors
@@ -69,6 +69,7 @@ class ChatGptWrapper(AiWrapper):
 
         self.calculate_prompt_cost(input_tokens, output_tokens, model)
 
+    @releases_reservation()
     def get_ai_response(
             self,
             messages: List[Dict[str, str]],
@@ -84,6 +85,8 @@ class ChatGptWrapper(AiWrapper):
         if not self.can_afford_request(model, messages, rerun_count):
             return CANNOT_AFFORD_REQUEST
 
+        # Only set once the API responds, a failed call (e.g. a 429) is raised as is for the RetryEngine to classify
+        chat_completion = None
         try:
             chat_completion = self.open_ai_client.chat.completions.create(
                 model=model.value, messages=messages, n=rerun_count
@@ -97,14 +100,16 @@ class ChatGptWrapper(AiWrapper):
             return responses[0] if rerun_count == 1 else responses or None
         except BadRequestError:
             logging.exception(OPEN_AI_FLAGGED_REQUEST_INAPPROPRIATE)
-            return "OpenAi ChatGpt Server Flagged Your Request as Inappropriate. Try again, it does this alot."
+            return OPEN_AI_FLAGGED_REQUEST
         except Exception as e:
             logging.exception(SERVER_FAILURE_OPEN_AI_API)
             raise e
         finally:
-            self._calculate_cost(messages, ''.join(responses), model, input_tokens, output_tokens)
+            if chat_completion is not None:
+                self._calculate_cost(messages, ''.join(responses), model, input_tokens, output_tokens)
 
     @handle_errors(debug_logging=True, raise_errors=True)
+    @releases_reservation()
     def get_ai_streaming_response(
             self,
             messages: List[Dict[str, str]],
@@ -159,6 +164,7 @@ class ChatGptWrapper(AiWrapper):
 
     @deprecated
     @handle_errors(debug_logging=True, raise_errors=True)
+    @releases_reservation()
     def get_ai_function_response(self,
                                  messages: List[Dict[str, str]],
                                  function_schema,
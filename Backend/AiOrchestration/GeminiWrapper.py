@@ -10,7 +10,7 @@ from google import genai
 from flask_socketio import emit
 from google.genai.types import GenerateContentResponse, GenerateContentConfig
 
-from AiOrchestration.AiWrapper import AiWrapper
+from AiOrchestration.AiWrapper import AiWrapper, releases_reservation
 from AiOrchestration.ChatGptMessageBuilder import format_message
 from AiOrchestration.GeminiModel import GeminiModel
 from Constants.Constants import GEMINI_API_KEY, CANNOT_AFFORD_REQUEST
@@ -114,6 +114,7 @@ class GeminiWrapper(AiWrapper):
         self.calculate_prompt_cost(input_tokens, output_tokens, model)
 
     @evaluate_gemini_balance()
+    @releases_reservation()
     def get_ai_response(
         self,
         messages: List[Dict[str, str]],
@@ -136,6 +137,8 @@ class GeminiWrapper(AiWrapper):
         prompt = '\n\n'.join([message.get('content') for message in user_messages]).strip()
         system_instructions = '\n\n'.join([message.get('content') for message in system_messages]).strip()
 
+        # Only set once the API responds, a failed call (e.g. a 429) is raised as is for the RetryEngine to classify
+        response = None
         try:
             response: GenerateContentResponse = self.gemini_client.models.generate_content(
                 model=model.value,
@@ -161,16 +164,18 @@ class GeminiWrapper(AiWrapper):
             logging.exception(SERVER_FAILURE_GEMINI_API)
             raise e
         finally:
-            self._calculate_cost(
-                prompt + (system_instructions if system_instructions else ""),
-                output,
-                model,
-                input_tokens,
-                output_tokens,
-            )
+            if response is not None:
+                self._calculate_cost(
+                    prompt + (system_instructions if system_instructions else ""),
+                    output,
+                    model,
+                    input_tokens,
+                    output_tokens,
+                )
 
     @evaluate_gemini_balance()
     @handle_errors(debug_logging=True, raise_errors=True)
+    @releases_reservation()
     def get_ai_streaming_response(
         self,
         messages: List[Dict[str, str]],
@@ -236,6 +241,7 @@ class GeminiWrapper(AiWrapper):
     @deprecated
     @handle_errors(debug_logging=True, raise_errors=True)
     @evaluate_gemini_balance()
+    @releases_reservation()
     def get_ai_function_response(
         self,
         messages: List[Dict[str, str]],
@@ -0,0 +1,17 @@
+from AiOrchestration.AiModel import AiModel
+
+
+class LocalModel(AiModel):
+    """Offline, deterministic models served by the LocalWrapper, for benchmarking and load testing"""
+    LOCAL_FAST = ("local-fast", 0.0000001, 0.0000004)
+    LOCAL_SLOW = ("local-slow", 0.0000001, 0.0000004)
+    LOCAL_ECHO = ("local-echo", 0.0, 0.0)
+
+    @property
+    def value(self) -> str:
+        """Return the underlying model identifier required by the API."""
+        return self._model_str
+
+    @classmethod
+    def get_default(cls) -> 'LocalModel':
+        return cls.LOCAL_FAST
@@ -0,0 +1,229 @@
+import json
+import logging
+import os
+import random
+import threading
+import time
+from typing import List, Dict, Optional
+
+import yaml
+
+from AiOrchestration.AiWrapper import AiWrapper, releases_reservation
+from AiOrchestration.LocalModel import LocalModel
+from Constants.Constants import CANNOT_AFFORD_REQUEST, DEFAULT_ENCODING, LOCAL_LLM_TIME_TO_FIRST_TOKEN, \
+    LOCAL_LLM_TOKENS_PER_SECOND, LOCAL_LLM_OUTPUT_TOKENS, LOCAL_LLM_FAILURE_RATE, LOCAL_LLM_SEED, \
+    LOCAL_LLM_RESPONSE_TEMPLATE, LOCAL_LLM_CANNED_RESPONSES
+from Constants.Exceptions import SIMULATED_FAILURE_LOCAL_LLM
+
+
+DEFAULT_RESPONSE_TEMPLATE = "[{model}] candidate {candidate} responding to: {prompt}"
+FILLER_WORDS = ["lorem", "ipsum", "dolor", "sit", "amet", "consectetur", "adipiscing", "elit"]
+
+# Latency profiles: seconds before the first token, tokens streamed per second and response length in tokens
+DEFAULT_PROFILES = {
+    LocalModel.LOCAL_FAST: {"time_to_first_token": 0.05, "tokens_per_second": 500.0, "output_tokens": 200},
+    LocalModel.LOCAL_SLOW: {"time_to_first_token": 1.5, "tokens_per_second": 40.0, "output_tokens": 600},
+    LocalModel.LOCAL_ECHO: {"time_to_first_token": 0.0, "tokens_per_second": 0.0, "output_tokens": 0},
+}
+
+
+class LocalLlmError(Exception):
+    """A simulated provider failure, carrying the HTTP status code a real provider would have returned."""
+
+    def __init__(self, message: str, status_code: int = 503):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class LocalWrapper(AiWrapper):
+    """
+    Offline stand-in for the OpenAI and Gemini wrappers, serving canned or templated responses with a configurable
+    time-to-first-token, tokens/sec and failure rate. Nothing leaves the machine, so the orchestration overhead of a
+    request can be measured without the variance of a live provider.
+
+    The profile is read from the environment (LOCAL_LLM_*) when the wrapper is first created, `configure` replaces it
+    at runtime. Responses are deterministic for a given seed and prompt.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        """Create a new instance or return the existing one."""
+        if cls._instance is None:
+            cls._instance = super(LocalWrapper, cls).__new__(cls)
+            cls._instance._lock = threading.Lock()
+            cls._instance.configure()
+        return cls._instance
+
+    def configure(
+        self,
+        time_to_first_token: Optional[float] = None,
+        tokens_per_second: Optional[float] = None,
+        output_tokens: Optional[int] = None,
+        failure_rate: Optional[float] = None,
+        seed: Optional[int] = None,
+        response_template: Optional[str] = None,
+        canned_responses: Optional[Dict[str, str]] = None
+    ) -> None:
+        """
+        (Re)configures the simulated provider, unspecified values fall back to the environment and then the model
+        defaults.
+
+        :param time_to_first_token: Seconds to wait before any content is returned.
+        :param tokens_per_second: Streaming speed after the first token, 0 for no delay.
+        :param output_tokens: Length of templated responses in whitespace separated tokens.
+        :param failure_rate: Probability between 0 and 1 of a call failing with a simulated provider error.
+        :param seed: Seed for the failure simulation, so runs are repeatable.
+        :param response_template: Format string with {model}, {candidate} and {prompt} placeholders.
+        :param canned_responses: Mapping of prompt substrings to fixed responses, checked before the template.
+        """
+        self.overrides = {
+            "time_to_first_token": self._from_env(time_to_first_token, LOCAL_LLM_TIME_TO_FIRST_TOKEN, float),
+            "tokens_per_second": self._from_env(tokens_per_second, LOCAL_LLM_TOKENS_PER_SECOND, float),
+            "output_tokens": self._from_env(output_tokens, LOCAL_LLM_OUTPUT_TOKENS, int),
+        }
+        self.failure_rate = self._from_env(failure_rate, LOCAL_LLM_FAILURE_RATE, float) or 0.0
+        self.response_template = response_template or os.getenv(LOCAL_LLM_RESPONSE_TEMPLATE, DEFAULT_RESPONSE_TEMPLATE)
+        self.canned_responses = canned_responses if canned_responses is not None \
+            else self._load_canned_responses(os.getenv(LOCAL_LLM_CANNED_RESPONSES))
+
+        self.random = random.Random(self._from_env(seed, LOCAL_LLM_SEED, int) or 0)
+        self.call_count = 0
+
+    @staticmethod
+    def _from_env(value, env_name: str, cast):
+        if value is not None:
+            return value
+
+        env_value = os.getenv(env_name)
+        return cast(env_value) if env_value is not None else None
+
+    @staticmethod
+    def _load_canned_responses(path: Optional[str]) -> Dict[str, str]:
+        """Loads a JSON or YAML mapping of prompt substring -> response."""
+        if not path:
+            return {}
+
+        try:
+            with open(path, 'r', encoding=DEFAULT_ENCODING) as file:
+                if path.endswith(".json"):
+                    return json.load(file) or {}
+                return yaml.safe_load(file) or {}
+        except Exception:
+            logging.exception(f"Failed to load local LLM canned responses from {path}")
+            return {}
+
+    def profile(self, model: LocalModel) -> Dict[str, float]:
+        """The effective latency profile for the model, environment/runtime overrides taking precedence."""
+        profile = dict(DEFAULT_PROFILES.get(model, DEFAULT_PROFILES[LocalModel.get_default()]))
+        profile.update({key: value for key, value in self.overrides.items() if value is not None})
+        return profile
+
+    @staticmethod
+    def count_tokens(text: str) -> int:
+        """Rough offline token count, ~4 characters per token in line with OpenAI's rule of thumb."""
+        return max(1, len(text) // 4) if text else 0
+
+    def _simulate_failure(self) -> None:
+        with self._lock:
+            self.call_count += 1
+            failed = self.failure_rate > 0 and self.random.random() < self.failure_rate
+
+        if failed:
+            logging.warning(f"{SIMULATED_FAILURE_LOCAL_LLM} (call {self.call_count})")
+            raise LocalLlmError(SIMULATED_FAILURE_LOCAL_LLM)
+
+    def _compose_response(self, messages: List[Dict[str, str]], model: LocalModel, candidate: int) -> str:
+        """Builds the canned, echoed or templated response for the given messages."""
+        user_content = [message['content'] for message in messages if message['role'] == "user"]
+        prompt = user_content[-1] if user_content else ""
+
+        for trigger, response in self.canned_responses.items():
+            if trigger in "\n".join(user_content):
+                return response
+
+        if model == LocalModel.LOCAL_ECHO:
+            return prompt
+
+        response = self.response_template.format(model=model.value, candidate=candidate, prompt=prompt[:200])
+        filler_count = max(0, int(self.profile(model)["output_tokens"]) - len(response.split()))
+        filler = " ".join(FILLER_WORDS[i % len(FILLER_WORDS)] for i in range(filler_count))
+        return f"{response} {filler}".strip()
+
+    def _wait(self, profile: Dict[str, float], tokens: int) -> None:
+        delay = profile["time_to_first_token"]
+        if profile["tokens_per_second"] > 0:
+            delay += tokens / profile["tokens_per_second"]
+        if delay > 0:
+            time.sleep(delay)
+
+    def _calculate_cost(self, messages: List[Dict[str, str]], outputs: List[str], model: LocalModel):
+        """Usage metadata is always 'returned' by the local provider, so it is simply counted."""
+        input_tokens = sum(self.count_tokens(message['content']) for message in messages)
+        output_tokens = sum(self.count_tokens(output) for output in outputs)
+        self.calculate_prompt_cost(input_tokens, output_tokens, model)
+
+    @releases_reservation()
+    def get_ai_response(
+            self,
+            messages: List[Dict[str, str]],
+            model: LocalModel = LocalModel.LOCAL_FAST,
+            rerun_count: int = 1) -> str | List[str]:
+        """Request a full response from the local provider.
+
+        :param messages: The system and user messages to 'send'
+        :param model: the local model profile to emulate
+        :param rerun_count: number of candidates to return
+        :return: The response, or a list of candidate responses if rerun_count > 1
+        """
+        if not self.can_afford_request(model, messages, rerun_count):
+            return CANNOT_AFFORD_REQUEST
+
+        self._simulate_failure()
+
+        responses = [self._compose_response(messages, model, candidate) for candidate in range(1, rerun_count + 1)]
+        # Candidates are generated in parallel by real providers, so only the longest one adds latency
+        self._wait(self.profile(model), max(len(response.split()) for response in responses))
+        self._calculate_cost(messages, responses, model)
+
+        return responses[0] if rerun_count == 1 else responses
+
+    @releases_reservation()
+    def get_ai_streaming_response(
+            self,
+            messages: List[Dict[str, str]],
+            model: LocalModel = LocalModel.LOCAL_FAST) -> str:
+        """Request a streaming response from the local provider, yielding one token at a time.
+
+        :param messages: The system and user messages to 'send'
+        :param model: the local model profile to emulate
+        :return: The full response once streaming has finished
+        """
+        if not self.can_afford_request(model, messages):
+            return CANNOT_AFFORD_REQUEST
+
+        self._simulate_failure()
+
+        profile = self.profile(model)
+        response = self._compose_response(messages, model, 1)
+        if profile["time_to_first_token"] > 0:
+            time.sleep(profile["time_to_first_token"])
+
+        token_delay = 1 / profile["tokens_per_second"] if profile["tokens_per_second"] > 0 else 0
+        tokens = response.split(" ")
+        for index, token in enumerate(tokens):
+            if index and token_delay:
+                time.sleep(token_delay)
+            yield {'content': token if index == len(tokens) - 1 else token + " "}
+
+        self._calculate_cost(messages, [response], model)
+        return response
+
+    def get_ai_function_response(
+            self,
+            messages: List[Dict[str, str]],
+            function_schema,
+            model: LocalModel = LocalModel.LOCAL_FAST) -> Dict[str, object]:
+        """Function calls are deprecated, the local provider always returns an empty result."""
+        return {}
+
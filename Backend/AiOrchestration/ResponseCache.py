@@ -0,0 +1,144 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from AiOrchestration.AiModel import AiModel
+from Constants.Constants import RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL, DEFAULT_RESPONSE_CACHE_SIZE, \
+    DEFAULT_RESPONSE_CACHE_TTL, RESPONSE_CACHE_KEY_PREFIX, DEFAULT_ENCODING
+from Constants.Exceptions import response_cache_redis_failure
+
+WHITESPACE = re.compile(r"\s+")
+
+# Counters are grouped under this name for calls made without a functionality context
+NO_FUNCTIONALITY = "default"
+
+
+class ResponseCache:
+    """
+    Exact-match cache of LLM responses for background calls, e.g. selecting a worker or categorising a prompt, whose
+    inputs repeat often and whose answers don't need to be regenerated.
+
+    Responses are keyed on a hash of the model, prompts and functionality context, with whitespace normalised. Entries
+    are held in an in-process LRU (RESPONSE_CACHE_SIZE entries) and, if the app has a Redis connection
+    (REDISCLOUD_URL), in Redis so they're shared between processes. Both expire after RESPONSE_CACHE_TTL seconds.
+
+    Hits and misses are counted per functionality.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        """Create a new instance or return the existing one."""
+        if cls._instance is None:
+            cls._instance = super(ResponseCache, cls).__new__(cls)
+            cls._instance._lock = threading.Lock()
+            cls._instance.entries: OrderedDict[str, Tuple[float, str]] = OrderedDict()
+            cls._instance.max_entries = int(os.getenv(RESPONSE_CACHE_SIZE, DEFAULT_RESPONSE_CACHE_SIZE))
+            cls._instance.ttl = int(os.getenv(RESPONSE_CACHE_TTL, DEFAULT_RESPONSE_CACHE_TTL))
+            cls._instance.counters: Dict[str, Dict[str, int]] = {}
+        return cls._instance
+
+    @staticmethod
+    def _normalise(prompts: List[str] | str | None) -> List[str]:
+        if prompts is None:
+            return []
+        if isinstance(prompts, str):
+            prompts = [prompts]
+        return [WHITESPACE.sub(" ", str(prompt)).strip() for prompt in prompts]
+
+    @staticmethod
+    def key(
+        model: AiModel,
+        system_prompts: List[str] | str,
+        user_prompts: List[str] | str,
+        assistant_messages: List[str] | None,
+        functionality: Optional[str]
+    ) -> str:
+        """A hash of everything that determines the response"""
+        content = json.dumps([
+            model.value,
+            ResponseCache._normalise(system_prompts),
+            ResponseCache._normalise(user_prompts),
+            ResponseCache._normalise(assistant_messages),
+            functionality,
+        ])
+        return hashlib.sha256(content.encode(DEFAULT_ENCODING)).hexdigest()
+
+    @staticmethod
+    def _redis():
+        """The app's Redis connection, imported lazily as App.extensions pulls in the rest of the app"""
+        try:
+            from App.extensions import r
+            return r
+        except ImportError:
+            return None
+
+    def _count(self, functionality: Optional[str], outcome: str) -> None:
+        with self._lock:
+            counter = self.counters.setdefault(functionality or NO_FUNCTIONALITY, {"hits": 0, "misses": 0})
+            counter[outcome] += 1
+
+    def get(self, key: str, functionality: Optional[str] = None) -> Optional[str]:
+        """Returns the cached response for the key, if there is one that hasn't expired"""
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                self.entries.move_to_end(key)
+                response = entry[1]
+            else:
+                if entry:
+                    del self.entries[key]
+                response = None
+
+        if response is None:
+            redis_connection = self._redis()
+            if redis_connection is not None:
+                try:
+                    cached = redis_connection.get(RESPONSE_CACHE_KEY_PREFIX + key)
+                    if cached is not None:
+                        response = cached.decode(DEFAULT_ENCODING)
+                        self._store_locally(key, response)
+                except Exception as e:
+                    logging.warning(response_cache_redis_failure(e))
+
+        self._count(functionality, "hits" if response is not None else "misses")
+        return response
+
+    def _store_locally(self, key: str, response: str) -> None:
+        with self._lock:
+            self.entries[key] = (time.monotonic() + self.ttl, response)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def put(self, key: str, response: str) -> None:
+        self._store_locally(key, response)
+
+        redis_connection = self._redis()
+        if redis_connection is not None:
+            try:
+                redis_connection.set(RESPONSE_CACHE_KEY_PREFIX + key, response, ex=self.ttl)
+            except Exception as e:
+                logging.warning(response_cache_redis_failure(e))
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Hits, misses and hit rate for each functionality"""
+        with self._lock:
+            return {
+                functionality: {
+                    **counter,
+                    "hit_rate": counter["hits"] / max(1, counter["hits"] + counter["misses"])
+                }
+                for functionality, counter in self.counters.items()
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self.entries.clear()
+            self.counters.clear()
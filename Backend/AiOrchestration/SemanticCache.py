@@ -0,0 +1,203 @@
+import hashlib
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from AiOrchestration.AiModel import AiModel
+from Constants.Constants import SEMANTIC_CACHE_DIMENSIONS, SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_ENTRIES_PER_USER, \
+    SEMANTIC_CACHE_MAX_USERS, SEMANTIC_CACHE_FUNCTIONALITIES, DEFAULT_ENCODING
+from Data.Configuration import Configuration
+from Utilities.Contexts import get_user_context
+
+WORD = re.compile(r"\w+")
+
+# Routing-level prompts mostly differ by which greeting or pleasantries they use, so those are treated as one word or
+# dropped before embedding, e.g. "hey" and "hi there" both become "hello". Hashed n-grams can't otherwise match them.
+GREETINGS = frozenset("hi hey hello hiya heya howdy hallo yo sup greetings".split())
+FILLER = frozenset("there please pls plz thanks thank thx just kindly".split())
+REWRITES = [
+    (re.compile(r"\b(are you able to|could you|would you|can u|could u)\b"), "can you"),
+    # American spellings, summarize -> summarise
+    (re.compile(r"\b(\w{3,}?)iz(e|es|ed|ing|ation|ations)\b"), r"\1is\2"),
+]
+
+
+def canonicalise(text: str) -> str:
+    """The prompt lowercased, with its greetings, pleasantries and some common rewordings normalised"""
+    text = text.lower()
+    for pattern, replacement in REWRITES:
+        text = pattern.sub(replacement, text)
+    return " ".join("hello" if word in GREETINGS else word for word in WORD.findall(text) if word not in FILLER)
+
+
+def embed(text: str, dimensions: int = SEMANTIC_CACHE_DIMENSIONS) -> np.ndarray:
+    """
+    A unit vector of hashed word unigrams/bigrams and character trigrams, cheap enough to compute on every call and
+    robust to punctuation, casing and small rewordings.
+    """
+    vector = np.zeros(dimensions, dtype=np.float32)
+    words = WORD.findall(text.lower())
+
+    features = words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+    for word in words:
+        padded = f" {word} "
+        features.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+
+    for feature in features:
+        # crc32 rather than hash(), which is salted per process
+        hashed = zlib.crc32(feature.encode(DEFAULT_ENCODING))
+        vector[hashed % dimensions] += 1.0 if hashed & 0x80000000 else -1.0
+
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class _Bucket:
+    """The cached prompts of one user for one kind of call, stored as rows of a preallocated matrix"""
+
+    def __init__(self, capacity: int, dimensions: int):
+        self.vectors = np.zeros((capacity, dimensions), dtype=np.float32)
+        self.last_used = np.zeros(capacity, dtype=np.float64)
+        self.responses: List[Optional[str]] = [None] * capacity
+        self.size = 0
+
+    def lookup(self, vector: np.ndarray) -> Tuple[int, float]:
+        if not self.size:
+            return -1, 0.0
+        scores = self.vectors[:self.size] @ vector
+        index = int(np.argmax(scores))
+        return index, float(scores[index])
+
+    def insert(self, vector: np.ndarray, response: str) -> None:
+        if self.size < len(self.responses):
+            index = self.size
+            self.size += 1
+        else:
+            # Evict the least recently used prompt
+            index = int(np.argmin(self.last_used))
+
+        self.vectors[index] = vector
+        self.responses[index] = response
+        self.last_used[index] = time.monotonic()
+
+
+class SemanticCache:
+    """
+    Near-duplicate cache for routing-level calls, e.g. selecting a worker for "hi there" after having done so for
+    "hey there", checked after the exact-match ResponseCache misses.
+
+    Only functionalities listed under optimisation.semantic_cache_functionalities (SEMANTIC_CACHE_FUNCTIONALITIES by
+    default) are cached. Prompts are canonicalised (see canonicalise), embedded locally with hashed n-grams and compared
+    by cosine similarity against the user's earlier prompts for the same model, system prompts and functionality, a
+    response is reused when the similarity reaches optimisation.semantic_cache_threshold.
+
+    The match is lexical: greetings, pleasantries, casing, punctuation and a few rewordings are matched, prompts that
+    only mean the same thing ("what can you do" and "what are your features") are not. Prompts that differ by one
+    content word ("email my manager" and "email my team") score up to about 0.8, below the default threshold.
+
+    Each user's prompts are kept apart, at most SEMANTIC_CACHE_ENTRIES_PER_USER per bucket, with the least recently used
+    evicted first. Buckets of the least recently active users are dropped beyond SEMANTIC_CACHE_MAX_USERS.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        """Create a new instance or return the existing one."""
+        if cls._instance is None:
+            cls._instance = super(SemanticCache, cls).__new__(cls)
+            cls._instance._lock = threading.Lock()
+            cls._instance.users: OrderedDict[str, Dict[str, _Bucket]] = OrderedDict()
+            cls._instance.capacity = SEMANTIC_CACHE_ENTRIES_PER_USER
+            cls._instance.max_users = SEMANTIC_CACHE_MAX_USERS
+            cls._instance.dimensions = SEMANTIC_CACHE_DIMENSIONS
+        return cls._instance
+
+    @staticmethod
+    def _settings() -> Tuple[List[str], float]:
+        optimisation = Configuration.load_config().get('optimisation', {})
+        return (
+            optimisation.get('semantic_cache_functionalities', SEMANTIC_CACHE_FUNCTIONALITIES),
+            float(optimisation.get('semantic_cache_threshold', SEMANTIC_CACHE_THRESHOLD))
+        )
+
+    @staticmethod
+    def _bucket_key(model: AiModel, system_prompts: List[str] | str, functionality: str) -> str:
+        """The prompts only match each other if everything but the user prompt is identical"""
+        if isinstance(system_prompts, str):
+            system_prompts = [system_prompts]
+        content = "\n".join([model.value, functionality, *map(str, system_prompts)])
+        return hashlib.sha256(content.encode(DEFAULT_ENCODING)).hexdigest()
+
+    @staticmethod
+    def _text(user_prompts: List[str] | str) -> str:
+        return canonicalise(user_prompts if isinstance(user_prompts, str) else "\n".join(map(str, user_prompts)))
+
+    def _bucket(self, user_id: str, bucket_key: str, create: bool = False) -> Optional[_Bucket]:
+        buckets = self.users.get(user_id)
+        if buckets is None:
+            if not create:
+                return None
+            buckets = self.users[user_id] = {}
+            while len(self.users) > self.max_users:
+                self.users.popitem(last=False)
+        self.users.move_to_end(user_id)
+
+        if bucket_key not in buckets and create:
+            buckets[bucket_key] = _Bucket(self.capacity, self.dimensions)
+        return buckets.get(bucket_key)
+
+    def get(
+        self,
+        model: AiModel,
+        system_prompts: List[str] | str,
+        user_prompts: List[str] | str,
+        functionality: Optional[str]
+    ) -> Optional[str]:
+        """The response to the most similar earlier prompt of the current user, if it's similar enough"""
+        user_id = get_user_context()
+        functionalities, threshold = self._settings()
+        if not user_id or functionality not in functionalities:
+            return None
+
+        vector = embed(self._text(user_prompts), self.dimensions)
+        with self._lock:
+            bucket = self._bucket(user_id, self._bucket_key(model, system_prompts, functionality))
+            if bucket is None:
+                return None
+
+            index, similarity = bucket.lookup(vector)
+            if index < 0 or similarity < threshold:
+                return None
+
+            bucket.last_used[index] = time.monotonic()
+            return bucket.responses[index]
+
+    def put(
+        self,
+        model: AiModel,
+        system_prompts: List[str] | str,
+        user_prompts: List[str] | str,
+        functionality: Optional[str],
+        response: str
+    ) -> None:
+        user_id = get_user_context()
+        if not user_id or functionality not in self._settings()[0]:
+            return
+
+        vector = embed(self._text(user_prompts), self.dimensions)
+        with self._lock:
+            self._bucket(user_id, self._bucket_key(model, system_prompts, functionality), create=True).insert(
+                vector, response
+            )
+
+    def clear(self, user_id: Optional[str] = None) -> None:
+        with self._lock:
+            if user_id:
+                self.users.pop(user_id, None)
+            else:
+                self.users.clear()
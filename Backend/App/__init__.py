@@ -69,6 +69,7 @@ def create_app():
     from .routes.categories_bp import categories_bp
     from .routes.messages_bp import messages_bp
     from .routes.info_bp import info_bp
+    from .routes.search_bp import search_bp
     app.register_blueprint(home_bp)
     app.register_blueprint(authorisation_bp)
     app.register_blueprint(augmentation_bp)
@@ -77,9 +78,26 @@ def create_app():
     app.register_blueprint(categories_bp)
     app.register_blueprint(messages_bp)
     app.register_blueprint(info_bp)
+    app.register_blueprint(search_bp)
 
     # Register WebSocket handlers
     from .websockets.process_message_ws import init_process_message_ws
     init_process_message_ws(socketio)
 
+    # Create any indexes and constraints missing from the database, a no-op once the schema is current
+    from Data.Neo4j.SchemaMigrations import migrate, schedule_data_migrations
+    migrate(include_data=False)
+
+    # Post-response work, e.g. storing messages, runs in the background
+    from Utilities.JobQueue import JobQueue
+    JobQueue().start(app)
+
+    # Backfills touch every node of a label, so they run in the background rather than holding up startup
+    schedule_data_migrations()
+
+    # Commit the costs of any requests interrupted by a crash
+    from Data.CostLedger import CostLedger
+    with app.app_context():
+        CostLedger().recover()
+
     return app
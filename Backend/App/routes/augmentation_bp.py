@@ -13,9 +13,10 @@ from App import limiter
 from App.extensions import user_key_func
 from Constants.Constants import MODERATELY_RESTRICTED, USER_MODERATELY_RESTRICTED
 from Constants.Exceptions import FAILURE_TO_SELECT_WORKER, FAILURE_TO_SELECT_WORKFLOW, FAILURE_TO_AUTO_ENGINEER_PROMPT, \
-    FAILURE_TO_QUESTION_PROMPT, FAILURE_TO_SELECT_CATEGORY
+    FAILURE_TO_QUESTION_PROMPT, FAILURE_TO_SELECT_CATEGORY, file_not_loaded
 from Data.CategoryManagement import CategoryManagement
 from Data.Files.StorageMethodology import StorageMethodology
+from Data.Neo4j.NodeDatabaseManagement import NodeDatabaseManagement as nodeDB
 from Functionality.Augmentation import Augmentation
 from Utilities.Contexts import set_functionality_context
 from Utilities.Decorators.AuthorisationDecorators import login_required
@@ -187,27 +188,30 @@ def question_user_prompt():
         selected_files = parsed_data.get("selected_files")
 
         reference_messages = None
-        prompt_key = "prompt"
-        response_key = "response"
         if selected_messages:
-            reference_messages = []
-            for message in selected_messages:
-                reference_messages.append(
-                    f"{message.get(prompt_key)} \n"
-                    "Response: \n"
-                    f"{message.get(response_key)}"
-                )
+            # Re-read, the listing the messages were selected from may only hold previews of them
+            message_ids = [message.get("id") for message in selected_messages if message.get("id")]
+            reference_messages = [
+                f"{message['prompt']} \n"
+                "Response: \n"
+                f"{message['response']}"
+                for message in nodeDB().get_messages_by_ids(message_ids) or []
+            ]
 
         reference_files = None
         if selected_files:
-            reference_files = []
+            file_names = []
+            full_paths = []
             for file in selected_files:
                 # ToDo: Should be a helper method
                 file_category = sanitise_identifier(file.get("category_id"))
                 file_name = sanitise_identifier(file.get("name"))
-                full_path = str(file_category) + "/" + file_name
+                file_names.append(file_name)
+                full_paths.append(str(file_category) + "/" + file_name)
 
-                file_contents = StorageMethodology.select().read_file(full_path)
+            reference_files = []
+            for file_name, result in zip(file_names, StorageMethodology.select().read_many(full_paths)):
+                file_contents = result.value if result.ok else file_not_loaded(result.path)
                 reference_files.append(f"<{file_name}>\n{file_contents}\n</{file_name}>")
 
         logging.debug(f"Generating questions against user prompt, data: {parsed_data}")
@@ -15,7 +15,8 @@ from Data.Neo4j.NodeDatabaseManagement import NodeDatabaseManagement as nodeDB
 from Data.Files.StorageMethodology import StorageMethodology
 from Functionality.Organising import Organising
 from Utilities.Decorators.AuthorisationDecorators import login_required
-from Utilities.Routing import fetch_entity
+from Utilities.Pagination import page_from_args
+from Utilities.Routing import fetch_entity, fetch_page
 from Utilities.Contexts import get_category_context
 from Utilities.Validation import check_valid_uuid, space_in_content
 
@@ -138,6 +139,7 @@ def upload_files():
     saved_category_id = final_category_id  # Use the determined ID if available, otherwise it will be set per file
 
     try:
+        files_to_save = []
         for file_data in processed_files_data:
             category_id_for_this_file = final_category_id
 
@@ -152,22 +154,20 @@ def upload_files():
                     continue  # Skip this file
 
             saved_category_id = category_id_for_this_file
-            file_id = Organising.save_file(
-                content=file_data['content'],
-                category_id=category_id_for_this_file,
-                filename=file_data['filename'],
-                overwrite=True
-            )
+            files_to_save.append((file_data['content'], category_id_for_this_file, file_data['filename']))
 
+        # Uploaded to storage together, rather than one round trip after another
+        file_ids = Organising.save_files(files_to_save, overwrite=True)
+
+        for (_, category_id_for_this_file, filename), file_id in zip(files_to_save, file_ids):
             if file_id:
                 result_list.append({
                     'category_id': category_id_for_this_file,
                     'id': file_id,
-                    'name': file_data['filename']
+                    'name': filename
                 })
             else:
-                logging.error(
-                    f"Failed to save file node for {file_data['filename']} in category {category_id_for_this_file}")
+                logging.error(f"Failed to save file node for {filename} in category {category_id_for_this_file}")
 
         if not result_list:
             return jsonify({'message': 'Files were processed but none could be saved successfully.'}), 500
@@ -218,7 +218,15 @@ def list_files_in_category(category_name):
         return jsonify({"error": "Invalid. Category names cannot have spaces in them"}), 400
 
     category_name = category_name.lower()
-    return fetch_entity(nodeDB().get_files_by_category(category_name), "files")
+    try:
+        page = page_from_args(request.args)
+        return fetch_page(nodeDB().get_files_by_category(category_name, page), "files")
+    except ValueError as ve:
+        logging.error("Value error: %s", str(ve))
+        return jsonify({"error": str(ve)}), 400
+    except Exception as e:
+        logging.exception(f"Failed to retrieve files for {category_name}")
+        return jsonify({"error": str(e)}), 500
 
 
 # By File Address
@@ -3,10 +3,12 @@ import logging
 from flask import Blueprint, request, jsonify
 
 from App import limiter
+from AiOrchestration.ResponseCache import ResponseCache
 from App.extensions import user_key_func
 from Constants.Constants import LIGHTLY_RESTRICTED, USER_LIGHTLY_RESTRICTED
 from Constants.Exceptions import FAILURE_TO_GET_USER_INFO
 from Data.Configuration import Configuration
+from Data.Files.FileContentCache import FileContentCache
 from Data.Neo4j.NodeDatabaseManagement import NodeDatabaseManagement as NodeDB
 from Utilities.Decorators.AuthorisationDecorators import login_required
 from Utilities.Routing import fetch_entity, parse_and_validate_data
@@ -88,4 +90,31 @@ def update_config():
     value = parsed_data.get('value')
 
     Configuration.update_config_field(field, value)
-    return fetch_entity(f"Config - {field}: {value} updated successfully", "message")
\ No newline at end of file
+    return fetch_entity(f"Config - {field}: {value} updated successfully", "message")
+
+
+@info_bp.route('/response_cache', methods=['GET'])
+@login_required
+@limiter.limit(LIGHTLY_RESTRICTED)
+@limiter.limit(USER_LIGHTLY_RESTRICTED, key_func=user_key_func)
+def get_response_cache_stats():
+    """
+    Hit and miss counts of the LLM response cache, per functionality, since the server started.
+
+    :returns: JSON response mapping each functionality to its hits, misses and hit rate.
+    """
+    return fetch_entity(ResponseCache().stats(), "response_cache")
+
+
+@info_bp.route('/file_cache', methods=['GET'])
+@login_required
+@limiter.limit(LIGHTLY_RESTRICTED)
+@limiter.limit(USER_LIGHTLY_RESTRICTED, key_func=user_key_func)
+def get_file_cache_stats():
+    """
+    Hit, revalidation and miss counts of the file content cache since the server started, with the bytes it saved
+    reading from storage.
+
+    :returns: JSON response with the cache's counters, hit rate and current size.
+    """
+    return fetch_entity(FileContentCache().stats(), "file_cache")
@@ -1,13 +1,15 @@
 import logging
 
-from flask import Blueprint
+from flask import Blueprint, jsonify, request
 
 from App import limiter
 from App.extensions import user_key_func
 from Constants.Constants import LIGHTLY_RESTRICTED, USER_LIGHTLY_RESTRICTED
 from Data.Neo4j.NodeDatabaseManagement import NodeDatabaseManagement as nodeDB
-from Utilities.Routing import fetch_entity
+from Utilities.Pagination import page_from_args
+from Utilities.Routing import fetch_entity, fetch_page
 from Utilities.Decorators.AuthorisationDecorators import login_required
+from Utilities.Validation import check_valid_uuid
 
 messages_bp = Blueprint('messages_bp', __name__, url_prefix='/messages')
 
@@ -17,11 +19,40 @@ messages_bp = Blueprint('messages_bp', __name__, url_prefix='/messages')
 @limiter.limit(LIGHTLY_RESTRICTED)
 @limiter.limit(USER_LIGHTLY_RESTRICTED, key_func=user_key_func)
 def get_messages(category_name):
+    """
+    A page of the category's messages, newest first.
+
+    Query parameters: limit (the page size), cursor (the next_cursor of the previous page) and view, "summary" sends
+    previews of the prompts and responses instead of the full text, the full message is fetched by its id.
+    """
     category_name = category_name\
         .lower()\
         .replace(' ', '_')
 
-    return fetch_entity(nodeDB().get_messages_by_category(category_name), "messages")
+    try:
+        page = page_from_args(request.args)
+        return fetch_page(nodeDB().get_messages_by_category(category_name, page), "messages")
+    except ValueError as ve:
+        logging.error("Value error: %s", str(ve))
+        return jsonify({"error": str(ve)}), 400
+    except Exception as e:
+        logging.exception(f"Failed to retrieve messages for {category_name}")
+        return jsonify({"error": str(e)}), 500
+
+
+@messages_bp.route('/message/<message_id>', methods=['GET'])
+@login_required
+@limiter.limit(LIGHTLY_RESTRICTED)
+@limiter.limit(USER_LIGHTLY_RESTRICTED, key_func=user_key_func)
+def get_message_by_id(message_id):
+    if not check_valid_uuid(message_id):
+        return jsonify({"error": "Invalid message id"}), 400
+
+    message = nodeDB().get_message_by_id(message_id)
+    if message is None:
+        return jsonify({"error": f"Message {message_id} not found"}), 404
+
+    return fetch_entity(message, "message")
 
 
 @messages_bp.route('/<message_id>', methods=['DELETE'])
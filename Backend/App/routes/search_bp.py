@@ -0,0 +1,50 @@
+import logging
+
+from flask import Blueprint, jsonify, request
+
+from App import limiter
+from App.extensions import user_key_func
+from Constants.Constants import LIGHTLY_RESTRICTED, USER_LIGHTLY_RESTRICTED, DEFAULT_SEARCH_PAGE_SIZE, MAX_PAGE_SIZE, \
+    MAX_SEARCH_RESULTS, SEARCH_TYPES
+from Constants.Exceptions import invalid_page_parameter
+from Data.Neo4j.NodeDatabaseManagement import NodeDatabaseManagement as nodeDB
+from Utilities.Decorators.AuthorisationDecorators import login_required
+from Utilities.Pagination import int_arg
+
+search_bp = Blueprint('search_bp', __name__)
+
+
+@search_bp.route('/search', methods=['GET'])
+@login_required
+@limiter.limit(LIGHTLY_RESTRICTED)
+@limiter.limit(USER_LIGHTLY_RESTRICTED, key_func=user_key_func)
+def search():
+    """
+    Full-text search of the user's messages, files and topics, most relevant first.
+
+    Query parameters: q (the search), types (a comma separated subset of messages, files and topics, all of them by
+    default), limit and offset (the next_offset of the previous page).
+    """
+    try:
+        query = request.args.get("q", "").strip()
+        if not query:
+            raise ValueError(invalid_page_parameter("q", query))
+
+        types = [kind for kind in request.args.get("types", ",".join(SEARCH_TYPES)).split(",") if kind]
+        for kind in types:
+            if kind not in SEARCH_TYPES:
+                raise ValueError(invalid_page_parameter("types", kind))
+
+        limit = min(int_arg(request.args, "limit", DEFAULT_SEARCH_PAGE_SIZE), MAX_PAGE_SIZE)
+        offset = int_arg(request.args, "offset", 0, minimum=0)
+        if offset + limit > MAX_SEARCH_RESULTS:
+            raise ValueError(invalid_page_parameter("offset", offset))
+
+        results, next_offset = nodeDB().search(query, types, limit, offset)
+        return jsonify({"results": results, "next_offset": next_offset}), 200
+    except ValueError as ve:
+        logging.error("Value error: %s", str(ve))
+        return jsonify({"error": str(ve)}), 400
+    except Exception as e:
+        logging.exception("Failed to search")
+        return jsonify({"error": str(e)}), 500
@@ -2,21 +2,26 @@ import logging
 import time
 
 import shortuuid
+from flask import request
 from flask_socketio import emit, SocketIO
 
 from App.extensions import socket_rate_limit, user_key_func, system_key_func
-from Constants.Constants import BASE_LIMIT, USER_BASE_LIMIT
+from Constants.Constants import BASE_LIMIT, USER_BASE_LIMIT, REQUEST_DEADLINE
 from Data.CategoryManagement import CategoryManagement
+from Data.ConversationSummary import ConversationSummary
+from Data.CostLedger import CostLedger
 from Functionality.Organising import Organising
 from Workers.Coder import Coder
 from Workers.Default import Default
 from Workers.WorkerManagement import get_selected_worker
 from Workers.Writer import Writer
 from Utilities.Decorators.AuthorisationDecorators import login_required_ws
-from Utilities.Contexts import set_message_context, get_message_context, get_category_context, set_streaming, \
-    set_functionality_context
+from Utilities.Contexts import set_message_context, get_message_context, get_category_context, get_user_context, \
+    set_streaming, set_functionality_context
 from Utilities.Decorators.PaymentDecorators import balance_required
 from Utilities.Routing import parse_and_validate_data
+from Utilities.Retry import RetryEngine
+from Utilities.Tracing import Tracer, span
 
 ERROR_NO_PROMPT = "No prompt found"
 PROCESS_MESSAGE_SCHEMA = {
@@ -57,6 +62,9 @@ def init_process_message_ws(socketio: SocketIO):
         start_time = time.time()
         message_uuid = str(shortuuid.uuid())
         set_message_context(message_uuid)
+        Tracer().start_trace(message_uuid, "process_message")
+        CostLedger().open(message_uuid)
+        RetryEngine().open_deadline(message_uuid, REQUEST_DEADLINE)
         logging.info(f"process_message triggered [{message_uuid}] with data: {data}")
 
         try:
@@ -77,27 +85,39 @@ def init_process_message_ws(socketio: SocketIO):
             worker_name = tags.get("worker")
 
             selected_worker = get_selected_worker(worker_name)
-            file_references = Organising.process_files(files)
-
-            category = CategoryManagement.determine_category(user_prompt, tags.get("category"))
-            CategoryManagement.create_initial_user_prompt_and_possibly_new_category(category, user_prompt)
-
-            response_stream = selected_worker.query(
-                user_prompt,
-                file_references,
-                [message["id"] for message in messages],
-                tags
-            )
+            with span("process_files", count=len(files)):
+                file_references = Organising.process_files(files)
+
+            category_future = None
+            if CategoryManagement.speculative_categorisation_enabled(tags.get("category")):
+                category_future = CategoryManagement.categorise_in_background(user_prompt)
+            else:
+                category = CategoryManagement.determine_category(user_prompt, tags.get("category"))
+                CategoryManagement.create_initial_user_prompt_and_possibly_new_category(category, user_prompt)
+
+            with span("worker.query", worker=type(selected_worker).__name__, workflow=tags.get("workflow", "")):
+                response_stream = selected_worker.query(
+                    user_prompt,
+                    file_references,
+                    [message["id"] for message in messages],
+                    tags
+                )
             logging.info(f"[{message_uuid}] Response generated, streaming...")
 
-            full_message = stream_response(response_stream, message_uuid)
-            Organising.store_prompt_data(user_prompt, full_message, category)
+            with span("stream_response"):
+                full_message = stream_response(response_stream, message_uuid)
 
-            emit('trigger_refresh', {
-                "category_name": category,
-                "category_id": get_category_context(),
-                "prompt": user_prompt
-            })
+            if category_future:
+                with span("categorisation.wait"):
+                    category = category_future.result()
+            if full_message and not isinstance(response_stream, str):
+                # Only known once streamed, responses returned whole are remembered by the worker
+                selected_worker.remember(user_prompt, full_message)
+            if ConversationSummary.enabled():
+                ConversationSummary.schedule(get_user_context(), get_category_context())
+
+            # The client is told to refresh by the store job, once the message node has been populated
+            Organising.store_prompt_data(user_prompt, full_message, category, request.sid)
 
         except ValueError as ve:
             logging.exception(f"[{message_uuid}] Validation error {str(ve)}")
@@ -118,6 +138,10 @@ def init_process_message_ws(socketio: SocketIO):
                 "status": "finished",
                 "duration": job_duration
             })
+            with span("cost_ledger.commit"):
+                CostLedger().commit(message_uuid)
+            RetryEngine().close_deadline(message_uuid)
+            Tracer().finish_trace(message_uuid)
 
 
 def stream_response(response_stream, message_uuid: str) -> str:
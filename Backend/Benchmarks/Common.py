@@ -0,0 +1,30 @@
+"""
+Helpers shared by the benchmarks, kept free of project imports at module level so each benchmark still decides what
+it loads and when, e.g. SpeedTesting picks its LLM provider and storage before the app is imported.
+"""
+import math
+from contextlib import contextmanager
+from typing import List, Optional
+
+BENCHMARK_USER_ID = "benchmark-user"
+
+
+def percentile(values: List[float], percent: float) -> Optional[float]:
+    """Nearest-rank percentile, no interpolation so results are always an observed value"""
+    if not values:
+        return None
+
+    ordered = sorted(values)
+    rank = max(1, math.ceil(percent / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+@contextmanager
+def llm_context():
+    """The app and user context LLM calls read their configuration from"""
+    from App import create_app
+    from Utilities.Contexts import set_user_context
+
+    with create_app().app_context():
+        set_user_context(BENCHMARK_USER_ID)
+        yield
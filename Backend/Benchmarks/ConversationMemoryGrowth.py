@@ -0,0 +1,90 @@
+"""
+Memory and latency of ConversationMemory (see Data/ConversationMemory.py) under a synthetic load of many users and
+categories, checking the memory held stays flat once conversations reach their token budget and the number of
+conversations reaches CONVERSATION_MEMORY_MAX_CONVERSATIONS.
+
+Runs in memory, with REDISCLOUD_URL unset no Redis is used.
+
+Usage (from the Backend directory):
+    python -m Benchmarks.ConversationMemoryGrowth
+    python -m Benchmarks.ConversationMemoryGrowth --users 5000 --appends 200000 --output memory.json
+"""
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+from typing import Dict, List
+
+from Benchmarks.Common import percentile
+from Constants.Constants import HISTORY_SELECTION_TOKEN_BUDGET
+from Data.ConversationMemory import ConversationMemory
+
+WORDS = "the quick brown fox jumps over lazy dog python code error trip budget recipe essay plan".split()
+
+
+def text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def run(users: int, categories: int, appends: int, checkpoints: int, rng: random.Random) -> List[Dict[str, float]]:
+    memory = ConversationMemory()
+    memory.clear()
+
+    results = []
+    append_times, window_times = [], []
+    tracemalloc.start()
+    for count in range(1, appends + 1):
+        user_id, category_id = f"user-{rng.randrange(users)}", f"category-{rng.randrange(categories)}"
+        prompt, response = text(rng, rng.randint(5, 60)), text(rng, rng.randint(50, 600))
+
+        start = time.perf_counter()
+        memory.append(user_id, category_id, prompt, response)
+        appended = time.perf_counter()
+        memory.window(user_id, category_id, HISTORY_SELECTION_TOKEN_BUDGET)
+        append_times.append(appended - start)
+        window_times.append(time.perf_counter() - appended)
+
+        if count % max(1, appends // checkpoints) == 0:
+            current, _ = tracemalloc.get_traced_memory()
+            results.append({
+                "appends": count,
+                "conversations": len(memory.conversations),
+                "memory_mb": current / 2 ** 20,
+                "append_p50_us": percentile(append_times, 50) * 1e6,
+                "window_p50_us": percentile(window_times, 50) * 1e6,
+            })
+            append_times, window_times = [], []
+    tracemalloc.stop()
+    memory.clear()
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Memory and latency of the conversation memory under load")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--categories", type=int, default=3, help="Categories per user")
+    parser.add_argument("--appends", type=int, default=100000)
+    parser.add_argument("--checkpoints", type=int, default=10, help="Measurements over the run")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the results as JSON to this path")
+    args = parser.parse_args()
+
+    results = run(args.users, args.categories, args.appends, args.checkpoints, random.Random(args.seed))
+
+    print("| appends | conversations | memory | append p50 | window p50 |")
+    print("|---|---|---|---|---|")
+    for result in results:
+        print(f"| {result['appends']} | {result['conversations']} | {result['memory_mb']:.1f}MB "
+              f"| {result['append_p50_us']:.1f}us | {result['window_p50_us']:.1f}us |")
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
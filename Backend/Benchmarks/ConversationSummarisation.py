@@ -0,0 +1,156 @@
+"""
+Input tokens of the history sent with each call over long synthetic sessions, with and without rolling conversation
+summaries (see Data/ConversationSummary.py):
+ - full: every earlier turn, as a long lived worker's history used to be
+ - window: the newest turns within optimisation.history_token_budget (see Data/ConversationMemory.py)
+ - summary: the same window over a conversation whose older turns are folded into a running summary once it passes
+   the summary threshold, plus the summary. The tokens the summariser reads are reported separately, they're spent in
+   the background on the background model.
+
+By default summaries are stood in for by the first HISTORY_SUMMARY_MAX_WORDS words of the text summarised, the length
+the summariser is asked to keep to. --llm summarises with the configured LLM_PROVIDER instead, this needs the Flask
+app's configuration but no database. Token counts are the same 4 characters per token estimate the memory uses.
+
+Usage (from the Backend directory):
+    python -m Benchmarks.ConversationSummarisation
+    python -m Benchmarks.ConversationSummarisation --turns 200 --sessions 20 --output summarisation.json
+"""
+import argparse
+import json
+import random
+import sys
+from contextlib import nullcontext
+from typing import Any, Callable, Dict, List, Optional
+
+from Benchmarks.Common import llm_context
+from Constants.Constants import HISTORY_SELECTION_TOKEN_BUDGET, HISTORY_SUMMARY_THRESHOLD, HISTORY_SUMMARY_MAX_WORDS, \
+    HISTORY_SUMMARY_KEEP_TOKENS, DEFAULT_CONVERSATION_MEMORY_TOKENS
+from Constants.Instructions import summarise_conversation_system_message, conversation_summary_message
+from Data.ConversationMemory import MemoryEntry, _Conversation
+from Data.ConversationSummary import ConversationSummary
+
+STRATEGIES = ["full", "window", "summary"]
+
+WORDS = (
+    "the project needs a python service that reads invoices from the shared drive parses totals and dates then writes "
+    "a monthly report with charts for the finance team who review budgets every friday and flag late payments"
+).split()
+
+
+def tokens(text: str) -> int:
+    return len(text) // 4 + 4
+
+
+def text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def extractive_summary(summary: Optional[str], entries: List[MemoryEntry]) -> str:
+    """Stands in for the summariser, the first words of the previous summary and the turns up to the word limit"""
+    words = (summary or "").split()
+    for entry in entries:
+        words.extend(f"{entry.prompt} {entry.response}".split())
+    return " ".join(words[:HISTORY_SUMMARY_MAX_WORDS])
+
+
+def summariser_input(summary: Optional[str], entries: List[MemoryEntry]) -> int:
+    turns = "\n\n".join(f"User: {entry.prompt}\nAssistant: {entry.response}" for entry in entries)
+    return (
+        tokens(summarise_conversation_system_message(HISTORY_SUMMARY_MAX_WORDS))
+        + tokens(f"Previous summary:\n{summary or 'None yet'}")
+        + tokens(f"Conversation turns:\n{turns}")
+    )
+
+
+def run_session(
+    turns: int,
+    token_budget: int,
+    threshold: int,
+    summarise: Callable[[Optional[str], List[MemoryEntry]], str],
+    rng: random.Random
+) -> Dict[str, Any]:
+    """The history tokens each strategy sends on each turn, and what the summariser reads"""
+    full_tokens = 0
+    windowed = _Conversation()
+    conversation = _Conversation()
+    summary: Optional[str] = None
+    sent = {strategy: [] for strategy in STRATEGIES}
+    folds, summariser_tokens = 0, 0
+
+    for _ in range(turns):
+        sent["full"].append(full_tokens)
+        sent["window"].append(sum(entry.tokens for entry in windowed.window(token_budget)))
+        sent["summary"].append(
+            sum(entry.tokens for entry in conversation.window(token_budget))
+            + (tokens(conversation_summary_message(summary)) if summary else 0)
+        )
+
+        entry = MemoryEntry.create(text(rng, rng.randint(10, 80)), text(rng, rng.randint(60, 400)))
+        full_tokens += entry.tokens
+        windowed.append(entry, DEFAULT_CONVERSATION_MEMORY_TOKENS)
+        conversation.append(entry, DEFAULT_CONVERSATION_MEMORY_TOKENS)
+
+        # Folded before the next turn, as the background job usually finishes while the user reads the response
+        if conversation.tokens > threshold:
+            folded = ConversationSummary.entries_to_fold(list(conversation.entries), HISTORY_SUMMARY_KEEP_TOKENS)
+            if folded:
+                summariser_tokens += summariser_input(summary, folded)
+                summary = summarise(summary, folded)
+                folds += 1
+                for _ in folded:
+                    conversation.tokens -= conversation.entries.popleft().tokens
+
+    return {"sent": sent, "folds": folds, "summariser_tokens": summariser_tokens}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="History input tokens with and without rolling summaries")
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--turns", type=int, default=100, help="Turns per session")
+    parser.add_argument("--token-budget", type=int, default=HISTORY_SELECTION_TOKEN_BUDGET)
+    parser.add_argument("--threshold", type=int, default=HISTORY_SUMMARY_THRESHOLD)
+    parser.add_argument("--llm", action="store_true", help="Summarise with the LLM provider")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the results as JSON to this path")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    summarise = ConversationSummary.summarise if args.llm else extractive_summary
+    with llm_context() if args.llm else nullcontext():
+        sessions = [
+            run_session(args.turns, args.token_budget, args.threshold, summarise, rng) for _ in range(args.sessions)
+        ]
+
+    calls = args.sessions * args.turns
+    results = {}
+    for strategy in STRATEGIES:
+        total = sum(sum(session["sent"][strategy]) for session in sessions)
+        results[strategy] = {
+            "mean_per_call": total / calls,
+            "last_turn": sum(session["sent"][strategy][-1] for session in sessions) / args.sessions,
+            "total": total,
+        }
+    results["summary"]["folds"] = sum(session["folds"] for session in sessions)
+    results["summary"]["summariser_tokens"] = sum(session["summariser_tokens"] for session in sessions)
+
+    print(f"{args.sessions} sessions of {args.turns} turns, history budget {args.token_budget}, "
+          f"summary threshold {args.threshold}\n")
+    print("| strategy | history tokens per call | at the last turn | saved vs full | saved vs window |")
+    print("|---|---|---|---|---|")
+    for strategy in STRATEGIES:
+        result = results[strategy]
+        print(f"| {strategy} | {result['mean_per_call']:.0f} | {result['last_turn']:.0f} "
+              f"| {1 - result['total'] / results['full']['total']:.0%} "
+              f"| {1 - result['total'] / results['window']['total']:.0%} |")
+    print(f"\n{results['summary']['folds']} folds, the summariser read "
+          f"{results['summary']['summariser_tokens'] / calls:.0f} tokens per call on average")
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,378 @@
+"""
+Profiles every query in Data/Neo4j/CypherQueries.py against a synthetic graph, recording db hits, rows and elapsed time
+so query changes can be compared against a baseline and their growth with data volume measured before real users
+reach it.
+
+The graph is N users, each with M categories of K messages and files, and a set of user topics. Each scale given to
+--messages is generated in turn, so the cost of a query can be read off against the number of messages per category.
+Every query is run inside a transaction that is rolled back, so write queries can be profiled without changing the
+graph.
+
+Requirements: NEO4J_URI and NEO4J_PASSWORD pointing at a disposable database, e.g.
+    docker run -p 7687:7687 -e NEO4J_AUTH=neo4j/benchmark neo4j:5
+Synthetic nodes are tagged and deleted afterwards, schema migrations are applied first.
+
+Usage (from the Backend directory):
+    python -m Benchmarks.CypherProfiling --messages 100 1000 10000 --output cypher.json
+    python -m Benchmarks.CypherProfiling --messages 100 1000 10000 --baseline cypher.json
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import shortuuid
+
+from Constants.Constants import DEFAULT_PAGE_SIZE, PREVIEW_LENGTH
+from Data.Neo4j.Neo4jDriver import Neo4jDriver
+from Data.Neo4j.SchemaMigrations import migrate, queries, PARAMETER
+
+PROFILING_USER_PREFIX = "profiling-user-"
+
+# Queries that can't run in the rolled back transactions queries are profiled in
+UNPROFILED = {
+    "BACKFILL_CATEGORY_STATS": "commits in batches of its own",
+    "SPLIT_SHARED_USER_TOPICS": "commits in batches of its own",
+    "BACKFILL_USER_TOPIC_TEXT": "commits in batches of its own",
+}
+SEED_BATCH_SIZE = 5000
+
+SEED_USERS = """
+UNWIND $rows AS row
+MERGE (user:USER {id: row.id})
+SET user.email = row.email, user.balance = 1000.0, user.earmarked = 0, user.data_uploaded = 0, user.profiling = true
+"""
+
+SEED_CATEGORIES = """
+UNWIND $rows AS row
+MATCH (user:USER {id: row.user_id})
+MERGE (category:CATEGORY {id: row.id})
+SET category.name = row.name, category.instructions = 'Synthetic category', category.colour = '#111111',
+    category.message_count = row.message_count, category.latest_message_time = row.latest_message_time,
+    category.file_count = row.file_count, category.latest_file_time = row.latest_file_time,
+    category.profiling = true
+MERGE (user)-[:HAS_CATEGORY]->(category)
+"""
+
+SEED_MESSAGES = """
+UNWIND $rows AS row
+MATCH (category:CATEGORY {id: row.category_id})
+CREATE (user_prompt:USER_PROMPT {id: row.id, prompt: row.prompt, response: row.response, time: row.time, cost: 0.001,
+    profiling: true})
+CREATE (user_prompt)-[:BELONGS_TO]->(category)
+"""
+
+SEED_FILES = """
+UNWIND $rows AS row
+MATCH (category:CATEGORY {id: row.category_id})
+CREATE (file:FILE {id: row.id, name: row.name, time: row.time, size: row.size, summary: 'Synthetic file',
+    structure: 'PROTOTYPING', version: 1, profiling: true})
+CREATE (file)-[:BELONGS_TO]->(category)
+"""
+
+SEED_TOPICS = """
+UNWIND $rows AS row
+MATCH (user:USER {id: row.user_id})
+CREATE (user_topic:USER_TOPIC {_name_: row.name, content: row.content, _text_: ' ' + row.content, profiling: true})
+CREATE (user_topic)-[:RELATES_TO]->(user)
+"""
+
+DELETE_PROFILING_DATA = """
+MATCH (node {profiling: true})
+WITH node LIMIT $batch_size
+DETACH DELETE node
+RETURN count(*) AS deleted
+"""
+
+
+# Varies the text of the synthetic messages so searches match some of them rather than all or none
+VOCABULARY = [
+    "python", "neo4j", "react", "budget", "holiday", "recipe", "garden", "invoice", "poetry", "physics",
+    "marathon", "guitar", "mortgage", "kubernetes", "sourdough", "chess", "astronomy", "woodwork", "spanish", "tax",
+    "camera", "violin", "climbing", "compost", "typescript", "pottery", "sailing", "origami", "beekeeping", "sql",
+]
+
+
+def word(index: int) -> str:
+    return VOCABULARY[index % len(VOCABULARY)]
+
+
+def chunks(rows: List[Dict[str, Any]], size: int = SEED_BATCH_SIZE):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+class CypherProfiling:
+
+    def __init__(
+        self,
+        driver: Neo4jDriver,
+        users: int,
+        categories: int,
+        files: int,
+        topics: int,
+        repeats: int,
+        timeout: float
+    ):
+        self.driver = driver
+        self.users = users
+        self.categories = categories
+        self.files = files
+        self.topics = topics
+        self.repeats = repeats
+        self.timeout = timeout
+
+    def write(self, query: str, **parameters) -> Any:
+        with self.driver.driver.session() as session:
+            return session.execute_write(lambda tx: tx.run(query, parameters).single())
+
+    def cleanup(self) -> None:
+        while self.write(DELETE_PROFILING_DATA, batch_size=SEED_BATCH_SIZE)["deleted"]:
+            pass
+
+    def seed(self, messages: int) -> Dict[str, Any]:
+        """
+        Generates the graph, returning parameters for the queries that refer to the first user and their data.
+        """
+        now = int(time.time())
+        users, categories, user_prompts, files, topics = [], [], [], [], []
+        for user_index in range(self.users):
+            user_id = f"{PROFILING_USER_PREFIX}{user_index}"
+            users.append({"id": user_id, "email": f"{user_id}@example.com"})
+            topics.extend(
+                {"user_id": user_id, "name": f"topic {topic_index}", "content": "Synthetic topic"}
+                for topic_index in range(self.topics)
+            )
+
+            for category_index in range(self.categories):
+                category_id = str(shortuuid.uuid())
+                categories.append({
+                    "user_id": user_id,
+                    "id": category_id,
+                    "name": f"category {category_index}",
+                    # The activity stats the app keeps as it writes messages and files
+                    "message_count": messages,
+                    "latest_message_time": now if messages else None,
+                    "file_count": self.files,
+                    "latest_file_time": now if self.files else None,
+                })
+                user_prompts.extend(
+                    {
+                        "category_id": category_id,
+                        "id": str(shortuuid.uuid()),
+                        "prompt": f"Synthetic prompt {message_index} about {word(message_index)}",
+                        "response": f"Synthetic response {message_index} on {word(message_index * 7 + 3)}",
+                        "time": now - message_index
+                    }
+                    for message_index in range(messages)
+                )
+                files.extend(
+                    {
+                        "category_id": category_id,
+                        "id": str(shortuuid.uuid()),
+                        "name": f"file_{file_index}.md",
+                        "time": now - file_index,
+                        "size": 1024
+                    }
+                    for file_index in range(self.files)
+                )
+
+        for query, rows in [
+            (SEED_USERS, users),
+            (SEED_CATEGORIES, categories),
+            (SEED_MESSAGES, user_prompts),
+            (SEED_FILES, files),
+            (SEED_TOPICS, topics),
+        ]:
+            for chunk in chunks(rows):
+                self.write(query, rows=chunk)
+        # Indexes created by the migrations may still be populating
+        self.write("CALL db.awaitIndexes($timeout)", timeout=int(self.timeout))
+
+        subject = users[0]
+        category = categories[0]
+        subject_prompts = [user_prompt["id"] for user_prompt in user_prompts[:10]]
+        subject_files = [file["id"] for file in files[:10]]
+        return {
+            "user_id": subject["id"],
+            "email": subject["email"],
+            "category": category["name"],
+            "category_name": category["name"],
+            "category_id": category["id"],
+            "message_id": subject_prompts[0] if subject_prompts else None,
+            "message_ids": subject_prompts,
+            "node_id": subject_prompts[0] if subject_prompts else None,
+            "user_prompt_id": subject_prompts[0] if subject_prompts else None,
+            "file_id": subject_files[0] if subject_files else None,
+            "file_ids": subject_files,
+            "node_name": "topic 0",
+            "query": f"synthetic {word(0)}",
+            "topics": [{"name": "topic 0", "properties": {"content": "Synthetic topic"}}],
+            "name": "file_0.md",
+            "category_instructions": "Synthetic category",
+            "new_category_instructions": "Synthetic category",
+            "colour": "#111111",
+            "prompt": "Synthetic prompt",
+            "response": "Synthetic response",
+            "content": "Synthetic topic",
+            "summary": "Synthetic file",
+            "structure": "PROTOTYPING",
+            "password_hash": "profiling",
+            "registration_time": now,
+            "description": "Profiling",
+            "version": 0,
+            "amount": 0.0,
+            "earmarkedAmount": 0.0,
+            "functionality": "profiling_cost",
+            "functionality_charges": [{"property": "profiling_cost", "amount": 0.0}],
+            "node_charges": [{"node_id": subject_prompts[0], "amount": 0.0}] if subject_prompts else [],
+            "system_charges": [],
+            "user_total": 0.0,
+            "ledger_id": "profiling-ledger",
+            "time": now,
+            "size": 0,
+            # The first page of a summary listing
+            "limit": DEFAULT_PAGE_SIZE + 1,
+            "preview_length": PREVIEW_LENGTH,
+        }
+
+    def profile(self, query: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        PROFILEs the query once for db hits and rows, then times it. Every run is rolled back, and a query that runs past
+        the timeout is reported as an error rather than holding up the rest.
+        """
+        def total_db_hits(operator: Dict[str, Any]) -> int:
+            return operator.get("dbHits", 0) + sum(total_db_hits(child) for child in operator.get("children", []))
+
+        # Transactions that are never committed are rolled back as they close
+        with self.driver.driver.session() as session:
+            with session.begin_transaction(timeout=self.timeout) as transaction:
+                profile = transaction.run(f"PROFILE {query}", parameters).consume().profile or {}
+
+            durations = []
+            for _ in range(self.repeats):
+                with session.begin_transaction(timeout=self.timeout) as transaction:
+                    start = time.perf_counter()
+                    transaction.run(query, parameters).consume()
+                    durations.append(time.perf_counter() - start)
+
+        return {
+            "db_hits": total_db_hits(profile),
+            "rows": profile.get("rows", 0),
+            "elapsed_ms": statistics.median(durations) * 1e3 if durations else None,
+        }
+
+    def run(self, messages: int) -> Dict[str, Dict[str, Any]]:
+        self.cleanup()
+        try:
+            parameters = self.seed(messages)
+            results = {}
+            for name, query in queries().items():
+                if name in UNPROFILED:
+                    continue
+
+                # Any parameter without a synthetic value is passed as null
+                query_parameters = {parameter: parameters.get(parameter) for parameter in PARAMETER.findall(query)}
+                try:
+                    results[name] = self.profile(query, query_parameters)
+                except Exception as e:
+                    results[name] = {"error": str(e)}
+            return results
+        finally:
+            self.cleanup()
+
+
+def compare(
+    results: Dict[str, Dict[str, Dict[str, Any]]],
+    baseline: Dict[str, Dict[str, Dict[str, Any]]],
+    max_regression: float,
+    max_time_regression: float
+) -> List[str]:
+    """
+    Lists every query whose db hits, or elapsed time, grew by more than the allowed fraction on the baseline at the
+    same scale. Db hits are deterministic for a given graph, so their threshold can be much tighter.
+    """
+    regressions = []
+    for scale, queries_at_scale in results.items():
+        for name, current in queries_at_scale.items():
+            previous = baseline.get(scale, {}).get(name, {})
+
+            if previous.get("db_hits") and current.get("db_hits", 0) > previous["db_hits"] * (1 + max_regression):
+                regressions.append(
+                    f"{name} @ {scale} messages: db hits {previous['db_hits']} -> {current['db_hits']}"
+                )
+
+            previous_time, current_time = previous.get("elapsed_ms"), current.get("elapsed_ms")
+            if previous_time and current_time and current_time > previous_time * (1 + max_time_regression):
+                regressions.append(
+                    f"{name} @ {scale} messages: elapsed {previous_time:.2f}ms -> {current_time:.2f}ms"
+                )
+    return regressions
+
+
+def print_table(results: Dict[str, Dict[str, Dict[str, Any]]]) -> None:
+    """Db hits and elapsed time of each query, with a column per scale, so their growth can be read across"""
+    scales = list(results)
+
+    def cell(result: Optional[Dict[str, Any]]) -> str:
+        if not result:
+            return "-"
+        if "error" in result:
+            return "error"
+        if result["elapsed_ms"] is None:
+            return str(result["db_hits"])
+        return f"{result['db_hits']} / {result['elapsed_ms']:.2f}ms"
+
+    print("| query | " + " | ".join(f"{scale} messages (db hits / time)" for scale in scales) + " |")
+    print("|---|" + "---|" * len(scales))
+    for name in sorted({name for results_at_scale in results.values() for name in results_at_scale}):
+        print(f"| {name} | " + " | ".join(cell(results[scale].get(name)) for scale in scales) + " |")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Profile the Cypher queries against a synthetic graph")
+    parser.add_argument("--users", type=int, default=10, help="Synthetic users")
+    parser.add_argument("--categories", type=int, default=5, help="Categories per user")
+    parser.add_argument("--messages", type=int, nargs="+", default=[100, 1000],
+                        help="Messages per category, each scale is profiled in turn")
+    parser.add_argument("--files", type=int, default=20, help="Files per category")
+    parser.add_argument("--topics", type=int, default=50, help="User topics per user")
+    parser.add_argument("--repeats", type=int, default=5, help="Timed runs of each query, the median is reported")
+    parser.add_argument("--timeout", type=float, default=60, help="Seconds a query may run before it's abandoned")
+    parser.add_argument("--output", help="Write the results as JSON to this path")
+    parser.add_argument("--baseline", help="JSON results of a previous run to check for regressions against")
+    parser.add_argument("--max-regression", type=float, default=0.1, help="Allowed db hits increase as a fraction")
+    parser.add_argument("--max-time-regression", type=float, default=0.5,
+                        help="Allowed elapsed time increase as a fraction")
+    args = parser.parse_args()
+
+    driver = Neo4jDriver()
+    try:
+        migrate(driver)
+        profiling = CypherProfiling(
+            driver, args.users, args.categories, args.files, args.topics, args.repeats, args.timeout
+        )
+        results = {str(messages): profiling.run(messages) for messages in args.messages}
+    finally:
+        driver.close()
+
+    print_table(results)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file), args.max_regression, args.max_time_regression)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""
+Latency of the full-text search queries (SEARCH_MESSAGES, SEARCH_FILES and SEARCH_USER_TOPICS) against the synthetic
+graph of Benchmarks/CypherProfiling.py, for searches matching every message, a fraction of them, a single one or none,
+at the first page and at the deepest page /search allows.
+
+Requirements: NEO4J_URI and NEO4J_PASSWORD pointing at a disposable database, e.g.
+    docker run -p 7687:7687 -e NEO4J_AUTH=neo4j/benchmark neo4j:5
+Synthetic nodes are tagged and deleted afterwards, schema migrations (which create the full-text indexes) are applied
+first.
+
+Usage (from the Backend directory):
+    python -m Benchmarks.FullTextSearch --messages 100000 --output search.json
+    python -m Benchmarks.FullTextSearch --messages 100000 --baseline search.json
+"""
+import argparse
+import json
+import sys
+import time
+from typing import Any, Dict, List
+
+from Benchmarks.Common import percentile
+from Benchmarks.CypherProfiling import CypherProfiling, VOCABULARY, word
+from Constants.Constants import DEFAULT_SEARCH_PAGE_SIZE, MAX_SEARCH_RESULTS
+from Data.Neo4j import CypherQueries
+from Data.Neo4j.Neo4jDriver import Neo4jDriver
+from Data.Neo4j.SchemaMigrations import migrate
+from Utilities.Search import lucene_query
+
+QUERIES = {
+    "messages": CypherQueries.SEARCH_MESSAGES,
+    "files": CypherQueries.SEARCH_FILES,
+    "topics": CypherQueries.SEARCH_USER_TOPICS,
+}
+
+PAGES = {
+    "first page": DEFAULT_SEARCH_PAGE_SIZE + 1,
+    "deepest page": MAX_SEARCH_RESULTS + 1,
+}
+
+
+def searches(messages_per_category: int) -> Dict[str, str]:
+    """Searches by how many of the synthetic messages they match"""
+    return {
+        "every message": "synthetic",
+        f"1 in {len(VOCABULARY)} messages": word(0),
+        "2 words": f"{word(0)} {word(1)}",
+        "1 message per category": str(messages_per_category // 2),
+        "no match": "zyzzyva",
+    }
+
+
+def measure(driver: Neo4jDriver, query: str, parameters: Dict[str, Any], repeats: int) -> Dict[str, float]:
+    durations, rows = [], 0
+    with driver.driver.session() as session:
+        for _ in range(repeats):
+            start = time.perf_counter()
+            rows = len(session.execute_read(lambda tx: list(tx.run(query, parameters))))
+            durations.append(time.perf_counter() - start)
+
+    return {
+        "rows": rows,
+        "p50_ms": percentile(durations, 50) * 1e3,
+        "p95_ms": percentile(durations, 95) * 1e3,
+    }
+
+
+def compare(
+    results: Dict[str, Dict[str, Any]],
+    baseline: Dict[str, Dict[str, Any]],
+    max_regression: float
+) -> List[str]:
+    """Every measurement whose median latency grew by more than the allowed fraction on the baseline"""
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous and result["p50_ms"] > previous["p50_ms"] * (1 + max_regression):
+            regressions.append(f"{name}: {previous['p50_ms']:.2f}ms -> {result['p50_ms']:.2f}ms")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Full-text search latency against a synthetic graph")
+    parser.add_argument("--users", type=int, default=2, help="Synthetic users, the first one searches")
+    parser.add_argument("--categories", type=int, default=5, help="Categories per user")
+    parser.add_argument("--messages", type=int, default=100000, help="Messages per user")
+    parser.add_argument("--files", type=int, default=20, help="Files per category")
+    parser.add_argument("--topics", type=int, default=50, help="User topics per user")
+    parser.add_argument("--repeats", type=int, default=20, help="Timed runs of each search")
+    parser.add_argument("--timeout", type=float, default=300, help="Seconds to wait for the indexes to populate")
+    parser.add_argument("--output", help="Write the results as JSON to this path")
+    parser.add_argument("--baseline", help="JSON results of a previous run to check for regressions against")
+    parser.add_argument("--max-regression", type=float, default=0.5, help="Allowed p50 increase as a fraction")
+    args = parser.parse_args()
+
+    messages_per_category = max(1, args.messages // args.categories)
+    driver = Neo4jDriver()
+    profiling = CypherProfiling(
+        driver, args.users, args.categories, args.files, args.topics, args.repeats, args.timeout
+    )
+    results = {}
+    try:
+        migrate(driver)
+        profiling.cleanup()
+        user_id = profiling.seed(messages_per_category)["user_id"]
+
+        for search, text in searches(messages_per_category).items():
+            for kind, query in QUERIES.items():
+                for page, limit in PAGES.items():
+                    parameters = {"user_id": user_id, "query": lucene_query(text), "limit": limit}
+                    results[f"{search} | {kind} | {page}"] = measure(driver, query, parameters, args.repeats)
+    finally:
+        profiling.cleanup()
+        driver.close()
+
+    print(f"{messages_per_category * args.categories} messages per user, {args.users} users\n")
+    print("| search | type | page | rows | p50 | p95 |")
+    print("|---|---|---|---|---|---|")
+    for name, result in results.items():
+        print(f"| {name} | {result['rows']} | {result['p50_ms']:.2f}ms | {result['p95_ms']:.2f}ms |")
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file), args.max_regression)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
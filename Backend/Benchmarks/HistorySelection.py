@@ -0,0 +1,204 @@
+"""
+Quality and latency of the relevant history selectors (see Utilities/HistorySelection.py), to choose
+optimisation.history_selector.
+
+Each session is a history of prompt-response pairs, the user's new messages and the ids of the entries relevant to
+them. Sessions are generated, each entry on one of a handful of topics and relevant when it shares the new prompt's
+topic, or read from a JSON file of recorded sessions:
+    [{"history": [["prompt", "response"], ...], "messages": ["new prompt"], "relevant": [0, 3]}, ...]
+A recorded session without "relevant" is scored against the LLM selector's picks, so --llm is needed to score it.
+
+The quality table's latency includes analysing each session's entries for the first time, the latency table times
+selections over a history already analysed, as a worker's is after its first selection. The local selectors run
+entirely in memory. --llm also runs the LLM selector, against the configured LLM_PROVIDER, for
+each session, this needs the Flask app's configuration but no database.
+
+Usage (from the Backend directory):
+    python -m Benchmarks.HistorySelection
+    python -m Benchmarks.HistorySelection --sessions recorded.json --llm --output history.json
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from contextlib import nullcontext
+from typing import Any, Callable, Dict, List
+
+from Benchmarks.Common import percentile, llm_context
+from Constants.Constants import HISTORY_SELECTION_TOP_K, HISTORY_SELECTION_TOKEN_BUDGET, \
+    HISTORY_SELECTION_RECENCY_DECAY, HISTORY_SELECTION_MIN_SIMILARITY
+from Data.ConversationMemory import MemoryEntry
+from Utilities.HistorySelection import select_with_bm25, select_with_vectors, select_with_llm, _terms, _vector
+
+LOCAL_SELECTORS = {
+    "bm25": select_with_bm25,
+    "vector": select_with_vectors,
+}
+
+TOPICS = {
+    "python": "python function list dictionary loop exception import module class decorator generator pandas",
+    "travel": "trip flight hotel london paris itinerary train museum booking passport luggage weekend",
+    "cooking": "recipe oven pasta sauce garlic bake chicken flour dinner vegetarian spices onion",
+    "finance": "budget savings mortgage interest pension invoice tax expenses salary loan spreadsheet",
+    "fitness": "running workout marathon stretching protein gym squats injury cardio training knee",
+    "writing": "essay chapter novel paragraph character plot draft editor poem tone narrative",
+}
+
+FILLER = "can you help me please explain how should i what is the best way to write about my need some ideas".split()
+
+
+def prompt_on(topic: str, rng: random.Random) -> str:
+    words = rng.sample(TOPICS[topic].split(), 3) + rng.sample(FILLER, rng.randint(4, 8))
+    rng.shuffle(words)
+    return " ".join(words)
+
+
+def generate_session(entries: int, rng: random.Random) -> Dict[str, Any]:
+    topics = [rng.choice(list(TOPICS)) for _ in range(entries)]
+    topic = rng.choice(topics)
+    history = [
+        MemoryEntry.create(prompt_on(entry_topic, rng), f"An answer about {entry_topic}") for entry_topic in topics
+    ]
+    return {
+        "history": history,
+        "messages": [prompt_on(topic, rng)],
+        "relevant": [index for index, entry_topic in enumerate(topics) if entry_topic == topic],
+    }
+
+
+def load_sessions(path: str) -> List[Dict[str, Any]]:
+    with open(path) as file:
+        sessions = json.load(file)
+    for session in sessions:
+        session["history"] = [MemoryEntry.create(prompt, response) for prompt, response in session["history"]]
+    return sessions
+
+
+def score(picked: List[int], relevant: List[int], top_k: int) -> Dict[str, float]:
+    """Precision of the picks, and recall of the relevant entries the top k could have held (the newest ones)"""
+    reachable = set(sorted(relevant)[-top_k:])
+    hits = len(set(picked) & set(relevant))
+    return {
+        "precision": hits / len(picked) if picked else float(not reachable),
+        "recall": len(set(picked) & reachable) / len(reachable) if reachable else 1.0,
+    }
+
+
+def evaluate(
+    sessions: List[Dict[str, Any]],
+    selectors: Dict[str, Callable[..., List[int]]],
+    limits: Dict[str, Any]
+) -> Dict[str, Dict[str, float]]:
+    """Mean precision, recall and F1 of each selector over the sessions, and its median latency"""
+    picks, durations = {}, {}
+    for name, selector in selectors.items():
+        picks[name], durations[name] = [], []
+        for session in sessions:
+            start = time.perf_counter()
+            picks[name].append(selector(session["history"], session["messages"], **limits))
+            durations[name].append(time.perf_counter() - start)
+
+    results = {}
+    for name in selectors:
+        precisions, recalls = [], []
+        for index, session in enumerate(sessions):
+            relevant = session.get("relevant", picks["llm"][index] if "llm" in picks else None)
+            if relevant is None:
+                continue
+
+            scored = score(picks[name][index], relevant, limits["top_k"])
+            precisions.append(scored["precision"])
+            recalls.append(scored["recall"])
+
+        precision = sum(precisions) / len(precisions) if precisions else 0.0
+        recall = sum(recalls) / len(recalls) if recalls else 0.0
+        results[name] = {
+            "sessions": len(precisions),
+            "precision": precision,
+            "recall": recall,
+            "f1": 2 * precision * recall / (precision + recall) if precision + recall else 0.0,
+            "p50_ms": percentile(durations[name], 50) * 1e3 if sessions else 0.0,
+        }
+    return results
+
+
+def latency(size: int, lookups: int, limits: Dict[str, Any], rng: random.Random) -> Dict[str, float]:
+    """Latency of each local selector over a history of the given size, once its entries have been analysed"""
+    session = generate_session(size, rng)
+    messages = [generate_session(size, rng)["messages"] for _ in range(lookups)]
+    results = {"size": size}
+    for name, selector in LOCAL_SELECTORS.items():
+        selector(session["history"], messages[0], **limits)
+        durations = []
+        for message in messages:
+            start = time.perf_counter()
+            selector(session["history"], message, **limits)
+            durations.append(time.perf_counter() - start)
+        results[f"{name}_p50_us"] = percentile(durations, 50) * 1e6
+        results[f"{name}_p95_us"] = percentile(durations, 95) * 1e6
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Quality and latency of the relevant history selectors")
+    parser.add_argument("--sessions", help="JSON file of recorded sessions, by default sessions are generated")
+    parser.add_argument("--generated", type=int, default=200, help="Sessions to generate")
+    parser.add_argument("--entries", type=int, default=30, help="History entries per generated session")
+    parser.add_argument("--llm", action="store_true", help="Also run the LLM selector, calling the LLM provider")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 200, 500, 1000], help="History sizes to time")
+    parser.add_argument("--lookups", type=int, default=500, help="Timed selections per history size")
+    parser.add_argument("--top-k", type=int, default=HISTORY_SELECTION_TOP_K)
+    parser.add_argument("--token-budget", type=int, default=HISTORY_SELECTION_TOKEN_BUDGET)
+    parser.add_argument("--recency-decay", type=float, default=HISTORY_SELECTION_RECENCY_DECAY)
+    parser.add_argument("--min-similarity", type=float, default=HISTORY_SELECTION_MIN_SIMILARITY)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the results as JSON to this path")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    limits = {
+        "top_k": args.top_k,
+        "token_budget": args.token_budget,
+        "recency_decay": args.recency_decay,
+        "min_similarity": args.min_similarity,
+    }
+    sessions = (
+        load_sessions(args.sessions) if args.sessions
+        else [generate_session(args.entries, rng) for _ in range(args.generated)]
+    )
+
+    selectors = dict(LOCAL_SELECTORS)
+    if args.llm:
+        selectors["llm"] = select_with_llm
+    with llm_context() if args.llm else nullcontext():
+        quality = evaluate(sessions, selectors, limits)
+
+    _terms.cache_clear()
+    _vector.cache_clear()
+    timings = [latency(size, args.lookups, limits, rng) for size in args.sizes]
+
+    print(f"{len(sessions)} {'recorded' if args.sessions else 'generated'} sessions, top {args.top_k}\n")
+    print("| selector | sessions scored | precision | recall | F1 | p50 |")
+    print("|---|---|---|---|---|---|")
+    for name, result in quality.items():
+        print(f"| {name} | {result['sessions']} | {result['precision']:.2f} | {result['recall']:.2f} "
+              f"| {result['f1']:.2f} | {result['p50_ms']:.3f}ms |")
+
+    print("\n| entries | " + " | ".join(f"{name} p50 | {name} p95" for name in LOCAL_SELECTORS) + " |")
+    print("|---|" + "---|---|" * len(LOCAL_SELECTORS))
+    for timing in timings:
+        cells = " | ".join(
+            f"{timing[f'{name}_p50_us']:.0f}us | {timing[f'{name}_p95_us']:.0f}us" for name in LOCAL_SELECTORS
+        )
+        print(f"| {timing['size']} | {cells} |")
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"quality": quality, "latency": timings}, file, indent=2)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""
+Micro-benchmark of the semantic prompt cache, measuring how embedding and lookup cost grow with the number of cached
+prompts, to size SEMANTIC_CACHE_ENTRIES_PER_USER, and the similarity of pairs of prompts that should and shouldn't
+share a cached response, to set SEMANTIC_CACHE_THRESHOLD.
+
+Runs entirely in memory, no database, Flask app or LLM provider is needed.
+
+Usage (from the Backend directory):
+    python -m Benchmarks.SemanticCacheLookup
+    python -m Benchmarks.SemanticCacheLookup --sizes 256 4096 65536 --lookups 2000 --output semantic.json
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from typing import Dict
+
+from AiOrchestration.SemanticCache import embed, canonicalise, _Bucket
+from Benchmarks.Common import percentile
+from Constants.Constants import SEMANTIC_CACHE_DIMENSIONS, SEMANTIC_CACHE_THRESHOLD
+
+VOCABULARY = (
+    "hey hi hello there what can you do help me write a python script summarise this file explain how the code works "
+    "fix the bug in my function translate into french plan a trip to london draft an email to my manager"
+).split()
+
+# Pairs of routing-level prompts that should get the same answer
+NEAR_DUPLICATES = [
+    ("hey", "hi there"),
+    ("hey", "hey there"),
+    ("hi", "hello"),
+    ("hello there", "hiya"),
+    ("what can you do", "What can you do?"),
+    ("what can you do", "what are you able to do"),
+    ("what can you do", "what can u do"),
+    ("hey, what can you do?", "hi there what can you do"),
+    ("help me write a python script", "Help me write a python script please"),
+    ("summarise this file", "summarize this file"),
+]
+
+# Pairs that only differ by a word or two, which may need different answers
+DISTINCT = [
+    ("hey", "what can you do"),
+    ("hi", "help"),
+    ("write a python script", "write a python test"),
+    ("translate into french", "translate into german"),
+    ("plan a trip to london", "plan a trip to paris"),
+    ("summarise this file", "explain this file"),
+    ("fix the bug in my function", "explain my function"),
+    ("draft an email to my manager", "draft an email to my team"),
+]
+
+
+def similarity(first: str, second: str, dimensions: int) -> float:
+    return float(embed(canonicalise(first), dimensions) @ embed(canonicalise(second), dimensions))
+
+
+def random_prompt(rng: random.Random) -> str:
+    return " ".join(rng.choice(VOCABULARY) for _ in range(rng.randint(2, 12)))
+
+
+def benchmark(size: int, lookups: int, dimensions: int, rng: random.Random) -> Dict[str, float]:
+    bucket = _Bucket(size, dimensions)
+    for _ in range(size):
+        bucket.insert(embed(random_prompt(rng), dimensions), "response")
+
+    prompts = [random_prompt(rng) for _ in range(lookups)]
+
+    embed_times = []
+    lookup_times = []
+    for prompt in prompts:
+        start = time.perf_counter()
+        vector = embed(prompt, dimensions)
+        embedded = time.perf_counter()
+        bucket.lookup(vector)
+        end = time.perf_counter()
+
+        embed_times.append(embedded - start)
+        lookup_times.append(end - embedded)
+
+    return {
+        "size": size,
+        "matrix_bytes": bucket.vectors.nbytes,
+        "embed_p50_us": percentile(embed_times, 50) * 1e6,
+        "lookup_p50_us": percentile(lookup_times, 50) * 1e6,
+        "lookup_p95_us": percentile(lookup_times, 95) * 1e6,
+        "lookup_p99_us": percentile(lookup_times, 99) * 1e6,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Semantic cache lookup cost against matrix size")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[64, 256, 1024, 4096, 16384, 65536],
+                        help="Cached prompts per bucket to measure")
+    parser.add_argument("--lookups", type=int, default=1000, help="Lookups measured per size")
+    parser.add_argument("--dimensions", type=int, default=SEMANTIC_CACHE_DIMENSIONS, help="Embedding dimensions")
+    parser.add_argument("--threshold", type=float, default=SEMANTIC_CACHE_THRESHOLD, help="Similarity to reuse at")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the results as JSON to this path")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    results = [benchmark(size, args.lookups, args.dimensions, rng) for size in args.sizes]
+
+    print("| entries | matrix | embed p50 | lookup p50 | lookup p95 | lookup p99 |")
+    print("|---|---|---|---|---|---|")
+    for result in results:
+        print(
+            f"| {result['size']} | {result['matrix_bytes'] / 1024:.0f} KiB | {result['embed_p50_us']:.1f}µs "
+            f"| {result['lookup_p50_us']:.1f}µs | {result['lookup_p95_us']:.1f}µs | {result['lookup_p99_us']:.1f}µs |"
+        )
+
+    pairs = [
+        {"first": first, "second": second, "near_duplicate": near_duplicate,
+         "similarity": similarity(first, second, args.dimensions)}
+        for near_duplicate, examples in ((True, NEAR_DUPLICATES), (False, DISTINCT))
+        for first, second in examples
+    ]
+
+    print(f"\n| first | second | should match | similarity | matches at {args.threshold} |")
+    print("|---|---|---|---|---|")
+    for pair in pairs:
+        print(f"| {pair['first']} | {pair['second']} | {'yes' if pair['near_duplicate'] else 'no'} "
+              f"| {pair['similarity']:.2f} | {'yes' if pair['similarity'] >= args.threshold else 'no'} |")
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"lookup": results, "pairs": pairs}, file, indent=2)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,291 @@
+"""
+End-to-end latency benchmark, an automated and repeatable version of Reports/0.9.5/SpeedTesting.md
+
+Drives the 'start_stream' Socket.IO handler through the flask-socketio test client with every LLM call served by the
+offline LocalWrapper, so only the orchestration overhead (Neo4j, storage, threading, prompt assembly) varies between
+runs. Each scenario is reported as p50/p95/p99 per stage:
+ - first_token: time until the first 'response' event
+ - stream_end: time until the 'stream_end' event, i.e. the user visible response is complete
+ - total: time until the handler returns, including post-processing
+ - server: the duration the server itself reports in its final 'update_workflow' event
+
+Requirements: NEO4J_URI and NEO4J_PASSWORD pointing at a disposable database, e.g.
+    docker run -p 7687:7687 -e NEO4J_AUTH=neo4j/benchmark neo4j:5
+Storage defaults to the local file system and the LLM provider to 'local'.
+
+Usage (from the Backend directory):
+    python -m Benchmarks.SpeedTesting --runs 5 --output speed.json
+    python -m Benchmarks.SpeedTesting --baseline speed.json --max-regression 0.2
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Any
+
+from Constants.Constants import LLM_PROVIDER, LOCAL_LLM_PROVIDER, STORAGE_TYPE, LOCAL_STORAGE
+
+os.environ.setdefault(LLM_PROVIDER, LOCAL_LLM_PROVIDER)
+os.environ.setdefault(STORAGE_TYPE, LOCAL_STORAGE)
+
+import eventlet
+
+eventlet.monkey_patch()
+
+from flask_jwt_extended import create_access_token
+
+from AiOrchestration.LocalWrapper import LocalWrapper
+from App import create_app, socketio
+from Benchmarks.Common import BENCHMARK_USER_ID, percentile
+from Data.CategoryManagement import CategoryManagement
+from Data.Configuration import Configuration
+from Data.Neo4j.NodeDatabaseManagement import NodeDatabaseManagement as nodeDB
+from Functionality.Organising import Organising
+from Utilities.Contexts import set_user_context
+from Utilities.Decorators.AuthorisationDecorators import ACCESS_TOKEN_COOKIE
+
+BENCHMARK_CATEGORY = "benchmark"
+BENCHMARK_BALANCE = 1_000_000.0
+STAGES = ["first_token", "stream_end", "total", "server"]
+PERCENTILES = [50, 95, 99]
+
+SIMPLE_PROMPT = "Hey"
+COMPLEX_PROMPT = "Talk to me in great detail about ancient Rome"
+
+# Categorisation only needs a result tag, everything else is happy with the templated response. The template opens
+# with a markdown list item and a file tag so the write and write pages workflows have something to parse.
+CANNED_RESPONSES = {"<input>": f'<result="{BENCHMARK_CATEGORY}">'}
+RESPONSE_TEMPLATE = "- [{model}] candidate {candidate} <benchmark.md purpose='benchmark'> {prompt}"
+
+SEED_USER = """
+MERGE (user:USER {id: $user_id})
+SET user.email = $user_id, user.balance = $balance, user.earmarked = 0, user.data_uploaded = 0
+"""
+
+SEED_SYSTEM = """
+MERGE (system:SYSTEM {id: "system"})
+SET system.gemini_balance = $balance, system.open_ai_balance = $balance
+"""
+
+DELETE_BENCHMARK_DATA = """
+MATCH (user:USER {id: $user_id})-[:HAS_CATEGORY]->(category:CATEGORY)
+OPTIONAL MATCH (category)<-[:BELONGS_TO]-(node)
+DETACH DELETE node, category
+"""
+
+
+@dataclass
+class Scenario:
+    name: str
+    prompt: str = COMPLEX_PROMPT
+    tags: Dict[str, Any] = field(default_factory=dict)
+    config: Dict[str, Any] = field(default_factory=dict)
+    uses_files: bool = False
+
+
+INTERNET = {"response_improvement.internet_search_enabled": "on"}
+USER_CONTEXT = {"response_improvement.user_context_enabled": True}
+NO_AUGMENTATION = {
+    "response_improvement.internet_search_enabled": "off",
+    "response_improvement.user_context_enabled": False
+}
+
+SCENARIOS = [
+    Scenario("simple chat", prompt=SIMPLE_PROMPT),
+    Scenario("simple chat +internet", prompt=SIMPLE_PROMPT, config=INTERNET),
+    Scenario("simple chat +user-context", prompt=SIMPLE_PROMPT, config=USER_CONTEXT),
+    Scenario("simple chat +internet +user-context", prompt=SIMPLE_PROMPT, config={**INTERNET, **USER_CONTEXT}),
+    Scenario("chat"),
+    Scenario("chat +internet", config=INTERNET),
+    Scenario("chat +user-context", config=USER_CONTEXT),
+    Scenario("chat +internet +user-context", config={**INTERNET, **USER_CONTEXT}),
+    Scenario("best of 2", tags={"best of": 2}),
+    Scenario("best of 3", tags={"best of": 3}),
+    Scenario("best of 5", tags={"best of": 5}),
+    Scenario("loops 2", tags={"loops": 2}),
+    Scenario("loops 3", tags={"loops": 3}),
+    Scenario("workflow chat", tags={"workflow": "chat"}),
+    Scenario("workflow auto", tags={"workflow": "auto"}, uses_files=True),
+    Scenario("workflow write (coder)", tags={"worker": "coder", "workflow": "write", "write": "benchmark.py"}),
+    Scenario("workflow write pages (writer)", tags={"worker": "writer", "workflow": "write", "pages": 3}),
+]
+
+
+class TimestampedQueue(list):
+    """The test client appends every emitted event to its queue, stamping them lets us time each stage"""
+
+    def append(self, item):
+        item["received_at"] = time.perf_counter()
+        super().append(item)
+
+
+class SpeedTesting:
+
+    def __init__(self, runs: int, warmup: int, model: Optional[str] = None):
+        self.runs = runs
+        self.warmup = warmup
+        self.model = model
+
+        self.app = create_app()
+        self.flask_client = self.app.test_client()
+        with self.app.app_context():
+            token = create_access_token(identity=BENCHMARK_USER_ID)
+        self.flask_client.set_cookie(ACCESS_TOKEN_COOKIE, token)
+
+        self.client = socketio.test_client(self.app, flask_test_client=self.flask_client)
+        self.file_ids: List[str] = []
+
+        LocalWrapper().configure(response_template=RESPONSE_TEMPLATE, canned_responses=CANNED_RESPONSES)
+
+    def seed(self) -> None:
+        """(Re)creates the benchmark user with a balance that won't run out, and uploads files for the auto workflow"""
+        nodeDB().neo4jDriver.execute_write(SEED_USER, {"user_id": BENCHMARK_USER_ID, "balance": BENCHMARK_BALANCE})
+        nodeDB().neo4jDriver.execute_write(SEED_SYSTEM, {"balance": BENCHMARK_BALANCE})
+
+        with self.app.test_request_context():
+            set_user_context(BENCHMARK_USER_ID)
+            category_id = CategoryManagement.possibly_create_new_category(BENCHMARK_CATEGORY)
+            for index in range(3):
+                file_id = Organising.save_file(
+                    f"Benchmark file {index}\n" + "lorem ipsum dolor sit amet\n" * 50,
+                    category_id,
+                    f"benchmark_{index}.txt"
+                )
+                if file_id:
+                    self.file_ids.append(file_id)
+
+    def cleanup(self) -> None:
+        nodeDB().neo4jDriver.execute_write(DELETE_BENCHMARK_DATA, {"user_id": BENCHMARK_USER_ID})
+
+    def configure(self, scenario: Scenario) -> None:
+        with self.app.test_request_context():
+            set_user_context(BENCHMARK_USER_ID)
+            for field_path, value in {**NO_AUGMENTATION, **scenario.config}.items():
+                Configuration.update_config_field(field_path, value)
+
+    def run_once(self, scenario: Scenario) -> Dict[str, Optional[float]]:
+        """Sends a single prompt and times each stage from the events received"""
+        tags = dict(scenario.tags)
+        if self.model:
+            tags["model"] = self.model
+
+        self.client.queue = TimestampedQueue()
+        start = time.perf_counter()
+        self.client.emit('start_stream', {
+            "prompt": scenario.prompt,
+            "tags": tags,
+            "files": [{"id": file_id} for file_id in self.file_ids] if scenario.uses_files else [],
+        })
+        finish = time.perf_counter()
+
+        def first(name: str) -> Optional[dict]:
+            return next((event for event in self.client.queue if event["name"] == name), None)
+
+        first_token = first('response')
+        stream_end = first('stream_end')
+        durations = [
+            event["args"][0].get("duration") for event in self.client.queue
+            if event["name"] == "update_workflow" and event["args"][0].get("status") == "finished"
+        ]
+        errors = [event["args"][0] for event in self.client.queue if event["name"] == "error"]
+        if errors:
+            logging.warning(f"[{scenario.name}] errors emitted: {errors}")
+
+        return {
+            "first_token": first_token["received_at"] - start if first_token else None,
+            "stream_end": stream_end["received_at"] - start if stream_end else None,
+            "total": finish - start,
+            "server": durations[-1] if durations else None,
+            "errors": len(errors)
+        }
+
+    def run_scenario(self, scenario: Scenario) -> Dict[str, Any]:
+        self.configure(scenario)
+        for _ in range(self.warmup):
+            self.run_once(scenario)
+
+        samples = [self.run_once(scenario) for _ in range(self.runs)]
+        result = {"runs": self.runs, "errors": sum(sample["errors"] for sample in samples)}
+        for stage in STAGES:
+            values = [sample[stage] for sample in samples if sample[stage] is not None]
+            result[stage] = {f"p{percent}": percentile(values, percent) for percent in PERCENTILES}
+
+        return result
+
+    def run(self, scenarios: List[Scenario]) -> Dict[str, Dict[str, Any]]:
+        self.seed()
+        try:
+            results = {}
+            for scenario in scenarios:
+                logging.info(f"Benchmarking '{scenario.name}'")
+                results[scenario.name] = self.run_scenario(scenario)
+            return results
+        finally:
+            self.client.disconnect()
+            self.cleanup()
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], max_regression: float) -> List[str]:
+    """Lists every scenario whose p95 total time regressed by more than max_regression (a fraction) on the baseline"""
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name, {}).get("total", {}).get("p95")
+        current = result["total"]["p95"]
+        if previous and current and current > previous * (1 + max_regression):
+            regressions.append(f"{name}: p95 total {previous:.3f}s -> {current:.3f}s")
+    return regressions
+
+
+def print_table(results: Dict[str, Dict[str, Any]]) -> None:
+    def cell(value: Optional[float]) -> str:
+        return f"{value:.3f}" if value is not None else "-"
+
+    header = "| Scenario".ljust(40) + "".join(f"| {stage} p50/p95/p99".ljust(30) for stage in STAGES) + "| Errors |"
+    print(header)
+    print("|" + "-" * (len(header) - 2) + "|")
+    for name, result in results.items():
+        row = f"| {name}".ljust(40)
+        for stage in STAGES:
+            row += ("| " + " / ".join(cell(result[stage][f"p{percent}"]) for percent in PERCENTILES)).ljust(30)
+        print(row + f"| {result['errors']}".ljust(8) + " |")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="End-to-end latency benchmark for process_message")
+    parser.add_argument("--runs", type=int, default=5, help="Measured runs per scenario")
+    parser.add_argument("--warmup", type=int, default=1, help="Discarded runs per scenario")
+    parser.add_argument("--scenario", action="append", help="Only run scenarios containing this text")
+    parser.add_argument("--model", help="Local model to emulate, e.g. local-slow")
+    parser.add_argument("--output", help="Write the results as JSON to this path")
+    parser.add_argument("--baseline", help="JSON results of a previous run to check for regressions against")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="Allowed p95 increase as a fraction")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    scenarios = [
+        scenario for scenario in SCENARIOS
+        if not args.scenario or any(text in scenario.name for text in args.scenario)
+    ]
+
+    results = SpeedTesting(args.runs, args.warmup, args.model).run(scenarios)
+    print_table(results)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file), args.max_regression)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""
+Micro-benchmark of S3 storage access, comparing a new S3Manager (and boto3 client) per call, as
+StorageMethodology.select used to create, against the pooled manager it now shares per process.
+
+Runs against an in-process S3 stand-in (moto) by default, or any S3 compatible endpoint, e.g. MinIO:
+    docker run -p 9000:9000 -e MINIO_ROOT_USER=benchmark -e MINIO_ROOT_PASSWORD=benchmark minio/minio server /data
+
+Usage (from the Backend directory):
+    pip install "moto[s3]"
+    python -m Benchmarks.StorageClients --calls 200 --threads 8
+    python -m Benchmarks.StorageClients --endpoint-url http://localhost:9000 --access-key benchmark \\
+        --secret-key benchmark
+"""
+import argparse
+import contextlib
+import json
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict
+
+from Benchmarks.Common import percentile
+
+from Constants.Constants import STORAGE_TYPE, AWS_S3_STORAGE, THE_THINKER_S3_STANDARD_ACCESS_KEY, \
+    THE_THINKER_S3_STANDARD_SECRET_ACCESS_KEY, THE_THINKER_S3_STANDARD_BUCKET_ID, THE_THINKER_S3_ENDPOINT_URL
+from Data.Files.S3Manager import S3Manager
+from Data.Files.StorageMethodology import StorageMethodology
+
+BENCHMARK_BUCKET = "thinker-storage-benchmark"
+BENCHMARK_FILE = "benchmark/user/notes.md"
+
+
+def measure(call: Callable[[], str], calls: int, threads: int) -> Dict[str, float]:
+    def timed(_) -> float:
+        start = time.perf_counter()
+        call()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        durations = list(executor.map(timed, range(calls)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "mean_ms": statistics.mean(durations) * 1e3,
+        "p50_ms": percentile(durations, 50) * 1e3,
+        "p95_ms": percentile(durations, 95) * 1e3,
+        "throughput": calls / elapsed,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Per-call vs pooled S3 client benchmark")
+    parser.add_argument("--calls", type=int, default=200, help="File reads measured per strategy")
+    parser.add_argument("--threads", type=int, default=1, help="Concurrent readers")
+    parser.add_argument("--endpoint-url", help="S3 compatible endpoint, moto is used if not given")
+    parser.add_argument("--access-key", default="benchmark")
+    parser.add_argument("--secret-key", default="benchmark")
+    parser.add_argument("--output", help="Write the results as JSON to this path")
+    args = parser.parse_args()
+
+    os.environ[STORAGE_TYPE] = AWS_S3_STORAGE
+    os.environ[THE_THINKER_S3_STANDARD_ACCESS_KEY] = args.access_key
+    os.environ[THE_THINKER_S3_STANDARD_SECRET_ACCESS_KEY] = args.secret_key
+    os.environ[THE_THINKER_S3_STANDARD_BUCKET_ID] = BENCHMARK_BUCKET
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    if args.endpoint_url:
+        os.environ[THE_THINKER_S3_ENDPOINT_URL] = args.endpoint_url
+        stand_in = contextlib.nullcontext()
+    else:
+        from moto import mock_aws
+        stand_in = mock_aws()
+
+    with stand_in:
+        storage = StorageMethodology.select()
+        with contextlib.suppress(Exception):
+            storage.s3_client.create_bucket(Bucket=BENCHMARK_BUCKET)
+        storage.save_file("# Benchmark\n" + "notes " * 500, BENCHMARK_FILE, overwrite=True)
+
+        strategies = {
+            "client per call": lambda: S3Manager(
+                args.access_key, args.secret_key, args.endpoint_url
+            ).read_file(BENCHMARK_FILE),
+            "pooled": lambda: StorageMethodology.select().read_file(BENCHMARK_FILE),
+        }
+        results = {name: measure(call, args.calls, args.threads) for name, call in strategies.items()}
+
+    print(f"| strategy ({args.threads} thread(s)) | mean | p50 | p95 | reads/s |")
+    print("|---|---|---|---|---|")
+    for name, result in results.items():
+        print(
+            f"| {name} | {result['mean_ms']:.2f}ms | {result['p50_ms']:.2f}ms | {result['p95_ms']:.2f}ms "
+            f"| {result['throughput']:.0f} |"
+        )
+    saving = results["client per call"]["mean_ms"] - results["pooled"]["mean_ms"]
+    print(f"\nPooling saves {saving:.2f}ms per call")
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
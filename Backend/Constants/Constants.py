@@ -3,9 +3,6 @@ import re
 MAX_SCHEMA_RETRIES = 2
 MAX_PROMPT_RETRIES = 3
 
-BACKOFF_INITIAL = 5
-BACKOFF_FACTOR: float = 1.0
-
 MEGABYTE = 1024 * 1024
 MAX_FILE_SIZE = 10 * MEGABYTE
 USER_DATA_LIMIT = 1000 * MEGABYTE  # Can be expanded later, but I don't want to be spammed.
@@ -33,14 +30,154 @@ REDISCLOUD_URL = "REDISCLOUD_URL"
 THE_THINKER_S3_STANDARD_ACCESS_KEY = "THE-THINKER-S3-STANDARD-ACCESS-KEY"
 THE_THINKER_S3_STANDARD_SECRET_ACCESS_KEY = "THE-THINKER-S3-STANDARD-SECRET-ACCESS-KEY"
 THE_THINKER_S3_STANDARD_BUCKET_ID = "THE-THINKER-S3-STANDARD-BUCKET-ID"
+THE_THINKER_S3_ENDPOINT_URL = "THE-THINKER-S3-ENDPOINT-URL"  # optional, for S3 compatible stores e.g. MinIO
+
+# One S3 client is shared by every thread, so the pool is sized for the busiest request fan-out
+S3_MAX_POOL_CONNECTIONS = 50
+S3_CONNECT_TIMEOUT = 5
+S3_READ_TIMEOUT = 30
+S3_MAX_ATTEMPTS = 3
+STORAGE_BATCH_CONCURRENCY = 16  # concurrent transfers of a read_many/save_many call
+
+# File content cache, see Data/Files/FileContentCache.py
+FILE_CACHE_MAX_BYTES = "FILE_CACHE_MAX_BYTES"
+DEFAULT_FILE_CACHE_MAX_BYTES = 256 * 1024 * 1024
+FILE_CACHE_MAX_ENTRY_BYTES = 16 * 1024 * 1024
+FILE_CACHE_REVALIDATE_SECONDS = 5  # how stale a file changed by another process can be
 
 NEO4J_URI = "NEO4J_URI"
 NEO4J_PASSWORD = "NEO4J_PASSWORD"
+NEO4J_MAX_TRANSACTION_RETRY_TIME = 15  # seconds a managed transaction is retried for on transient errors
+
+# Message and file listings, see Utilities/Pagination.py
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+PREVIEW_LENGTH = 300  # characters of a prompt or response sent in a summary listing
+
+# Full-text search, see Utilities/Search.py
+DEFAULT_SEARCH_PAGE_SIZE = 20
+MAX_SEARCH_RESULTS = 1000  # how deep into the ranked results a search can page
+SEARCH_SNIPPET_LENGTH = 200
+SEARCH_TYPES = ["messages", "files", "topics"]
 
 GEMINI_API_KEY = "GEMINI_API_KEY"
 
+# Local (offline) LLM, see AiOrchestration/LocalWrapper.py
+
+LLM_PROVIDER = "LLM_PROVIDER"  # set to LOCAL_LLM_PROVIDER to route every model to the LocalWrapper
+LOCAL_LLM_PROVIDER = "local"
+
+LOCAL_LLM_TIME_TO_FIRST_TOKEN = "LOCAL_LLM_TIME_TO_FIRST_TOKEN"
+LOCAL_LLM_TOKENS_PER_SECOND = "LOCAL_LLM_TOKENS_PER_SECOND"
+LOCAL_LLM_OUTPUT_TOKENS = "LOCAL_LLM_OUTPUT_TOKENS"
+LOCAL_LLM_FAILURE_RATE = "LOCAL_LLM_FAILURE_RATE"
+LOCAL_LLM_SEED = "LOCAL_LLM_SEED"
+LOCAL_LLM_RESPONSE_TEMPLATE = "LOCAL_LLM_RESPONSE_TEMPLATE"
+LOCAL_LLM_CANNED_RESPONSES = "LOCAL_LLM_CANNED_RESPONSES"
+
+# Tracing, see Utilities/Tracing.py
+
+TRACE_EXPORT_FORMAT = "TRACE_EXPORT_FORMAT"  # comma separated, any of JSON_TRACE_FORMAT and OTLP_TRACE_FORMAT
+TRACE_EXPORT_DIRECTORY = "TRACE_EXPORT_DIRECTORY"
+JSON_TRACE_FORMAT = "json"
+OTLP_TRACE_FORMAT = "otlp"
+
 SENDGRID_API_KEY = "SENDGRID_API_KEY"
 
+# Context gathering, seconds each source has to respond before the prompt is sent without it
+# Overridable per source under optimisation.context_timeouts in the config
+
+CONTEXT_GATHERING_TIMEOUTS = {
+    "files": 10,
+    "messages": 5,
+    "internet_search": 20,
+    "category_system_message": 5,
+    "categorisation": 30,  # added to the category system message and history timeouts while the category is pending
+    "user_context": 30,
+    "relevant_history": 15,
+    "recent_history": 5,
+    "conversation_summary": 5,
+}
+
+# Background jobs, see Utilities/JobQueue.py
+
+JOB_QUEUE_PATH = "JOB_QUEUE_PATH"
+JOB_QUEUE_WORKERS = "JOB_QUEUE_WORKERS"
+MAX_JOB_ATTEMPTS = 5
+JOB_RETENTION_SECONDS = 24 * 60 * 60
+JOB_QUEUE_DRAIN_TIMEOUT = 30
+
+# Cost accounting, see Data/CostLedger.py
+
+COST_LEDGER_DIRECTORY = "COST_LEDGER_DIRECTORY"
+
+# Response cache for background LLM calls, see AiOrchestration/ResponseCache.py
+
+RESPONSE_CACHE_SIZE = "RESPONSE_CACHE_SIZE"
+RESPONSE_CACHE_TTL = "RESPONSE_CACHE_TTL"
+DEFAULT_RESPONSE_CACHE_SIZE = 1024
+DEFAULT_RESPONSE_CACHE_TTL = 24 * 60 * 60
+RESPONSE_CACHE_KEY_PREFIX = "llm_response:"
+
+# Near-duplicate prompt cache, see AiOrchestration/SemanticCache.py
+# Functionalities and threshold are overridable under optimisation.semantic_cache_* in the config
+
+SEMANTIC_CACHE_FUNCTIONALITIES = ["select_worker", "select_workflow"]
+# Greeting and pleasantry variants score 1.0 once canonicalised, prompts differing by a content word up to about 0.8
+SEMANTIC_CACHE_THRESHOLD = 0.92
+SEMANTIC_CACHE_DIMENSIONS = 512
+SEMANTIC_CACHE_ENTRIES_PER_USER = 256
+SEMANTIC_CACHE_MAX_USERS = 1000
+
+# Conversation memory, see Data/ConversationMemory.py
+
+CONVERSATION_MEMORY_TOKENS = "CONVERSATION_MEMORY_TOKENS"
+DEFAULT_CONVERSATION_MEMORY_TOKENS = 16000  # Kept per user and category, the oldest entries are evicted past it
+CONVERSATION_MEMORY_ENTRIES = 200
+CONVERSATION_MEMORY_MAX_CONVERSATIONS = 1000
+CONVERSATION_MEMORY_TTL = 7 * 24 * 60 * 60
+CONVERSATION_MEMORY_KEY_PREFIX = "conversation:"
+
+# Rolling conversation summaries, see Data/ConversationSummary.py
+# Enabled by optimisation.history_summary, the threshold is overridable under optimisation.history_summary_threshold
+
+HISTORY_SUMMARY_THRESHOLD = 2000  # Tokens of history past which the older entries are folded into the summary
+HISTORY_SUMMARY_KEEP_TOKENS = 500  # Tokens of the newest entries left out of a fold
+HISTORY_SUMMARY_MAX_WORDS = 250
+
+# Relevant history selection, see Utilities/HistorySelection.py
+# The selector and its limits are overridable under optimisation.history_* in the config
+
+LLM_HISTORY_SELECTOR = "llm"
+BM25_HISTORY_SELECTOR = "bm25"
+VECTOR_HISTORY_SELECTOR = "vector"
+DEFAULT_HISTORY_SELECTOR = LLM_HISTORY_SELECTOR
+HISTORY_SELECTION_TOP_K = 5
+HISTORY_SELECTION_TOKEN_BUDGET = 2000
+HISTORY_SELECTION_RECENCY_DECAY = 0.98  # Score multiplier per newer entry
+HISTORY_SELECTION_MIN_SIMILARITY = 0.2  # Cosine similarity, for the vector selector
+HISTORY_SELECTION_DIMENSIONS = 256
+HISTORY_SELECTION_CACHE_SIZE = 4096  # Entries whose terms and vectors are kept between selections
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Configuration cache, see Data/ConfigurationCache.py
+
+CONFIG_CACHE_MAX_USERS = 512
+CONFIG_REVALIDATE_SECONDS = 10  # how stale a config changed by another process can be
+MISSING_FILE_VERSION = "missing"
+
+# Provider retries, see Utilities/Retry.py
+
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 8
+LLM_CALL_DEADLINE = 60  # seconds a single provider call, retries included, may take
+REQUEST_DEADLINE = 180  # seconds every provider call of a message may take
+RETRY_BUDGET_RATIO = 0.2  # retries earned per call
+RETRY_BUDGET_MAX = 20
+CIRCUIT_BREAKER_FAILURE_THRESHOLD = 5
+CIRCUIT_BREAKER_RESET_SECONDS = 30
+
 # Rate Limits
 
 BASE_LIMIT = 10000
@@ -78,6 +215,11 @@ EXTRACT_ELEMENTS_FROM_LIST = r'^\s*[-*]\s+(.*)$|^\s*\d+\.\s+(.*)$'
 # Standard Errors
 
 CANNOT_AFFORD_REQUEST = "INSUFFICIENT WEALTH DETECTED"  # I mean it's not wrong
+SYSTEM_CANNOT_AFFORD_GEMINI = "SYSTEM ERROR : INCAPABLE OF MAKING GEMINI REQUESTS"
+OPEN_AI_FLAGGED_REQUEST = "OpenAi ChatGpt Server Flagged Your Request as Inappropriate. Try again, it does this alot."
+
+# Responses the wrappers return in place of an answer, never to be cached or persisted
+ERROR_RESPONSES = frozenset({CANNOT_AFFORD_REQUEST, SYSTEM_CANNOT_AFFORD_GEMINI, OPEN_AI_FLAGGED_REQUEST})
 
 # Categorisation
 
@@ -85,7 +227,7 @@ DEFAULT_CATEGORY = "default"
 
 # Info
 
-DEFAULT_USER_PARAMETERS = ['email', 'augmentation_cost', 'select_category_cost', 'select_worker_cost', 'select_workflow_cost', 'questioning_cost', 'best_of_cost', 'loops_cost', 'internet_search_cost', 'summarise_workflows_cost', 'summarise_files_cost', 'user_context_cost']
+DEFAULT_USER_PARAMETERS = ['email', 'augmentation_cost', 'select_category_cost', 'select_worker_cost', 'select_workflow_cost', 'questioning_cost', 'best_of_cost', 'loops_cost', 'internet_search_cost', 'summarise_workflows_cost', 'summarise_files_cost', 'user_context_cost', 'summarise_history_cost']
 
 
 
@@ -3,6 +3,10 @@
 FAILED_TO_UPDATE_USER_BALANCE = "FAILED TO UPDATE USER BALANCE!"
 
 
+def failed_to_commit_cost_ledger(ledger_id: str):
+    return f"FAILED TO COMMIT COST LEDGER [{ledger_id}]! Its journal has been kept to be replayed"
+
+
 def failed_to_retrieve_user_balance(user_id: str):
     return f"Error retrieving balance for user_id {user_id}"
 
@@ -22,6 +26,7 @@ NO_RESPONSE_GEMINI_API = "Gemini API returned no response."
 NO_USAGE_DATA_GEMINI = "Gemini failed to send token usage metrics"
 NO_USAGE_DATA_OPEN_AI = "OpenAi failed to send token usage metrics"
 OPEN_AI_FLAGGED_REQUEST_INAPPROPRIATE = "OpenAi ChatGpt Flagged user request as Inappropriate"
+SIMULATED_FAILURE_LOCAL_LLM = "Local LLM simulated a provider failure"
 
 # Route Failures
 
@@ -85,6 +90,99 @@ def failed_to_create_user_topic(topic: str):
 
 FAILURE_TO_REVIEW_RELEVANT_HISTORY = "Failed to Retrieve relevant history"
 
+
+def unknown_history_selector(selector: str, default: str):
+    return f"Unknown history selector '{selector}', using '{default}'"
+
+
+def context_source_timed_out(source: str, timeout: float):
+    return f"Context source '{source}' did not respond within {timeout}s, continuing without it"
+
+
+def failure_to_gather_context(source: str):
+    return f"Failed to gather context from '{source}', continuing without it"
+
+# Background jobs
+
+
+def unknown_job(name: str):
+    return f"No handler registered for job '{name}'"
+
+
+EMPTY_PROVIDER_RESPONSE = "LLM provider returned an empty response"
+
+
+def circuit_open(provider: str):
+    return f"Circuit open for {provider}, failing fast until it resets"
+
+
+def retry_budget_exhausted(provider: str):
+    return f"Retry budget exhausted, not retrying {provider}"
+
+
+def retry_deadline_exceeded(provider: str, attempt: int):
+    return f"Deadline reached after {attempt} attempt(s) to call {provider}"
+
+
+def fatal_provider_error(provider: str, exception: Exception):
+    return f"{provider} rejected the request, not retrying: {exception}"
+
+
+def retrying_provider_call(provider: str, attempt: int, wait_time: float, exception: Exception):
+    return f"Attempt {attempt} to call {provider} failed: {exception}. Retrying in {wait_time:.2f} seconds..."
+
+
+def falling_back_to_provider(provider: str, fallback_provider: str, exception: Exception):
+    return f"{provider} unavailable ({exception}), falling back to {fallback_provider}"
+
+
+def failure_in_storage_batch(file_path: str):
+    return f"Failed to process {file_path} in a batch storage operation"
+
+
+def file_not_saved(file_path: str):
+    return f"File {file_path} could not be saved"
+
+
+def invalid_page_parameter(parameter: str, value: str):
+    return f"Invalid {parameter}: '{value}'"
+
+
+def failed_to_apply_schema_migration(version: int, exception: Exception):
+    return f"Failed to apply schema migration {version}, it will be retried on the next run: {exception}"
+
+
+DATA_MIGRATIONS_FAILED = "Failed to apply the pending data migrations"
+
+
+def query_plan_scans(query_name: str, operators: list):
+    return f"{query_name} plans a scan ({', '.join(operators)}), its match needs an index or a more specific pattern"
+
+
+def response_cache_redis_failure(exception: Exception):
+    return f"Response cache unable to reach Redis, using the in-process cache only: {exception}"
+
+
+def conversation_memory_redis_failure(exception: Exception):
+    return f"Conversation memory unable to reach Redis, using the in-process history only: {exception}"
+
+
+def conversation_summary_conflict(category_id: str, version: int):
+    return f"Conversation summary of category {category_id} moved on from version {version}, discarding this fold"
+
+
+def conversation_summary_failed(category_id: str, response: str):
+    return f"Failed to summarise the conversation of category {category_id}, got: {response!r}"
+
+
+def job_failed(job_id: str, attempt: int):
+    return f"Job {job_id} failed on attempt {attempt}"
+
+
+def job_abandoned(job_id: str, attempts: int):
+    return f"Job {job_id} abandoned after {attempts} attempts"
+
+
 # GENERIC
 
 NOT_IMPLEMENTED_IN_INTERFACE = "This method should be overridden by subclasses"
@@ -279,3 +279,16 @@ DETECT_RELEVANT_HISTORY_SYSTEM_MESSAGE = (
     "Just the list of numbers in square brackets, no commentary",
 )
 
+
+
+def summarise_conversation_system_message(max_words: int) -> str:
+    return (
+        "You keep a running summary of a conversation between a user and an AI assistant. "
+        "Update the previous summary, if there is one, with the conversation turns given. Keep the facts, decisions, "
+        "preferences and open questions later turns might depend on, drop pleasantries and repetition.\n"
+        f"Write at most {max_words} words of plain prose, no commentary"
+    )
+
+
+def conversation_summary_message(summary: str) -> str:
+    return f"Summary of the earlier conversation:\n{summary}"
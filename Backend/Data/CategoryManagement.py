@@ -1,6 +1,6 @@
 import logging
 import re
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, Future
 from typing import Optional
 
 import shortuuid
@@ -19,6 +19,7 @@ from Constants.Instructions import DEFAULT_USER_CATEGORISATION_INSTRUCTIONS, cat
 from Utilities.Contexts import set_category_context, get_category_context, set_message_context, set_user_context, \
     get_user_context, get_message_context
 from Utilities.Decorators.Decorators import specify_functionality_context
+from Utilities.Tracing import traced
 
 
 class CategoryManagement:
@@ -68,7 +69,8 @@ class CategoryManagement:
 
         category_reasoning = AiOrchestrator().execute(
             categorisation_system_messages(user_categorisation_instructions),
-            categorisation_inputs(content, llm_response, category_names)
+            categorisation_inputs(content, llm_response, category_names),
+            cache=True
         )
         logging.info(f"Category Reasoning: {category_reasoning}")
 
@@ -82,6 +84,7 @@ class CategoryManagement:
     # Define category context
 
     @staticmethod
+    @traced("node_creation")
     def create_initial_user_prompt_and_possibly_new_category(category: str, user_prompt: str):
         """
         Defines a blank user_prompt to be populated later at the end of the request, using the original user_prompt as
@@ -94,17 +97,89 @@ class CategoryManagement:
         :param user_prompt: used as context for deciding the category's instructions
         :return:
         """
-        categories = nodeDB().list_category_names()
+        category_id = nodeDB().create_user_prompt_node_in_existing_category(category)
 
-        if category not in categories:
+        if not category_id:
             category_id, instructions, color = CategoryManagement.define_new_category(category, user_prompt)
             nodeDB().create_category_and_user_prompt(category_id, category, instructions, color)
-        else:
-            category_id = nodeDB().get_category_id(category)
-            nodeDB().create_user_prompt_node(category)
 
         set_category_context(category_id)
 
+    @staticmethod
+    def speculative_categorisation_enabled(tag_category: Optional[str] = None) -> bool:
+        """Whether the prompt should be answered while it's categorised, there's nothing to speculate on if tagged"""
+        config = Configuration.load_config()
+        return not tag_category and config.get('optimisation', {}).get('speculative_categorisation', False)
+
+    @staticmethod
+    def categorise_in_background(user_prompt: str) -> Future:
+        """
+        Starts categorising the prompt in the background so the worker can start responding immediately.
+
+        The user prompt node is created straight away, unassigned, so costs can be expensed against it. Until
+        categorisation finishes the category context is a Future of the category id: anything that actually needs the
+        category, e.g. the category system message or saving a file, waits on it, everything else carries on.
+        Once the category is known (and created if new) the prompt node is re-parented to it.
+
+        :param user_prompt: The prompt to categorise
+        :return: A Future of the category name
+        """
+        nodeDB().create_unassigned_user_prompt_node()
+
+        category_id_future = Future()
+        set_category_context(category_id_future)
+        user_id = get_user_context()
+        message_id = get_message_context()
+
+        def wrapped_categorise(user_prompt, user_id, message_id):
+            set_user_context(user_id)
+            set_message_context(message_id)
+
+            try:
+                try:
+                    category = CategoryManagement.determine_category(user_prompt)
+                    category_id = CategoryManagement.assign_user_prompt_to_category(category, user_prompt)
+                except Exception:
+                    logging.exception(f"Failed to categorise prompt [{message_id}], setting to '{DEFAULT_CATEGORY}'")
+                    category = DEFAULT_CATEGORY
+                    category_id = CategoryManagement.assign_user_prompt_to_category(category, user_prompt)
+            except Exception as e:
+                category_id_future.set_exception(e)
+                raise
+
+            category_id_future.set_result(category_id)
+            return category
+
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='Categorisation')
+        category_future = executor.submit(
+            copy_current_request_context(wrapped_categorise),
+            user_prompt,
+            user_id,
+            message_id
+        )
+        executor.shutdown(wait=False)
+
+        return category_future
+
+    @staticmethod
+    @traced("node_creation")
+    def assign_user_prompt_to_category(category: str, user_prompt: str) -> str:
+        """
+        The speculative counterpart to create_initial_user_prompt_and_possibly_new_category, the user prompt node
+        already exists and is re-parented to the category, which is created first if need be.
+
+        :param category: The category name that has been decided upon
+        :param user_prompt: used as context for deciding the category's instructions
+        :return: The id of the category
+        """
+        category_id = nodeDB().assign_user_prompt_to_existing_category(category)
+
+        if not category_id:
+            category_id, instructions, color = CategoryManagement.define_new_category(category, user_prompt)
+            nodeDB().create_category_and_assign_user_prompt(category_id, category, instructions, color)
+
+        return category_id
+
     @staticmethod
     def possibly_create_new_category(category_name: str) -> str | None:
         """
@@ -231,6 +306,7 @@ class CategoryManagement:
         return category_id
 
     @staticmethod
+    @traced("categorisation")
     def determine_category(user_prompt: str, tag_category: Optional[str] = None) -> str:
         """
         Determine the category for the user prompt.
@@ -274,7 +350,8 @@ class CategoryManagement:
             if use_ai:
                 ai_response = AiOrchestrator().execute(
                     [SELECT_COLOUR_SYSTEM_MESSAGE],
-                    user_prompts
+                    user_prompts,
+                    cache=True
                 )
                 ai_color = ai_response.strip()
                 if Colour.is_valid_hex_color(ai_color):
@@ -305,7 +382,8 @@ class CategoryManagement:
                     [
                         category_instructions_prompt(category_name),
                         additional_context,
-                    ]
+                    ],
+                    cache=True
                 )
                 instructions = instructions.strip()
 
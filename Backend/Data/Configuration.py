@@ -1,6 +1,7 @@
 import os
 from typing import Mapping, Dict, Any
 
+from Data.ConfigurationCache import ConfigurationCache
 from Data.Files.StorageMethodology import StorageMethodology
 from Utilities.Contexts import get_user_context, get_user_configuration, set_user_configuration
 from Utilities.Decorators.Decorators import handle_errors
@@ -36,22 +37,16 @@ class Configuration:
         Loads the configuration from the baseline YAML file then merges the user's config on top,
         extracting the combined values.
 
+        The parsed files are shared between requests by ConfigurationCache, and the result is memoized for the rest of
+        the request.
+
         :param yaml_file: The path to the YAML file
         :returns: A dictionary containing the extracted configuration values
         :raises FileNotFoundError: If the specified YAML file does not exist.
         """
         full_config = get_user_configuration()
         if not full_config:
-            default_config = StorageMethodology.select().load_yaml(yaml_file)
-            user_config = StorageMethodology.select().load_yaml(f"{get_user_context()}.yaml")
-
-            # Merge user_config into config
-            full_config = Configuration.deep_merge(default_config, user_config)
-            if user_config:
-                full_config = Configuration.deep_merge(default_config, user_config)
-            else:
-                full_config = default_config
-
+            full_config = ConfigurationCache().load(yaml_file, get_user_context(), Configuration.deep_merge)
             set_user_configuration(full_config)
 
         return full_config
@@ -81,6 +76,8 @@ class Configuration:
 
         # Save the updated configuration back to the YAML file
         file_storage.save_yaml(user_config_path, user_config)
+        ConfigurationCache().invalidate(get_user_context())
+        set_user_configuration(None)
 
 
 if __name__ == '__main__':
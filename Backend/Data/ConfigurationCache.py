@@ -0,0 +1,111 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from Constants.Constants import CONFIG_CACHE_MAX_USERS, CONFIG_REVALIDATE_SECONDS
+from Data.Files.StorageMethodology import StorageMethodology
+
+
+class _CachedYaml:
+    """A parsed YAML file and the storage version it was parsed from"""
+
+    def __init__(self, data: Dict[str, Any], version: Optional[str]):
+        self.data = data
+        self.version = version
+        self.checked_at = time.monotonic()
+
+
+class ConfigurationCache:
+    """
+    Process wide cache of the parsed configuration files, so a request doesn't re-read and re-parse Config.yaml and the
+    user's overlay from storage.
+
+    The base config is held once, user overlays are kept for the CONFIG_CACHE_MAX_USERS most recently active users,
+    together with the merged config. A cached file is revalidated at most every CONFIG_REVALIDATE_SECONDS, by its
+    modification time locally or a conditional GET on S3, so changes made by another process are picked up. Changes
+    made through Configuration.update_config_field invalidate the user's entry immediately.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        """Create a new instance or return the existing one."""
+        if cls._instance is None:
+            cls._instance = super(ConfigurationCache, cls).__new__(cls)
+            cls._instance._lock = threading.Lock()
+            cls._instance.base: Dict[str, _CachedYaml] = {}
+            cls._instance.users: OrderedDict[str, _CachedYaml] = OrderedDict()
+            cls._instance.merged: Dict[str, tuple] = {}
+            # Bumped on invalidation, so a load that raced an update doesn't cache what it read before the update
+            cls._instance.generation = 0
+        return cls._instance
+
+    @staticmethod
+    def _refresh(cached: Optional[_CachedYaml], yaml_path: str) -> _CachedYaml:
+        """Returns the cached file if it's still current, otherwise the file as it is in storage now"""
+        if cached and time.monotonic() - cached.checked_at < CONFIG_REVALIDATE_SECONDS:
+            return cached
+
+        data, version = StorageMethodology.select().load_yaml_if_modified(
+            yaml_path, cached.version if cached else None
+        )
+        if data is None and cached:
+            cached.checked_at = time.monotonic()
+            return cached
+        return _CachedYaml(data or {}, version)
+
+    def load(
+        self,
+        yaml_file: str,
+        user_id: Optional[str],
+        merge: Callable[[Dict[str, Any], Dict[str, Any]], Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        The base config with the user's overlay merged on top.
+
+        :param yaml_file: The base config file
+        :param user_id: The user whose overlay, <user_id>.yaml, is applied
+        :param merge: Merges the overlay into (a copy of) the base config
+        :return: A copy of the merged config, free for the caller to modify
+        """
+        user_path = f"{user_id}.yaml"
+        with self._lock:
+            generation = self.generation
+            cached_base = self.base.get(yaml_file)
+            cached_user = self.users.get(user_path)
+        base = self._refresh(cached_base, yaml_file)
+        user = self._refresh(cached_user, user_path)
+
+        with self._lock:
+            if generation != self.generation:
+                # Invalidated while loading, what was read may predate the change so it isn't cached
+                return merge(copy.deepcopy(base.data), copy.deepcopy(user.data))
+
+            self.base[yaml_file] = base
+            self.users[user_path] = user
+            self.users.move_to_end(user_path)
+            while len(self.users) > CONFIG_CACHE_MAX_USERS:
+                evicted, _ = self.users.popitem(last=False)
+                self.merged.pop(evicted, None)
+
+            merged = self.merged.get(user_path)
+            if merged is None or merged[0] is not base or merged[1] is not user:
+                merged = (base, user, merge(copy.deepcopy(base.data), copy.deepcopy(user.data)))
+                self.merged[user_path] = merged
+
+        return copy.deepcopy(merged[2])
+
+    def invalidate(self, user_id: Optional[str] = None) -> None:
+        """Drops the user's cached config, or every cached config if no user is given"""
+        with self._lock:
+            self.generation += 1
+            if user_id is None:
+                self.base.clear()
+                self.users.clear()
+                self.merged.clear()
+                return
+
+            self.users.pop(f"{user_id}.yaml", None)
+            self.merged.pop(f"{user_id}.yaml", None)
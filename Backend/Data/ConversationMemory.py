@@ -0,0 +1,219 @@
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict, deque
+from typing import Deque, List, NamedTuple, Optional, Tuple
+
+from Constants.Constants import CONVERSATION_MEMORY_TOKENS, DEFAULT_CONVERSATION_MEMORY_TOKENS, \
+    CONVERSATION_MEMORY_ENTRIES, CONVERSATION_MEMORY_MAX_CONVERSATIONS, CONVERSATION_MEMORY_TTL, \
+    CONVERSATION_MEMORY_KEY_PREFIX, DEFAULT_ENCODING
+from Constants.Exceptions import conversation_memory_redis_failure
+
+
+class MemoryEntry(NamedTuple):
+    """A prompt, the response to it and roughly how many tokens the pair takes up when sent back as history"""
+    prompt: str
+    response: str
+    tokens: int
+
+    @classmethod
+    def create(cls, prompt: str, response: str) -> "MemoryEntry":
+        # Roughly 4 characters per token, plus the per message overhead, without loading a tokenizer
+        return cls(prompt, response, (len(prompt) + len(response) + 2) // 4 + 4)
+
+
+class _Conversation:
+    """
+    One user's history in one category, a ring buffer of entries oldest first with their running token total, and the
+    summary of the entries folded out of it, if it's been read
+    """
+
+    def __init__(self, entries: List[MemoryEntry] = ()):
+        self.entries: Deque[MemoryEntry] = deque(maxlen=CONVERSATION_MEMORY_ENTRIES)
+        self.tokens = 0
+        self.summary: Optional[str] = None
+        self.summary_version: Optional[int] = None
+        for entry in entries:
+            self.append(entry, float("inf"))
+
+    def append(self, entry: MemoryEntry, token_budget: float) -> None:
+        if len(self.entries) == self.entries.maxlen:
+            self.tokens -= self.entries[0].tokens
+        self.entries.append(entry)
+        self.tokens += entry.tokens
+
+        # The newest entry is always kept, even if it's over the budget on its own
+        while self.tokens > token_budget and len(self.entries) > 1:
+            self.tokens -= self.entries.popleft().tokens
+
+    def window(self, token_budget: int) -> List[MemoryEntry]:
+        """The newest entries that fit within the token budget, oldest first"""
+        window, tokens = [], 0
+        for entry in reversed(self.entries):
+            tokens += entry.tokens
+            if tokens > token_budget:
+                break
+            window.append(entry)
+        window.reverse()
+        return window
+
+
+class ConversationMemory:
+    """
+    Each user's recent prompt-response pairs, by category, given back to the LLM as history.
+
+    A conversation is a ring buffer of at most CONVERSATION_MEMORY_ENTRIES entries, trimmed from the oldest end to
+    CONVERSATION_MEMORY_TOKENS tokens, so appending and reading a window of the newest entries don't depend on how long
+    the conversation has gone on. Conversations are held in process for the CONVERSATION_MEMORY_MAX_CONVERSATIONS most
+    recently active users and categories, so memory stays flat however many there are.
+
+    If the app has a Redis connection (REDISCLOUD_URL), conversations are also written through to Redis, trimmed the
+    same way and expiring after CONVERSATION_MEMORY_TTL seconds, so they survive restarts and a conversation evicted
+    here, or started in another process, is read back from Redis.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        """Create a new instance or return the existing one."""
+        if cls._instance is None:
+            cls._instance = super(ConversationMemory, cls).__new__(cls)
+            cls._instance._lock = threading.Lock()
+            cls._instance.conversations: OrderedDict[Tuple[str, str], _Conversation] = OrderedDict()
+            cls._instance.token_budget = int(os.getenv(CONVERSATION_MEMORY_TOKENS, DEFAULT_CONVERSATION_MEMORY_TOKENS))
+        return cls._instance
+
+    @staticmethod
+    def _redis():
+        """The app's Redis connection, imported lazily as App.extensions pulls in the rest of the app"""
+        try:
+            from App.extensions import r
+            return r
+        except ImportError:
+            return None
+
+    @staticmethod
+    def _redis_key(key: Tuple[str, str]) -> str:
+        return f"{CONVERSATION_MEMORY_KEY_PREFIX}{key[0]}:{key[1]}"
+
+    def _load(self, key: Tuple[str, str]) -> List[MemoryEntry]:
+        redis_connection = self._redis()
+        if redis_connection is None:
+            return []
+
+        try:
+            stored = redis_connection.lrange(self._redis_key(key), 0, -1)
+            return [MemoryEntry(*json.loads(entry.decode(DEFAULT_ENCODING))) for entry in stored]
+        except Exception as e:
+            logging.warning(conversation_memory_redis_failure(e))
+            return []
+
+    def _conversation(self, user_id: Optional[str], category_id: Optional[str]) -> _Conversation:
+        key = (str(user_id), str(category_id))
+        with self._lock:
+            conversation = self.conversations.get(key)
+            if conversation is not None:
+                self.conversations.move_to_end(key)
+                return conversation
+
+        # Read outside the lock, so a slow Redis doesn't hold up other conversations
+        loaded = _Conversation(self._load(key))
+        with self._lock:
+            conversation = self.conversations.setdefault(key, loaded)
+            self.conversations.move_to_end(key)
+            while len(self.conversations) > CONVERSATION_MEMORY_MAX_CONVERSATIONS:
+                self.conversations.popitem(last=False)
+            return conversation
+
+    def append(self, user_id: Optional[str], category_id: Optional[str], prompt: str, response: str) -> MemoryEntry:
+        """Adds a prompt and its response to the end of the conversation, evicting the oldest entries over budget"""
+        conversation = self._conversation(user_id, category_id)
+        entry = MemoryEntry.create(prompt, response)
+        with self._lock:
+            conversation.append(entry, self.token_budget)
+            kept = len(conversation.entries)
+
+        redis_connection = self._redis()
+        if redis_connection is not None:
+            key = self._redis_key((str(user_id), str(category_id)))
+            try:
+                pipeline = redis_connection.pipeline()
+                pipeline.rpush(key, json.dumps(entry))
+                pipeline.ltrim(key, -kept, -1)
+                pipeline.expire(key, CONVERSATION_MEMORY_TTL)
+                pipeline.execute()
+            except Exception as e:
+                logging.warning(conversation_memory_redis_failure(e))
+        return entry
+
+    def entries(self, user_id: Optional[str], category_id: Optional[str]) -> List[MemoryEntry]:
+        """Every entry held for the conversation, oldest first"""
+        conversation = self._conversation(user_id, category_id)
+        with self._lock:
+            return list(conversation.entries)
+
+    def window(self, user_id: Optional[str], category_id: Optional[str], token_budget: int) -> List[MemoryEntry]:
+        """The newest entries of the conversation that fit within the token budget, oldest first"""
+        conversation = self._conversation(user_id, category_id)
+        with self._lock:
+            return conversation.window(token_budget)
+
+    def tokens(self, user_id: Optional[str], category_id: Optional[str]) -> int:
+        """How many tokens the conversation's entries add up to"""
+        conversation = self._conversation(user_id, category_id)
+        with self._lock:
+            return conversation.tokens
+
+    def summary(self, user_id: Optional[str], category_id: Optional[str]) -> Tuple[Optional[str], Optional[int]]:
+        """The summary of the conversation's folded entries and its version, a None version if it hasn't been read"""
+        conversation = self._conversation(user_id, category_id)
+        with self._lock:
+            return conversation.summary, conversation.summary_version
+
+    def set_summary(
+        self,
+        user_id: Optional[str],
+        category_id: Optional[str],
+        summary: Optional[str],
+        version: int
+    ) -> None:
+        conversation = self._conversation(user_id, category_id)
+        with self._lock:
+            conversation.summary, conversation.summary_version = summary, version
+
+    def fold(
+        self,
+        user_id: Optional[str],
+        category_id: Optional[str],
+        folded: List[MemoryEntry],
+        summary: str,
+        version: int
+    ) -> None:
+        """
+        Replaces the oldest entries of the conversation with a summary of them.
+
+        :param folded: The entries summarised, oldest first. Entries appended since are kept, as are any no longer at
+         the start of the conversation
+        :param summary: The summary of the folded entries, and of those folded before them
+        :param version: The summary's version
+        """
+        conversation = self._conversation(user_id, category_id)
+        with self._lock:
+            removed = 0
+            # Some of the folded entries may have been evicted already, they're always the oldest
+            while conversation.entries and removed < len(folded) and conversation.entries[0] in folded:
+                conversation.tokens -= conversation.entries.popleft().tokens
+                removed += 1
+            conversation.summary, conversation.summary_version = summary, version
+
+        redis_connection = self._redis()
+        if redis_connection is not None and removed:
+            try:
+                redis_connection.ltrim(self._redis_key((str(user_id), str(category_id))), removed, -1)
+            except Exception as e:
+                logging.warning(conversation_memory_redis_failure(e))
+
+    def clear(self) -> None:
+        with self._lock:
+            self.conversations.clear()
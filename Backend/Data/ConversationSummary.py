@@ -0,0 +1,126 @@
+import logging
+from typing import List, Optional, Tuple
+
+from AiOrchestration.AiOrchestrator import AiOrchestrator
+from Constants.Constants import HISTORY_SUMMARY_THRESHOLD, HISTORY_SUMMARY_KEEP_TOKENS, HISTORY_SUMMARY_MAX_WORDS, \
+    ERROR_RESPONSES
+from Constants.Exceptions import conversation_summary_conflict, conversation_summary_failed
+from Constants.Instructions import summarise_conversation_system_message
+from Data.Configuration import Configuration
+from Data.ConversationMemory import ConversationMemory, MemoryEntry
+from Data.Neo4j.NodeDatabaseManagement import NodeDatabaseManagement as nodeDB
+from Utilities.Contexts import get_user_context, get_category_context
+from Utilities.Decorators.Decorators import specify_functionality_context
+from Utilities.JobQueue import JobQueue
+
+
+class ConversationSummary:
+    """
+    A running summary of each conversation's older history, for optimisation.history_summary.
+
+    Once a conversation's entries add up to more than the threshold (optimisation.history_summary_threshold), a
+    background job folds all but its newest HISTORY_SUMMARY_KEEP_TOKENS tokens of entries into the summary, and they're
+    dropped from ConversationMemory. The worker sends the summary in place of the entries it replaced, so the history
+    sent with every call stays around the threshold however long the conversation goes on.
+
+    Summaries are stored on the CATEGORY node with a version, bumped on each fold, so they survive restarts. A fold only
+    applies to the version it was built from, one that raced another is discarded.
+    """
+
+    @staticmethod
+    def enabled() -> bool:
+        return bool(Configuration.load_config().get('optimisation', {}).get('history_summary', False))
+
+    @staticmethod
+    def threshold() -> int:
+        optimisation = Configuration.load_config().get('optimisation', {})
+        return int(optimisation.get('history_summary_threshold', HISTORY_SUMMARY_THRESHOLD))
+
+    @staticmethod
+    def current(user_id: Optional[str], category_id: Optional[str]) -> Tuple[Optional[str], int]:
+        """The conversation's summary and its version, read from the category the first time it's needed"""
+        summary, version = ConversationMemory().summary(user_id, category_id)
+        if version is None:
+            summary, version = nodeDB().get_category_conversation_summary(category_id) or (None, 0)
+            ConversationMemory().set_summary(user_id, category_id, summary, version)
+        return summary, version
+
+    @staticmethod
+    def schedule(user_id: Optional[str], category_id: Optional[str]) -> None:
+        """
+        Queues a fold of the conversation if it's over the threshold. Keyed by the summary version and the
+        conversation's token total, so it's queued once per version until the conversation changes: a fold that had
+        nothing to do doesn't stop the next one being queued.
+        """
+        if category_id is None:
+            return
+        tokens = ConversationMemory().tokens(user_id, category_id)
+        if tokens <= ConversationSummary.threshold():
+            return
+
+        _, version = ConversationSummary.current(user_id, category_id)
+        JobQueue().enqueue(
+            SUMMARISE_HISTORY_JOB,
+            {"user_id": user_id, "category_id": category_id},
+            f"{user_id}:{category_id}:{version}:{tokens}"
+        )
+
+    @staticmethod
+    def entries_to_fold(
+        entries: List[MemoryEntry],
+        keep_tokens: int = HISTORY_SUMMARY_KEEP_TOKENS
+    ) -> List[MemoryEntry]:
+        """Every entry but the newest that fit within keep_tokens, the newest entry is always kept"""
+        kept, tokens = 1, entries[-1].tokens if entries else 0
+        while kept < len(entries) and tokens + entries[-kept - 1].tokens <= keep_tokens:
+            kept += 1
+            tokens += entries[-kept].tokens
+        return entries[:max(0, len(entries) - kept)]
+
+    @staticmethod
+    @specify_functionality_context("summarise_history")
+    def summarise(summary: Optional[str], entries: List[MemoryEntry]) -> str:
+        """The previous summary updated with the entries"""
+        turns = "\n\n".join(f"User: {entry.prompt}\nAssistant: {entry.response}" for entry in entries)
+        return AiOrchestrator().execute(
+            [summarise_conversation_system_message(HISTORY_SUMMARY_MAX_WORDS)],
+            [f"Previous summary:\n{summary or 'None yet'}", f"Conversation turns:\n{turns}"]
+        )
+
+    @staticmethod
+    def fold() -> None:
+        """
+        Folds the older entries of the current user's conversation in the current category into its summary.
+        Raises on failure so the job is retried.
+        """
+        user_id, category_id = get_user_context(), get_category_context()
+        memory = ConversationMemory()
+        if memory.tokens(user_id, category_id) <= ConversationSummary.threshold():
+            return
+
+        summary, version = ConversationSummary.current(user_id, category_id)
+        folded = ConversationSummary.entries_to_fold(memory.entries(user_id, category_id))
+        if not folded:
+            return
+
+        new_summary = ConversationSummary.summarise(summary, folded)
+        if not new_summary or new_summary in ERROR_RESPONSES:
+            # The folded entries are only dropped for a real summary, otherwise the job is failed and retried
+            raise Exception(conversation_summary_failed(category_id, new_summary))
+
+        new_version = nodeDB().update_category_conversation_summary(category_id, new_summary, version)
+        if new_version is None:
+            logging.warning(conversation_summary_conflict(category_id, version))
+            latest = nodeDB().get_category_conversation_summary(category_id)
+            if latest:
+                memory.set_summary(user_id, category_id, *latest)
+            return
+
+        memory.fold(user_id, category_id, folded, new_summary, new_version)
+        logging.info(f"Folded {len(folded)} entries into the conversation summary of category {category_id}, "
+                     f"version {new_version}")
+
+
+SUMMARISE_HISTORY_JOB = "summarise_history"
+
+JobQueue().register(SUMMARISE_HISTORY_JOB, ConversationSummary.fold)
@@ -0,0 +1,298 @@
+import json
+import logging
+import os
+import itertools
+import threading
+from typing import Dict, Optional, Any
+
+from AiOrchestration.AiModel import AiModel
+from AiOrchestration.ChatGptModel import ChatGptModel
+from AiOrchestration.GeminiModel import GeminiModel
+from Constants.Constants import COST_LEDGER_DIRECTORY, DEFAULT_ENCODING
+from Constants.Exceptions import failed_to_commit_cost_ledger
+from Data.Neo4j.NodeDatabaseManagement import NodeDatabaseManagement as NodeDB
+from Utilities.Contexts import get_message_context, get_user_context
+from Utilities.Decorators.Decorators import handle_errors
+from Utilities.JobQueue import JobQueue
+
+# 3 cents is the point where a possible overdraft is basically negligible
+OVERDRAFT_LIMIT = 0.03
+
+SYSTEM_BALANCES = {
+    GeminiModel: "gemini_balance",
+    ChatGptModel: "open_ai_balance",
+}
+
+
+class _Ledger:
+    """The charges of a single request, aggregated by what they're charged against"""
+
+    def __init__(self, ledger_id: str, user_id: str):
+        self.ledger_id = ledger_id
+        self.user_id = user_id
+        # Held while the journal is written, so charges to other requests aren't held up by the disk sync
+        self.lock = threading.Lock()
+        self.closed = False
+        self.reservations: Dict[int, float] = {}
+        self.user_total = 0.0
+        self.nodes: Dict[str, float] = {}
+        self.functionalities: Dict[str, float] = {}
+        self.system: Dict[str, float] = {}
+
+    def add(self, charge: Dict[str, Any]) -> None:
+        amount = charge["amount"]
+        self.user_total += amount
+        if charge.get("node_id"):
+            self.nodes[charge["node_id"]] = self.nodes.get(charge["node_id"], 0.0) + amount
+        if charge.get("functionality"):
+            property_name = charge["functionality"] + "_cost"
+            self.functionalities[property_name] = self.functionalities.get(property_name, 0.0) + amount
+        if charge.get("system"):
+            self.system[charge["system"]] = self.system.get(charge["system"], 0.0) + amount
+
+
+class _Account:
+    """A user's balance, shared by all of their requests in progress so they can't each spend it"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.balance: Optional[float] = None
+        self.ledgers: Dict[str, _Ledger] = {}
+
+    def spent(self) -> float:
+        """What the user's requests in progress have been charged or have reserved, not yet in the database"""
+        return sum(ledger.user_total + sum(ledger.reservations.values()) for ledger in self.ledgers.values())
+
+
+class CostLedger:
+    """
+    Aggregates the cost accounting of a request in memory, committing it to the database in one transaction when the
+    request ends rather than making 4-6 writes for every LLM call.
+
+    The user's balance is read once while they have requests in progress and shared between them. Estimates for calls
+    in flight are reserved against it in memory, less what all of the user's open requests have spent or reserved, and
+    what each commits is taken off it.
+    Every charge is appended to a write-ahead journal (one file per request in COST_LEDGER_DIRECTORY) before it's
+    applied, so if the process dies before committing, the journal is replayed on the next start. Commits are
+    idempotent, recorded in a COST_LEDGER node, so a journal is never charged twice.
+
+    Outside a ledger (e.g. HTTP routes) AiWrapper falls back to writing each charge immediately.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        """Create a new instance or return the existing one."""
+        if cls._instance is None:
+            cls._instance = super(CostLedger, cls).__new__(cls)
+            cls._instance._lock = threading.Lock()
+            cls._instance.ledgers: Dict[str, _Ledger] = {}
+            cls._instance.accounts: Dict[str, _Account] = {}
+            cls._instance._reservation_ids = itertools.count(1)
+            cls._instance.journal_directory = os.getenv(
+                COST_LEDGER_DIRECTORY,
+                os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../UserData', 'CostLedger')
+            )
+            os.makedirs(cls._instance.journal_directory, exist_ok=True)
+        return cls._instance
+
+    def _journal_path(self, ledger_id: str) -> str:
+        return os.path.join(self.journal_directory, f"{ledger_id}.jsonl")
+
+    def open(self, ledger_id: str) -> None:
+        """Starts collecting the charges of the current user's request, keyed by its message id"""
+        user_id = get_user_context()
+        with self._lock:
+            ledger = self.ledgers[ledger_id] = _Ledger(ledger_id, user_id)
+            self.accounts.setdefault(user_id, _Account()).ledgers[ledger_id] = ledger
+
+    def _active(self) -> Optional[_Ledger]:
+        message_id = get_message_context()
+        return self.ledgers.get(message_id) if message_id else None
+
+    def reserve(self, cost_estimate: float) -> Optional[int]:
+        """
+        Reserves the estimated cost of an LLM call against the user's balance, less what all of their requests in
+        progress have already spent or reserved.
+
+        :return: A token to release the reservation with once the call ends, 0 if the user can't afford the call, None
+         if there's no ledger for the current request
+        """
+        with self._lock:
+            ledger = self._active()
+            account = self.accounts.get(ledger.user_id) if ledger else None
+        if account is None:
+            return None
+
+        # Read once per user, under the account's lock so their other requests don't each read it
+        with account.lock:
+            if account.balance is None:
+                account.balance = NodeDB().get_user_balance()
+
+        with self._lock:
+            available = account.balance - account.spent()
+            if available - cost_estimate < -OVERDRAFT_LIMIT:
+                return 0
+
+            reservation = next(self._reservation_ids)
+            ledger.reservations[reservation] = cost_estimate
+            return reservation
+
+    def release(self, reservation: int) -> None:
+        """Releases a reservation once its call has ended, its actual cost, if any, has been recorded by then"""
+        with self._lock:
+            ledger = self._active()
+            if ledger is not None:
+                ledger.reservations.pop(reservation, None)
+
+    def record(self, total_cost: float, model: AiModel, functionality: Optional[str]) -> bool:
+        """
+        Charges the cost of an LLM call to the current request's ledger. Its reservation is released separately, once
+        the call ends, see AiWrapper.releases_reservation.
+
+        :return: False if there's no ledger for the current request, the charge should then be written immediately
+        """
+        charge = {
+            "amount": total_cost,
+            "node_id": get_message_context(),
+            "functionality": functionality,
+            "system": SYSTEM_BALANCES.get(type(model)),
+        }
+
+        with self._lock:
+            ledger = self._active()
+        if ledger is None:
+            return False
+
+        with ledger.lock:
+            if ledger.closed:
+                return False
+
+            with open(self._journal_path(ledger.ledger_id), "a", encoding=DEFAULT_ENCODING) as journal:
+                journal.write(json.dumps({**charge, "user_id": ledger.user_id}) + "\n")
+                journal.flush()
+                os.fsync(journal.fileno())
+
+            with self._lock:
+                ledger.add(charge)
+
+        return True
+
+    def _close(self, ledger_id: str) -> Optional[_Ledger]:
+        """Stops the ledger taking charges, it still counts against the user's balance until settled"""
+        with self._lock:
+            ledger = self.ledgers.pop(ledger_id, None)
+        if ledger is None:
+            return None
+
+        # Waits for a charge being journalled
+        with ledger.lock:
+            ledger.closed = True
+        return ledger
+
+    def _settle(self, ledger: _Ledger) -> None:
+        """Takes what a closed ledger spent off the user's shared balance, once it's been committed or journalled"""
+        with self._lock:
+            ledger.reservations.clear()
+            account = self.accounts.get(ledger.user_id)
+            if account is None:
+                return
+
+            account.ledgers.pop(ledger.ledger_id, None)
+            if account.balance is not None:
+                account.balance -= ledger.user_total
+            if not account.ledgers:
+                # Read again on their next request, picking up top ups
+                del self.accounts[ledger.user_id]
+
+    @handle_errors()
+    def commit(self, ledger_id: str) -> None:
+        """Writes the request's charges to the database in a single transaction and clears its journal"""
+        ledger = self._close(ledger_id)
+        if ledger is None:
+            self._remove_journal(ledger_id)
+            return
+        if ledger.user_total <= 0:
+            self._settle(ledger)
+            self._remove_journal(ledger_id)
+            return
+
+        try:
+            NodeDB().commit_cost_ledger(
+                ledger.ledger_id,
+                ledger.user_id,
+                ledger.user_total,
+                ledger.nodes,
+                ledger.functionalities,
+                ledger.system
+            )
+            self._remove_journal(ledger_id)
+            logging.info(f"Cost ledger [{ledger_id}] committed: ${ledger.user_total}")
+        except Exception:
+            # The journal is kept, a background job retries the commit from it
+            logging.exception(failed_to_commit_cost_ledger(ledger_id))
+            JobQueue().enqueue(COMMIT_COST_LEDGER_JOB, {"ledger_id": ledger_id}, ledger_id)
+        finally:
+            self._settle(ledger)
+
+    def _remove_journal(self, ledger_id: str) -> None:
+        if os.path.exists(self._journal_path(ledger_id)):
+            os.remove(self._journal_path(ledger_id))
+
+    def replay(self, ledger_id: str) -> None:
+        """Commits a request's charges from its journal, a no-op if they were already committed"""
+        path = self._journal_path(ledger_id)
+        if not os.path.exists(path):
+            return
+
+        ledger = None
+        with open(path, "r", encoding=DEFAULT_ENCODING) as journal:
+            for line in journal:
+                if not line.strip():
+                    continue
+                try:
+                    charge = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn final write, the charge was never applied
+                    logging.warning(f"Skipping incomplete cost ledger journal entry [{ledger_id}]: {line}")
+                    continue
+
+                ledger = ledger or _Ledger(ledger_id, charge["user_id"])
+                ledger.add(charge)
+
+        if ledger:
+            NodeDB().commit_cost_ledger(
+                ledger.ledger_id,
+                ledger.user_id,
+                ledger.user_total,
+                ledger.nodes,
+                ledger.functionalities,
+                ledger.system
+            )
+
+        os.remove(path)
+        logging.info(f"Cost ledger [{ledger_id}] replayed from its journal")
+
+    @handle_errors()
+    def recover(self) -> None:
+        """Replays the journals of requests that never committed, e.g. because the process crashed"""
+        with self._lock:
+            open_ledgers = set(self.ledgers)
+
+        for file_name in os.listdir(self.journal_directory):
+            ledger_id = file_name.removesuffix(".jsonl")
+            if file_name.endswith(".jsonl") and ledger_id not in open_ledgers:
+                try:
+                    self.replay(ledger_id)
+                except Exception:
+                    logging.exception(failed_to_commit_cost_ledger(ledger_id))
+
+
+COMMIT_COST_LEDGER_JOB = "commit_cost_ledger"
+
+
+def _replay_job(ledger_id: str):
+    CostLedger().replay(ledger_id)
+
+
+JobQueue().register(COMMIT_COST_LEDGER_JOB, _replay_job)
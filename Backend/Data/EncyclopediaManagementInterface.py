@@ -124,7 +124,8 @@ class EncyclopediaManagementInterface:
                 selected_topic_raw = AiOrchestrator().execute(
                     [SELECT_TOPIC_SYSTEM_MESSAGE],
                     [select_topic_prompt(term),
-                     string_of_existing_topics_prompt(user_topics)]
+                     string_of_existing_topics_prompt(user_topics)],
+                    cache=True
                 )
                 selected_topic = selected_topic_raw.strip("'")
 
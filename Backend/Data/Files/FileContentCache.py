@@ -0,0 +1,159 @@
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from Constants.Constants import FILE_CACHE_MAX_BYTES, DEFAULT_FILE_CACHE_MAX_BYTES, FILE_CACHE_MAX_ENTRY_BYTES, \
+    FILE_CACHE_REVALIDATE_SECONDS
+
+# Concurrent misses on the same path wait on one read instead of each fetching the file, striped to bound the locks
+LOCK_STRIPES = 64
+
+
+class _CachedFile:
+    """The content of a file and the storage version it was read at"""
+
+    def __init__(self, owner: str, content: str, version: str):
+        self.owner = owner
+        self.content = content
+        self.version = version
+        self.size = sys.getsizeof(content)
+        self.checked_at = time.monotonic()
+
+
+class FileContentCache:
+    """
+    Read-through cache of file contents in front of StorageBase.read_file, so a file referenced by every page of a
+    workflow, or by prompt after prompt, is only downloaded once.
+
+    Entries are keyed by storage path and bounded by their total size in memory (FILE_CACHE_MAX_BYTES), evicting the
+    least recently read first, files over FILE_CACHE_MAX_ENTRY_BYTES aren't cached. A cached file is revalidated at
+    most every FILE_CACHE_REVALIDATE_SECONDS, by its modification time locally or a conditional GET on S3 which doesn't
+    transfer the file if its ETag is unchanged. Saving or moving a file through a storage manager invalidates it.
+
+    Hits, revalidations, misses and the bytes served from memory are counted.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        """Create a new instance or return the existing one."""
+        if cls._instance is None:
+            cls._instance = super(FileContentCache, cls).__new__(cls)
+            cls._instance._lock = threading.Lock()
+            cls._instance._read_locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+            cls._instance.entries: OrderedDict[str, _CachedFile] = OrderedDict()
+            cls._instance.max_bytes = int(os.getenv(FILE_CACHE_MAX_BYTES, DEFAULT_FILE_CACHE_MAX_BYTES))
+            cls._instance.bytes = 0
+            # Bumped on invalidation, so a read that raced a save doesn't cache what it read before the save
+            cls._instance.generation = 0
+            cls._instance.counters: Dict[str, int] = {
+                "hits": 0, "revalidated": 0, "misses": 0, "evictions": 0, "bytes_saved": 0
+            }
+        return cls._instance
+
+    @staticmethod
+    def _key(file_path: str) -> str:
+        return file_path.replace('\\', '/')
+
+    def _fresh(self, key: str, owner: str) -> Optional[_CachedFile]:
+        """The cached file if it was checked recently enough to be served without asking the storage"""
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None or entry.owner != owner:
+                return None
+            if time.monotonic() - entry.checked_at >= FILE_CACHE_REVALIDATE_SECONDS:
+                return None
+
+            self.entries.move_to_end(key)
+            self.counters["hits"] += 1
+            self.counters["bytes_saved"] += entry.size
+            return entry
+
+    def read(self, storage, file_path: str) -> str:
+        """
+        The content of a file, from the cache if it's still current.
+
+        :param storage: The storage manager, its read_file_if_modified is called on a miss or to revalidate
+        :param file_path: The path of the file in the storage
+        :return: The content of the file, or the storage's error message if it couldn't be read
+        """
+        key = self._key(file_path)
+        owner = type(storage).__name__
+
+        entry = self._fresh(key, owner)
+        if entry:
+            return entry.content
+
+        with self._read_locks[hash(key) % LOCK_STRIPES]:
+            # Another thread may have read the file while this one waited
+            entry = self._fresh(key, owner)
+            if entry:
+                return entry.content
+
+            with self._lock:
+                generation = self.generation
+                entry = self.entries.get(key)
+                if entry is not None and entry.owner != owner:
+                    entry = None
+
+            content, version = storage.read_file_if_modified(file_path, entry.version if entry else None)
+
+            with self._lock:
+                if content is None and entry is not None:
+                    entry.checked_at = time.monotonic()
+                    if self.entries.get(key) is entry:
+                        self.entries.move_to_end(key)
+                    self.counters["revalidated"] += 1
+                    self.counters["bytes_saved"] += entry.size
+                    return entry.content
+
+                self.counters["misses"] += 1
+                if version is not None and generation == self.generation:
+                    self._store(key, _CachedFile(owner, content, version))
+
+            return content
+
+    def _store(self, key: str, entry: _CachedFile) -> None:
+        """Adds the file, evicting the least recently read until the cache fits its byte budget. Expects the lock."""
+        self._discard(key)
+        if entry.size > min(FILE_CACHE_MAX_ENTRY_BYTES, self.max_bytes):
+            return
+
+        self.entries[key] = entry
+        self.bytes += entry.size
+        while self.bytes > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.bytes -= evicted.size
+            self.counters["evictions"] += 1
+
+    def _discard(self, key: str) -> None:
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry.size
+
+    def invalidate(self, *file_paths: str) -> None:
+        """Drops the given files from the cache, or every file if none are given"""
+        with self._lock:
+            self.generation += 1
+            if not file_paths:
+                self.entries.clear()
+                self.bytes = 0
+                return
+
+            for file_path in file_paths:
+                self._discard(self._key(file_path))
+
+    def stats(self) -> Dict[str, float]:
+        """Counters since the server started, along with the cache's current size"""
+        with self._lock:
+            reads = self.counters["hits"] + self.counters["revalidated"] + self.counters["misses"]
+            return {
+                **self.counters,
+                "hit_rate": (self.counters["hits"] + self.counters["revalidated"]) / max(1, reads),
+                "entries": len(self.entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+            }
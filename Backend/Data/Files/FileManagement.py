@@ -4,15 +4,17 @@ import logging
 import shutil
 import yaml
 
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 from deprecated.classic import deprecated
 
 from Constants.Exceptions import file_not_found, file_not_loaded, FAILURE_TO_LIST_STAGED_FILES, \
     FAILURE_TO_READ_FILE, cannot_read_image_file, category_directory_not_found
-from Data.Files.StorageBase import StorageBase
-from Constants.Constants import DEFAULT_ENCODING
+from Data.Files.FileContentCache import FileContentCache
+from Data.Files.StorageBase import StorageBase, StorageResult
+from Constants.Constants import DEFAULT_ENCODING, MISSING_FILE_VERSION
 from Utilities.Decorators.Decorators import handle_errors
 from Utilities.LogsHandler import LogsHandler
+from Utilities.Tracing import traced
 
 
 class MyDumper(yaml.Dumper):
@@ -65,34 +67,69 @@ class FileManagement(StorageBase):
         data_path = FileManagement()._get_data_path(file_path)
         mode = "w" if overwrite or not os.path.exists(data_path) else "a"
 
-        with open(data_path, mode, encoding=DEFAULT_ENCODING) as file:
-            file.write(content)
-            FileManagement()._log_file_action('saved' if not overwrite else 'overwritten', data_path)
-
-    def read_file(self, full_address: str) -> str:
+        try:
+            with open(data_path, mode, encoding=DEFAULT_ENCODING) as file:
+                file.write(content)
+                FileManagement()._log_file_action('saved' if not overwrite else 'overwritten', data_path)
+        finally:
+            FileContentCache().invalidate(file_path)
+
+    def read_file_if_modified(
+        self, full_address: str, version: Optional[str] = None
+    ) -> Tuple[Optional[str], Optional[str]]:
         """
-        Read the content of a specified file.
+        Read the content of a specified file, if its modification time or size differ from the given version.
         ToDo: A retry needs to be added if a file is not detected after upload
 
         :param full_address: The file name to read, including category folder prefix.
-        :return: The content of the file or an error message.
+        :param version: The version returned when the file was last read.
+        :return: The content of the file, None if it's unchanged, or an error message, and the file's current version.
         """
         full_path = self._get_data_path(full_address)
         logging.info(f"Loading file content from: {full_path}")
 
         if self.is_image_file(full_address):
             logging.warning(f"Attempted to read an image file: {full_address}")
-            return cannot_read_image_file(full_address)
+            return cannot_read_image_file(full_address), None
 
         try:
+            stat = os.stat(full_path)
+            current_version = f"{stat.st_mtime_ns}-{stat.st_size}"
+            if version == current_version:
+                return None, current_version
+
             with open(full_path, 'r', encoding=DEFAULT_ENCODING) as file:
-                return file.read()
+                return file.read(), current_version
         except FileNotFoundError:
             logging.exception(file_not_found(full_address))
-            return file_not_found(full_address)
+            return file_not_found(full_address), None
         except Exception:
             logging.exception(FAILURE_TO_READ_FILE)
-            return file_not_loaded(full_address)
+            return file_not_loaded(full_address), None
+
+    def read_many(self, file_paths: List[str]) -> List[StorageResult]:
+        """
+        Reads several files, one after the other, local reads are quicker than handing them to threads.
+
+        :param file_paths: The paths of the files to read.
+        :return: A result for each path, in the same order, with the file content or the error reading it.
+        """
+        return self._run_many(self.read_file, [(path,) for path in file_paths], max_workers=1)
+
+    def save_many(self, files: List[Tuple[str, str]], overwrite: bool = False) -> List[StorageResult]:
+        """
+        Saves several files, one after the other.
+
+        :param files: (content, file_path) pairs to save.
+        :param overwrite: Flag indicating whether to overwrite existing files.
+        :return: A result for each file, in the same order, with the error saving it if it failed.
+        """
+        return self._run_many(
+            lambda content, file_path: self.save_file(content, file_path, overwrite=overwrite),
+            files,
+            path_index=1,
+            max_workers=1
+        )
 
     @handle_errors()
     def move_file(self, current_path: str, new_path: str) -> None:
@@ -102,8 +139,11 @@ class FileManagement(StorageBase):
         :param current_path: The path of the current file.
         :param new_path: The destination path for the file.
         """
-        shutil.move(self._get_data_path(current_path), self._get_data_path(new_path))
-        self._log_file_action('moved', f"{current_path} to {new_path}")
+        try:
+            shutil.move(self._get_data_path(current_path), self._get_data_path(new_path))
+            self._log_file_action('moved', f"{current_path} to {new_path}")
+        finally:
+            FileContentCache().invalidate(current_path, new_path)
 
     @staticmethod
     def save_yaml(yaml_path: str, data: Dict[Any, Any]) -> None:
@@ -118,6 +158,7 @@ class FileManagement(StorageBase):
         FileManagement.save_file(yaml_content, full_path, overwrite=True)
 
     @staticmethod
+    @traced("storage.load_yaml")
     def load_yaml(yaml_path: str) -> Dict[str, object]:
         """
         Loads existing data from a YAML file if available.
@@ -139,6 +180,28 @@ class FileManagement(StorageBase):
 
         return existing_data
 
+    @staticmethod
+    def load_yaml_if_modified(
+        yaml_path: str, version: Optional[str] = None
+    ) -> Tuple[Optional[Dict[str, object]], Optional[str]]:
+        """
+        Loads a YAML file only if its modification time or size differ from the given version.
+
+        :param yaml_path: The path to the YAML file.
+        :param version: The version returned when the file was last loaded.
+        :return: The loaded data, or None if it's unchanged, and the file's current version.
+        """
+        full_path = os.path.join(FileManagement.config_data_directory, yaml_path)
+        try:
+            stat = os.stat(full_path)
+            current_version = f"{stat.st_mtime_ns}-{stat.st_size}"
+        except FileNotFoundError:
+            current_version = MISSING_FILE_VERSION
+
+        if version == current_version:
+            return None, current_version
+        return FileManagement.load_yaml(yaml_path), current_version
+
     @staticmethod
     def list_files(category_id: str) -> List[str]:
         """
@@ -1,40 +1,66 @@
 import logging
 import os
 import sys
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 
 import boto3
 import yaml
+from botocore.config import Config
 from botocore.exceptions import ClientError
 
-from Constants.Exceptions import file_not_loaded, cannot_read_image_file
-from Data.Files.StorageBase import StorageBase
-from Constants.Constants import DEFAULT_ENCODING, MAX_FILE_SIZE, THE_THINKER_S3_STANDARD_BUCKET_ID
+from Constants.Exceptions import file_not_loaded, cannot_read_image_file, file_not_saved
+from Data.Files.FileContentCache import FileContentCache
+from Data.Files.StorageBase import StorageBase, StorageResult
+from Constants.Constants import DEFAULT_ENCODING, MAX_FILE_SIZE, THE_THINKER_S3_STANDARD_BUCKET_ID, \
+    MISSING_FILE_VERSION, STORAGE_BATCH_CONCURRENCY, S3_MAX_POOL_CONNECTIONS, S3_CONNECT_TIMEOUT, S3_READ_TIMEOUT, \
+    S3_MAX_ATTEMPTS
 from Utilities.Contexts import get_user_context
 from Utilities.Decorators.Decorators import return_for_error
+from Utilities.Tracing import traced
 
 
 class S3Manager(StorageBase):
     """
     A manager for interacting with Amazon S3.
 
+    Creating the client is expensive (credential resolution, endpoint and connection pool setup), so a single instance
+    is shared per process, see StorageMethodology.select. The client itself is thread safe.
+
     :param aws_access_key_id: AWS access key ID.
     :param aws_secret_access_key: AWS secret access key.
+    :param endpoint_url: Optional endpoint of an S3 compatible store, e.g. MinIO.
     """
 
-    def __init__(self, aws_access_key_id: str, aws_secret_access_key: str) -> None:
+    _logger_configured = False
+
+    def __init__(self, aws_access_key_id: str, aws_secret_access_key: str, endpoint_url: str | None = None) -> None:
         """
         Initialize the S3Manager with AWS credentials.
 
         :param aws_access_key_id: AWS access key ID.
         :param aws_secret_access_key: AWS secret access key.
+        :param endpoint_url: Optional endpoint of an S3 compatible store, e.g. MinIO.
         """
-        self.s3_client = boto3.client(
-            's3',
+        # A session of its own, the default boto3 session isn't thread safe
+        session = boto3.session.Session(
             aws_access_key_id=aws_access_key_id,
             aws_secret_access_key=aws_secret_access_key
         )
-        boto3.set_stream_logger("Boto", level=logging.INFO)
+        self.s3_client = session.client(
+            's3',
+            endpoint_url=endpoint_url,
+            config=Config(
+                max_pool_connections=S3_MAX_POOL_CONNECTIONS,
+                connect_timeout=S3_CONNECT_TIMEOUT,
+                read_timeout=S3_READ_TIMEOUT,
+                tcp_keepalive=True,
+                retries={"max_attempts": S3_MAX_ATTEMPTS, "mode": "standard"}
+            )
+        )
+
+        if not S3Manager._logger_configured:
+            boto3.set_stream_logger("Boto", level=logging.INFO)
+            S3Manager._logger_configured = True
 
     @return_for_error(False, debug_logging=True)
     def save_file(self, content: str, file_path: str = None, overwrite: bool = False) -> bool:
@@ -67,13 +93,19 @@ class S3Manager(StorageBase):
         except ClientError as e:
             logging.error(f"Failed to upload {full_path}: {e}")
             return False
+        finally:
+            FileContentCache().invalidate(file_path)
 
-    def read_file(self, full_address: str) -> str:
+    def read_file_if_modified(
+        self, full_address: str, version: Optional[str] = None
+    ) -> Tuple[Optional[str], Optional[str]]:
         """
-        Read a text file from an S3 bucket.
+        Read a text file from an S3 bucket with a conditional GET, S3 only returns the body if its ETag differs from the
+        given version.
 
         :param full_address: S3 object name.
-        :return: The contents of the file or an error message.
+        :param version: The ETag returned when the file was last read.
+        :return: The contents of the file, None if it's unchanged, or an error message, and the file's current ETag.
         """
         full_path = os.path.join("Files", full_address)
         try:
@@ -81,16 +113,57 @@ class S3Manager(StorageBase):
 
             if self.is_image_file(full_path):
                 logging.warning(f"Cannot read image file: {full_path}")
-                return cannot_read_image_file(full_path)
+                return cannot_read_image_file(full_path), None
 
-            response = self.s3_client.get_object(
-                Bucket=os.getenv(THE_THINKER_S3_STANDARD_BUCKET_ID),
-                Key=self.convert_to_s3_path(full_path)
-            )
-            return response['Body'].read().decode(DEFAULT_ENCODING)
+            request = {
+                "Bucket": os.getenv(THE_THINKER_S3_STANDARD_BUCKET_ID),
+                "Key": self.convert_to_s3_path(full_path)
+            }
+            if version:
+                request["IfNoneMatch"] = version
+
+            response = self.s3_client.get_object(**request)
+            return response['Body'].read().decode(DEFAULT_ENCODING), response.get('ETag')
         except ClientError as e:
+            error_code = e.response.get('Error', {}).get('Code')
+            if error_code in ('304', 'NotModified'):
+                return None, version
+
             logging.error(f"Failed to download {full_path}: {e}")
-            return file_not_loaded(full_address)
+            return file_not_loaded(full_address), None
+
+    def read_many(self, file_paths: List[str]) -> List[StorageResult]:
+        """
+        Reads several files with concurrent GETs over the shared connection pool.
+
+        :param file_paths: S3 object names.
+        :return: A result for each object, in the same order, with its content or the error reading it.
+        """
+        return self._run_many(
+            self.read_file,
+            [(path,) for path in file_paths],
+            max_workers=min(STORAGE_BATCH_CONCURRENCY, S3_MAX_POOL_CONNECTIONS)
+        )
+
+    def save_many(self, files: List[Tuple[str, str]], overwrite: bool = False) -> List[StorageResult]:
+        """
+        Saves several files with concurrent PUTs over the shared connection pool.
+
+        :param files: (content, S3 object name) pairs to save.
+        :param overwrite: If True, allows overwriting existing files.
+        :return: A result for each file, in the same order, with the error saving it if it failed.
+        """
+        def save(content: str, file_path: str) -> bool:
+            if not self.save_file(content, file_path, overwrite=overwrite):
+                raise IOError(file_not_saved(file_path))
+            return True
+
+        return self._run_many(
+            save,
+            files,
+            path_index=1,
+            max_workers=min(STORAGE_BATCH_CONCURRENCY, S3_MAX_POOL_CONNECTIONS)
+        )
 
     def save_yaml(self, yaml_path: str, data: Dict[Any, Any]) -> None:
         """
@@ -113,6 +186,7 @@ class S3Manager(StorageBase):
         except ClientError as e:
             logging.error(f"Failed to save YAML to S3: {e}")
 
+    @traced("storage.load_yaml")
     def load_yaml(self, yaml_path: str) -> Dict[str, object]:
         """
         Loads existing data from a YAML file in the specified S3 bucket.
@@ -145,6 +219,43 @@ class S3Manager(StorageBase):
 
         return existing_data
 
+    @traced("storage.load_yaml_if_modified")
+    def load_yaml_if_modified(
+        self, yaml_path: str, version: Optional[str] = None
+    ) -> Tuple[Optional[Dict[str, object]], Optional[str]]:
+        """
+        Loads a YAML file with a conditional GET, S3 only returns the body if its ETag differs from the given version.
+
+        :param yaml_path: The key (path) to the YAML file.
+        :param version: The ETag returned when the file was last loaded.
+        :return: The loaded data, or None if it's unchanged, and the file's current ETag.
+        """
+        full_path = os.path.join("UserConfigs", yaml_path)
+        request = {
+            "Bucket": os.getenv(THE_THINKER_S3_STANDARD_BUCKET_ID),
+            "Key": self.convert_to_s3_path(full_path)
+        }
+        if version and version != MISSING_FILE_VERSION:
+            request["IfNoneMatch"] = version
+
+        try:
+            response = self.s3_client.get_object(**request)
+            yaml_content = response['Body'].read().decode(DEFAULT_ENCODING)
+            return yaml.safe_load(yaml_content) or {}, response.get('ETag')
+        except ClientError as e:
+            error_code = e.response.get('Error', {}).get('Code')
+            if error_code in ('304', 'NotModified'):
+                return None, version
+            if error_code == 'NoSuchKey':
+                return ({} if version != MISSING_FILE_VERSION else None), MISSING_FILE_VERSION
+
+            logging.exception(f"S3 ClientError accessing s3, path: {full_path}")
+        except yaml.YAMLError:
+            logging.exception(f"Error reading YAML file from S3: {full_path}")
+
+        # Unknown state, the file is re-read next time
+        return self.load_yaml(yaml_path), None
+
     def move_file(self, current_path: str, new_path: str) -> None:
         """
         Moves a file from one location to another in the S3 bucket.
@@ -166,6 +277,8 @@ class S3Manager(StorageBase):
             logging.info(f"File {current_path} moved to {new_path}.")
         except ClientError as e:
             logging.error(f"FAILED TO MOVE {current_path} TO {new_path}: {e}")
+        finally:
+            FileContentCache().invalidate(current_path, new_path)
 
     def list_files(self, category_id: str) -> List[str]:
         """
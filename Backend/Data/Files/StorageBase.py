@@ -1,6 +1,24 @@
+import logging
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from mimetypes import guess_type
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple, NamedTuple, Callable
+
+from Constants.Constants import STORAGE_BATCH_CONCURRENCY
+from Constants.Exceptions import failure_in_storage_batch
+from Data.Files.FileContentCache import FileContentCache
+from Utilities.Tracing import traced
+
+
+class StorageResult(NamedTuple):
+    """The outcome of one item of a batch operation, error is set instead of raised if the item failed"""
+    path: str
+    value: Any = None
+    error: Optional[Exception] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
 
 
 class StorageBase(ABC):
@@ -22,16 +40,77 @@ class StorageBase(ABC):
         """
         pass
 
-    @abstractmethod
+    @traced("storage.read_file")
     def read_file(self, file_path: str) -> str:
         """
-        Read a file from the storage.
+        Read a file from the storage, served from the FileContentCache while the file is unchanged.
 
         :param file_path: The path of the file to read.
         :return: The content of the file as a string.
         """
+        return FileContentCache().read(self, file_path)
+
+    @abstractmethod
+    def read_file_if_modified(
+        self, file_path: str, version: Optional[str] = None
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Read a file only if it has changed since the given version was read.
+
+        :param file_path: The path of the file to read.
+        :param version: The version returned when the file was last read.
+        :return: The content of the file, or None if it's unchanged, and the file's current version. The version is
+         None if the file couldn't be read, in which case the content is an error message.
+        """
         pass
 
+    def read_many(self, file_paths: List[str]) -> List[StorageResult]:
+        """
+        Read several files from the storage, concurrently.
+
+        :param file_paths: The paths of the files to read.
+        :return: A result for each path, in the same order, with the file content or the error reading it.
+        """
+        return self._run_many(self.read_file, [(path,) for path in file_paths])
+
+    def save_many(self, files: List[Tuple[str, str]], overwrite: bool = False) -> List[StorageResult]:
+        """
+        Save several files to the storage, concurrently.
+
+        :param files: (content, file_path) pairs to save.
+        :param overwrite: Flag indicating whether to overwrite existing files.
+        :return: A result for each file, in the same order, with the error saving it if it failed.
+        """
+        return self._run_many(
+            lambda content, file_path: self.save_file(content, file_path, overwrite=overwrite),
+            files,
+            path_index=1
+        )
+
+    @staticmethod
+    def _run_many(
+        operation: Callable[..., Any],
+        arguments: List[Tuple],
+        path_index: int = 0,
+        max_workers: int = STORAGE_BATCH_CONCURRENCY
+    ) -> List[StorageResult]:
+        """Runs an operation for each set of arguments with bounded concurrency, keeping the input order"""
+        def run(item_arguments: Tuple) -> StorageResult:
+            path = item_arguments[path_index]
+            try:
+                return StorageResult(path, operation(*item_arguments))
+            except Exception as e:
+                logging.exception(failure_in_storage_batch(path))
+                return StorageResult(path, error=e)
+
+        if len(arguments) <= 1 or max_workers <= 1:
+            return [run(item_arguments) for item_arguments in arguments]
+
+        with ThreadPoolExecutor(
+            max_workers=min(max_workers, len(arguments)), thread_name_prefix='StorageBatch'
+        ) as executor:
+            return list(executor.map(run, arguments))
+
     def save_yaml(self, yaml_path: str, data: Dict[Any, Any]) -> None:
         """
         Save a dictionary as a YAML file in the storage.
@@ -50,6 +129,20 @@ class StorageBase(ABC):
         """
         pass
 
+    def load_yaml_if_modified(
+        self, yaml_path: str, version: Optional[str] = None
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """
+        Load a YAML file only if it has changed since the given version was loaded.
+
+        Storage methods without a cheap way to detect changes always load the file and return no version.
+
+        :param yaml_path: The path of the YAML file to load.
+        :param version: The version returned when the file was last loaded.
+        :return: The loaded data, or None if it's unchanged, and the file's current version.
+        """
+        return self.load_yaml(yaml_path), None
+
     @abstractmethod
     def move_file(self, current_path: str, new_path: str) -> None:
         """
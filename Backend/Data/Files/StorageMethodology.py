@@ -1,7 +1,9 @@
 import os
+import threading
+from typing import Dict, Tuple
 
 from Constants.Constants import THE_THINKER_S3_STANDARD_ACCESS_KEY, THE_THINKER_S3_STANDARD_SECRET_ACCESS_KEY, \
-    STORAGE_TYPE, LOCAL_STORAGE, AWS_S3_STORAGE
+    STORAGE_TYPE, LOCAL_STORAGE, AWS_S3_STORAGE, THE_THINKER_S3_ENDPOINT_URL
 from Data.Files.FileManagement import FileManagement
 from Data.Files.S3Manager import S3Manager
 from Data.Files.StorageBase import StorageBase
@@ -13,8 +15,14 @@ class StorageMethodology:
 
     This class provides a method to select the appropriate storage manager
     based on the 'STORAGE_TYPE' environment variable.
+
+    Storage managers are created once per process and shared between threads, keyed by the settings they were created
+    with, so changing the environment (e.g. in tests) still selects a matching manager.
     """
 
+    _storage: Dict[Tuple, StorageBase] = {}
+    _lock = threading.Lock()
+
     @staticmethod
     def select() -> StorageBase:
         """
@@ -25,17 +33,30 @@ class StorageMethodology:
         :return: An instance of StorageBase subclass either FileManagement or S3Manager.
         """
         storage_type = os.getenv(STORAGE_TYPE, LOCAL_STORAGE)
+        access_key = os.getenv(THE_THINKER_S3_STANDARD_ACCESS_KEY)
+        endpoint_url = os.getenv(THE_THINKER_S3_ENDPOINT_URL)
+        key = (storage_type, access_key, endpoint_url)
+
+        storage = StorageMethodology._storage.get(key)
+        if storage is not None:
+            return storage
 
+        with StorageMethodology._lock:
+            if key not in StorageMethodology._storage:
+                StorageMethodology._storage[key] = StorageMethodology._create(storage_type, access_key, endpoint_url)
+            return StorageMethodology._storage[key]
+
+    @staticmethod
+    def _create(storage_type: str, access_key: str | None, endpoint_url: str | None) -> StorageBase:
         if storage_type == LOCAL_STORAGE:
             return FileManagement()
         elif storage_type == AWS_S3_STORAGE:
-            access_key = os.getenv(THE_THINKER_S3_STANDARD_ACCESS_KEY)
             secret_key = os.getenv(THE_THINKER_S3_STANDARD_SECRET_ACCESS_KEY)
 
             if not access_key or not secret_key:
                 raise ValueError("AWS access keys must be defined for S3 storage.")
 
-            return S3Manager(access_key, secret_key)
+            return S3Manager(access_key, secret_key, endpoint_url)
         else:
             raise ValueError(f"Invalid storage type specified: {storage_type}")
 
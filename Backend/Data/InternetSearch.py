@@ -110,6 +110,7 @@ class InternetSearch:
                 EXTRACT_SEARCH_TERMS_PROMPT,  # ToDo: Might not actually need this line
                 user_prompt
             ],
+            cache=True
         )
 
         keywords = self.parse_keywords(response)
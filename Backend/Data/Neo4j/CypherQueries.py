@@ -3,10 +3,8 @@ CypherQueries.py
 
 This module contains Cypher queries used for interacting with the Neo4j Graph Database.
 
-Constraints:
-CREATE CONSTRAINT FOR (user:USER) REQUIRE user.id IS UNIQUE;
-CREATE CONSTRAINT FOR (category:CATEGORY) REQUIRE category.id IS UNIQUE;
-CREATE CONSTRAINT FOR (s:SYSTEM) REQUIRE s.id IS UNIQUE;
+Constraints and indexes are created by the migrations in SchemaMigrations.py, queries matching on a property should
+be covered by one. `python -m Data.Neo4j.SchemaMigrations --check-plans` fails if any query here plans a scan.
 """
 from typing import List
 
@@ -58,53 +56,116 @@ WITH user
 MERGE (category:CATEGORY {name: $category_name, instructions: $category_instructions, colour: $colour})
 ON CREATE SET category.id = $category_id
 MERGE (user)-[:HAS_CATEGORY]->(category)
-CREATE (user_prompt:USER_PROMPT {id: $message_id}) 
-MERGE (user_prompt)-[:BELONGS_TO]->(category) 
+MERGE (user_prompt:USER_PROMPT {id: $message_id})
+MERGE (user_prompt)-[:BELONGS_TO]->(category)
+SET category.message_count = COUNT { (category)<-[:BELONGS_TO]-(:USER_PROMPT) }
 RETURN category.id AS category_id;
 """
 
-CREATE_USER_TOPIC = """
-MATCH (user:USER {{id: $user_id}})
-WITH user
-MERGE (user_topic:USER_TOPIC {{_name_: $node_name}})
-SET user_topic.{parameter} = $content
-MERGE (user_topic)-[:RELATES_TO]->(user)
-RETURN id(user_topic) AS user_topic_id;
+# User topics belong to the user they relate to, each of a user's topics is merged on its name together with that
+# relationship, so two users noting the same topic each get their own node.
+# $topics: [{name, properties: {parameter: content}}], the properties are added to the topic's existing ones.
+# _text_ joins the topic's properties for the user_topic_text full-text index, as their names vary from topic to topic
+CREATE_USER_TOPICS = """
+MATCH (user:USER {id: $user_id})
+UNWIND $topics AS topic
+MERGE (user_topic:USER_TOPIC {_name_: topic.name})-[:RELATES_TO]->(user)
+SET user_topic += topic.properties
+WITH user_topic
+SET user_topic._text_ = reduce(text = '', key IN [key IN keys(user_topic) WHERE NOT key STARTS WITH '_'] |
+        text + ' ' + toString(user_topic[key]))
+RETURN count(user_topic) AS user_topics;
 """
 
-
-def format_create_user_topic_query(parameter: str) -> str:
-    """Formats the query to create a user topic with the specified parameter."""
-    return CREATE_USER_TOPIC.format(parameter=parameter)
-
-
 SEARCH_FOR_USER_TOPIC = """
-MATCH (user:USER {id: $user_id})
-WITH user
-MATCH (user_topic:USER_TOPIC {_name_: $node_name})
+MATCH (user:USER {id: $user_id})<-[:RELATES_TO]-(user_topic:USER_TOPIC {_name_: $node_name})
 RETURN properties(user_topic) AS all_properties;
 """
 
 # newest first
 SEARCH_FOR_ALL_USER_TOPICS = """
-MATCH (user:USER {id: $user_id})
-WITH user
-MATCH (user_topic:USER_TOPIC)
+MATCH (user:USER {id: $user_id})<-[:RELATES_TO]-(user_topic:USER_TOPIC)
 WITH user_topic
 ORDER BY id(user_topic) DESC
 RETURN user_topic._name_ AS name;
 """
 
+# Topics used to be merged on their name alone, so a topic noted by several users was one node related to all of them.
+# Each of those users is given a copy of it
+SPLIT_SHARED_USER_TOPICS = """
+MATCH (user_topic:USER_TOPIC)-[:RELATES_TO]->(user:USER)
+WITH user_topic, collect(user) AS users
+WHERE size(users) > 1
+CALL {
+    WITH user_topic, users
+    UNWIND users AS user
+    CREATE (copy:USER_TOPIC)-[:RELATES_TO]->(user)
+    SET copy = properties(user_topic)
+    WITH DISTINCT user_topic
+    DETACH DELETE user_topic
+} IN TRANSACTIONS OF 100 ROWS;
+"""
+
 CREATE_USER_PROMPT_NODE = """
 MATCH (user:USER {id: $user_id})
 WITH user
 MATCH (category:CATEGORY {name: $category})<-[:HAS_CATEGORY]-(user)
-CREATE (user_prompt:USER_PROMPT {id: $message_id})
+MERGE (user_prompt:USER_PROMPT {id: $message_id})
 MERGE (user)-[:HAS_CATEGORY]->(category)
 MERGE (user_prompt)-[:BELONGS_TO]->(category)
+SET category.message_count = COUNT { (category)<-[:BELONGS_TO]-(:USER_PROMPT) }
+RETURN user_prompt.id AS user_prompt_id;
+"""
+
+# Speculative categorisation: the prompt node is created before its category is known and re-parented once it is
+CREATE_UNASSIGNED_USER_PROMPT_NODE = """
+MATCH (user:USER {id: $user_id})
+MERGE (user_prompt:USER_PROMPT {id: $message_id})
+RETURN user_prompt.id AS user_prompt_id;
+"""
+
+ASSIGN_USER_PROMPT_TO_CATEGORY = """
+MATCH (user:USER {id: $user_id})-[:HAS_CATEGORY]->(category:CATEGORY {id: $category_id})
+MATCH (user_prompt:USER_PROMPT {id: $message_id})
+OPTIONAL MATCH (user_prompt)-[previous:BELONGS_TO]->(previous_category:CATEGORY)
+DELETE previous
+WITH user_prompt, category, collect(previous_category) AS previous_categories
+MERGE (user_prompt)-[:BELONGS_TO]->(category)
+SET category.message_count = COUNT { (category)<-[:BELONGS_TO]-(:USER_PROMPT) },
+    category.latest_message_time = CASE WHEN coalesce(category.latest_message_time, 0) < coalesce(user_prompt.time, 0)
+        THEN user_prompt.time ELSE category.latest_message_time END
+WITH user_prompt, category, previous_categories
+CALL {
+    WITH category, previous_categories
+    UNWIND [previous IN previous_categories WHERE previous <> category] AS previous
+    OPTIONAL MATCH (previous)<-[:BELONGS_TO]-(message:USER_PROMPT)
+    WITH previous, count(message) AS message_count, max(message.time) AS latest_message_time
+    SET previous.message_count = message_count, previous.latest_message_time = latest_message_time
+}
 RETURN user_prompt.id AS user_prompt_id;
 """
 
+ASSIGN_USER_PROMPT_TO_NAMED_CATEGORY = """
+MATCH (user:USER {id: $user_id})-[:HAS_CATEGORY]->(category:CATEGORY {name: $category_name})
+MATCH (user_prompt:USER_PROMPT {id: $message_id})
+OPTIONAL MATCH (user_prompt)-[previous:BELONGS_TO]->(previous_category:CATEGORY)
+DELETE previous
+WITH user_prompt, category, collect(previous_category) AS previous_categories
+MERGE (user_prompt)-[:BELONGS_TO]->(category)
+SET category.message_count = COUNT { (category)<-[:BELONGS_TO]-(:USER_PROMPT) },
+    category.latest_message_time = CASE WHEN coalesce(category.latest_message_time, 0) < coalesce(user_prompt.time, 0)
+        THEN user_prompt.time ELSE category.latest_message_time END
+WITH user_prompt, category, previous_categories
+CALL {
+    WITH category, previous_categories
+    UNWIND [previous IN previous_categories WHERE previous <> category] AS previous
+    OPTIONAL MATCH (previous)<-[:BELONGS_TO]-(message:USER_PROMPT)
+    WITH previous, count(message) AS message_count, max(message.time) AS latest_message_time
+    SET previous.message_count = message_count, previous.latest_message_time = latest_message_time
+}
+RETURN category.id AS category_id;
+"""
+
 POPULATE_USER_PROMPT_NODE = """
 MATCH (user:USER {id: $user_id})
 WITH user
@@ -113,6 +174,9 @@ MERGE (user_prompt:USER_PROMPT {id: $message_id})
 SET user_prompt.prompt = $prompt, user_prompt.response = $response, user_prompt.time = $time
 MERGE (user)-[:HAS_CATEGORY]->(category)
 MERGE (user_prompt)-[:BELONGS_TO]->(category)
+SET category.message_count = COUNT { (category)<-[:BELONGS_TO]-(:USER_PROMPT) },
+    category.latest_message_time = CASE WHEN coalesce(category.latest_message_time, 0) < $time
+        THEN $time ELSE category.latest_message_time END
 RETURN user_prompt.id AS user_prompt_id;
 """
 
@@ -143,6 +207,9 @@ SET newFile.version = COALESCE(existingFile.version, 0) + 1,
 FOREACH (up IN CASE WHEN user_prompt IS NOT NULL THEN [user_prompt] ELSE [] END |
     CREATE (newFile)-[:ORIGINATES_FROM {version: newFile.version}]->(up)
 )
+SET category.file_count = COUNT { (category)<-[:BELONGS_TO]-(:FILE) },
+    category.latest_file_time = CASE WHEN coalesce(category.latest_file_time, 0) < $time
+        THEN $time ELSE category.latest_file_time END
 RETURN newFile;
 """
 
@@ -168,22 +235,42 @@ MATCH (user:USER {id: $user_id})-[:HAS_CATEGORY]->(category:CATEGORY)
 RETURN user_prompt.id AS id, user_prompt.prompt AS prompt, user_prompt.response AS response, user_prompt.time AS time;
 """
 
+GET_MESSAGES_BY_IDS = """
+MATCH (user:USER {id: $user_id})
+UNWIND $message_ids AS message_id
+MATCH (user)-[:HAS_CATEGORY]->(category:CATEGORY)<-[:BELONGS_TO]-(user_prompt:USER_PROMPT {id: message_id})
+RETURN user_prompt.id AS id, user_prompt.prompt AS prompt, user_prompt.response AS response, user_prompt.time AS time;
+"""
+
+# Paged newest first by (time, id), see Utilities/Pagination.py. $preview_length truncates the prompt and response
+# for a summary listing, null returns them in full
 GET_MESSAGES = """
 MATCH (user:USER {id: $user_id})-[:HAS_CATEGORY]->(category:CATEGORY {name: $category_name})
     <-[:BELONGS_TO]-(user_prompt:USER_PROMPT)
-RETURN user_prompt.id AS id, user_prompt.prompt AS prompt, user_prompt.response AS response, user_prompt.time AS time, user_prompt.cost as cost
-ORDER BY user_prompt.time DESC;
+WITH user_prompt, coalesce(user_prompt.time, 0) AS time
+WHERE $cursor_time IS NULL OR time < $cursor_time OR (time = $cursor_time AND user_prompt.id < $cursor_id)
+ORDER BY time DESC, user_prompt.id DESC
+LIMIT $limit
+RETURN user_prompt.id AS id,
+    CASE WHEN $preview_length IS NULL THEN user_prompt.prompt
+        ELSE left(user_prompt.prompt, $preview_length) END AS prompt,
+    CASE WHEN $preview_length IS NULL THEN user_prompt.response
+        ELSE left(user_prompt.response, $preview_length) END AS response,
+    $preview_length IS NOT NULL AND (size(coalesce(user_prompt.prompt, '')) > $preview_length
+        OR size(coalesce(user_prompt.response, '')) > $preview_length) AS truncated,
+    time, user_prompt.cost AS cost;
 """
 
 DELETE_MESSAGE_AND_POSSIBLY_CATEGORY = """
 MATCH (message:USER_PROMPT)-[:BELONGS_TO]->(category:CATEGORY)<-[:HAS_CATEGORY]-(user:USER {id: $user_id})
 WHERE message.id = $message_id
 DETACH DELETE message
+WITH DISTINCT category
+OPTIONAL MATCH (category)<-[:BELONGS_TO]-(remaining:USER_PROMPT)
+WITH category, count(remaining) AS message_count, max(remaining.time) AS latest_message_time
+SET category.message_count = message_count, category.latest_message_time = latest_message_time
 WITH category
-OPTIONAL MATCH (category)<-[:BELONGS_TO]-(remaining_files:FILE)
-OPTIONAL MATCH (category)<-[:BELONGS_TO]-(remaining_messages:USER_PROMPT)
-WITH category, COUNT(remaining_files) AS file_count, COUNT(remaining_messages) AS message_count
-WHERE file_count = 0 AND message_count = 0
+WHERE category.message_count = 0 AND NOT EXISTS { (category)<-[:BELONGS_TO]-(:FILE) }
 DETACH DELETE category;
 """
 
@@ -206,10 +293,11 @@ RETURN DISTINCT category.name AS category_name
 ORDER BY category_name;
 """
 
+# The listings sort on the activity stats kept on each CATEGORY (message_count, latest_message_time, file_count and
+# latest_file_time) by the queries that add and remove its messages and files, rather than reading them all
 LIST_CATEGORIES_BY_LATEST_MESSAGE = """
 MATCH (user:USER {id: $user_id})-[:HAS_CATEGORY]->(category:CATEGORY)
-OPTIONAL MATCH (category)<-[:BELONGS_TO]-(message:USER_PROMPT)
-RETURN DISTINCT category.id as category_id, category.name AS category_name, category.colour AS colour, category.instructions as instructions, max(message.time) AS latest_time
+RETURN DISTINCT category.id as category_id, category.name AS category_name, category.colour AS colour, category.instructions as instructions, category.latest_message_time AS latest_time
 ORDER BY 
     CASE WHEN latest_time IS NULL THEN 1 ELSE 0 END, 
     latest_time DESC,
@@ -217,9 +305,9 @@ ORDER BY
 """
 
 LIST_CATEGORIES_WITH_MESSAGES_BY_LATEST_MESSAGE = """
-MATCH (user:USER {id: $user_id})-[:HAS_CATEGORY]->(category:CATEGORY)--(user_prompt:USER_PROMPT)
-OPTIONAL MATCH (category)<-[:BELONGS_TO]-(message:USER_PROMPT)
-RETURN DISTINCT category.id as category_id, category.name AS category_name, category.colour AS colour, category.instructions as instructions, max(message.time) AS latest_time
+MATCH (user:USER {id: $user_id})-[:HAS_CATEGORY]->(category:CATEGORY)
+WHERE category.message_count > 0
+RETURN DISTINCT category.id as category_id, category.name AS category_name, category.colour AS colour, category.instructions as instructions, category.latest_message_time AS latest_time, category.message_count AS message_count
 ORDER BY 
     CASE WHEN latest_time IS NULL THEN 1 ELSE 0 END, 
     latest_time DESC,
@@ -227,21 +315,54 @@ ORDER BY
 """
 
 LIST_CATEGORIES_WITH_FILES = """
-MATCH (user:USER {id: $user_id})-[:HAS_CATEGORY]->(category:CATEGORY)--(file:FILE)
+MATCH (user:USER {id: $user_id})-[:HAS_CATEGORY]->(category:CATEGORY)
+WHERE category.file_count > 0
 RETURN DISTINCT category.name AS category_name
 ORDER BY category_name;
 """
 
 LIST_CATEGORIES_WITH_FILES_BY_LATEST_FILE = """
-MATCH (user:USER {id: $user_id})-[:HAS_CATEGORY]->(category:CATEGORY)--(file:FILE)
-OPTIONAL MATCH (category)<-[:BELONGS_TO]-(file:FILE)
-RETURN DISTINCT category.id as category_id, category.name AS category_name, category.colour AS colour, max(file.time) AS latest_time
+MATCH (user:USER {id: $user_id})-[:HAS_CATEGORY]->(category:CATEGORY)
+WHERE category.file_count > 0
+RETURN DISTINCT category.id as category_id, category.name AS category_name, category.colour AS colour, category.latest_file_time AS latest_time, category.file_count AS file_count
 ORDER BY 
     CASE WHEN latest_time IS NULL THEN 1 ELSE 0 END, 
     latest_time DESC,
     category_name ASC;
 """
 
+# Recomputes every category's activity stats from its messages and files, for data written before they were kept
+BACKFILL_CATEGORY_STATS = """
+MATCH (category:CATEGORY)
+CALL {
+    WITH category
+    OPTIONAL MATCH (category)<-[:BELONGS_TO]-(message:USER_PROMPT)
+    WITH category, count(message) AS message_count, max(message.time) AS latest_message_time
+    OPTIONAL MATCH (category)<-[:BELONGS_TO]-(file:FILE)
+    WITH category, message_count, latest_message_time, count(file) AS file_count, max(file.time) AS latest_file_time
+    SET category.message_count = message_count,
+        category.latest_message_time = latest_message_time,
+        category.file_count = file_count,
+        category.latest_file_time = latest_file_time
+} IN TRANSACTIONS OF 1000 ROWS;
+"""
+
+# Rolling summary of the category's older history, see Data/ConversationSummary.py. Versioned, an update only
+# applies on top of the version it was built from so a fold that raced another is discarded rather than lost silently
+GET_CATEGORY_CONVERSATION_SUMMARY = """
+MATCH (user:USER {id: $user_id})-[:HAS_CATEGORY]->(category:CATEGORY {id: $category_id})
+RETURN category.conversation_summary AS summary, coalesce(category.conversation_summary_version, 0) AS version;
+"""
+
+UPDATE_CATEGORY_CONVERSATION_SUMMARY = """
+MATCH (user:USER {id: $user_id})-[:HAS_CATEGORY]->(category:CATEGORY {id: $category_id})
+WHERE coalesce(category.conversation_summary_version, 0) = $version
+SET category.conversation_summary = $summary,
+    category.conversation_summary_version = $version + 1,
+    category.conversation_summary_time = timestamp()
+RETURN category.conversation_summary_version AS version;
+"""
+
 UPDATE_CATEGORY_INSTRUCTIONS = """
 MATCH (user:USER {id: $user_id})-[:HAS_CATEGORY]->(category:CATEGORY {name: $category_name})
 SET category.instructions = $new_category_instructions
@@ -257,25 +378,79 @@ RETURN file.id AS id, category.id AS category, file.name AS name, file.summary A
 ORDER BY file.time DESC;
 """
 
+GET_FILES_BY_IDS = """
+MATCH (user:USER {id: $user_id})
+UNWIND $file_ids AS file_id
+MATCH (user)-[:HAS_CATEGORY]->(category:CATEGORY)--(file:FILE {id: file_id})
+RETURN file.id AS id, category.id AS category, file.name AS name, file.summary AS summary, file.structure AS structure, file.time AS time, file.size as size;
+"""
+
+# Paged like GET_MESSAGES, a summary listing truncates the file's summary and structure
 GET_FILES_FOR_CATEGORY = """
 MATCH (user:USER {id: $user_id})-[:HAS_CATEGORY]->(category:CATEGORY {name: $category_name})
     <-[:BELONGS_TO]-(file:FILE)
-RETURN file.id AS id, category.id AS category_id, file.name AS name, file.summary AS summary, file.structure AS structure, file.time AS time, file.size as size
-ORDER BY file.time DESC;
+WITH category, file, coalesce(file.time, 0) AS time
+WHERE $cursor_time IS NULL OR time < $cursor_time OR (time = $cursor_time AND file.id < $cursor_id)
+ORDER BY time DESC, file.id DESC
+LIMIT $limit
+RETURN file.id AS id, category.id AS category_id, file.name AS name,
+    CASE WHEN $preview_length IS NULL THEN file.summary ELSE left(file.summary, $preview_length) END AS summary,
+    CASE WHEN $preview_length IS NULL THEN file.structure ELSE left(file.structure, $preview_length) END AS structure,
+    $preview_length IS NOT NULL AND (size(coalesce(file.summary, '')) > $preview_length
+        OR size(coalesce(file.structure, '')) > $preview_length) AS truncated,
+    time, file.size AS size;
 """
 
 DELETE_FILE_BY_ID_AND_POSSIBLY_CATEGORY = """
 MATCH (file:FILE)-[:BELONGS_TO]->(category:CATEGORY)<-[:HAS_CATEGORY]-(user:USER {id: $user_id})
 WHERE file.id = $file_id
 DETACH DELETE file
+WITH DISTINCT category
+OPTIONAL MATCH (category)<-[:BELONGS_TO]-(remaining:FILE)
+WITH category, count(remaining) AS file_count, max(remaining.time) AS latest_file_time
+SET category.file_count = file_count, category.latest_file_time = latest_file_time
 WITH category
-OPTIONAL MATCH (category)<-[:BELONGS_TO]-(remaining_files:FILE)
-OPTIONAL MATCH (category)<-[:BELONGS_TO]-(remaining_messages:USER_PROMPT)
-WITH category, COUNT(remaining_files) AS file_count, COUNT(remaining_messages) AS message_count
-WHERE file_count = 0 AND message_count = 0
+WHERE category.file_count = 0 AND NOT EXISTS { (category)<-[:BELONGS_TO]-(:USER_PROMPT) }
 DETACH DELETE category
 """
 
+# Search
+# Full-text index queries, see migration 6 in SchemaMigrations.py. Hits come back most relevant first and are filtered
+# to the user's own, $limit stops reading the index once enough of them are found.
+
+SEARCH_MESSAGES = """
+CALL db.index.fulltext.queryNodes('user_prompt_text', $query) YIELD node AS user_prompt, score
+MATCH (user_prompt)-[:BELONGS_TO]->(category:CATEGORY)<-[:HAS_CATEGORY]-(user:USER {id: $user_id})
+RETURN user_prompt.id AS id, category.id AS category_id, category.name AS category_name,
+    user_prompt.prompt AS prompt, user_prompt.response AS response, user_prompt.time AS time, score
+LIMIT $limit;
+"""
+
+SEARCH_FILES = """
+CALL db.index.fulltext.queryNodes('file_text', $query) YIELD node AS file, score
+MATCH (file)-[:BELONGS_TO]->(category:CATEGORY)<-[:HAS_CATEGORY]-(user:USER {id: $user_id})
+RETURN file.id AS id, category.id AS category_id, category.name AS category_name,
+    file.name AS name, file.summary AS summary, file.time AS time, score
+LIMIT $limit;
+"""
+
+SEARCH_USER_TOPICS = """
+CALL db.index.fulltext.queryNodes('user_topic_text', $query) YIELD node AS user_topic, score
+MATCH (user_topic)-[:RELATES_TO]->(user:USER {id: $user_id})
+RETURN user_topic._name_ AS name, user_topic._text_ AS text, score
+LIMIT $limit;
+"""
+
+# Sets _text_ on topics written before it was kept
+BACKFILL_USER_TOPIC_TEXT = """
+MATCH (user_topic:USER_TOPIC)
+CALL {
+    WITH user_topic
+    SET user_topic._text_ = reduce(text = '', key IN [key IN keys(user_topic) WHERE NOT key STARTS WITH '_'] |
+        text + ' ' + toString(user_topic[key]))
+} IN TRANSACTIONS OF 1000 ROWS;
+"""
+
 # Pricing
 
 GET_USER_BALANCE = """
@@ -306,10 +481,11 @@ RETURN user.earmarked as total_earmarked;
 """
 
 # Will create the node if it doesn't already yet exist
+# Costs can be expensed before the prompt's node is created, it's merged so the node picks them up when it is
 EXPENSE_NODE = """
-MERGE (n {id: $node_id})
-SET n.cost = COALESCE(n.cost, 0) + $amount
-RETURN n;
+MERGE (user_prompt:USER_PROMPT {id: $node_id})
+SET user_prompt.cost = COALESCE(user_prompt.cost, 0) + $amount
+RETURN user_prompt.cost AS cost;
 """
 
 EXPENSE_FUNCTIONALITY = """
@@ -319,6 +495,52 @@ RETURN user[$functionality]
 """
 
 
+"""
+Applies every charge of a request in one transaction. The COST_LEDGER node records that the ledger was committed, so
+replaying its journal after a crash can't charge the user twice.
+"""
+COMMIT_COST_LEDGER = """
+MERGE (ledger:COST_LEDGER {id: $ledger_id})
+ON CREATE SET ledger.committed = false
+WITH ledger
+WHERE NOT ledger.committed
+SET ledger.committed = true, ledger.time = timestamp(), ledger.user_id = $user_id, ledger.total = $user_total
+WITH ledger
+CALL {
+    MATCH (user:USER {id: $user_id})
+    SET user.balance = user.balance - $user_total
+    WITH user
+    UNWIND $functionality_charges AS charge
+    SET user[charge.property] = COALESCE(user[charge.property], 0.0) + charge.amount
+}
+CALL {
+    UNWIND $node_charges AS charge
+    MERGE (user_prompt:USER_PROMPT {id: charge.node_id})
+    SET user_prompt.cost = COALESCE(user_prompt.cost, 0) + charge.amount
+}
+CALL {
+    UNWIND $system_charges AS charge
+    MATCH (system:SYSTEM)
+    SET system[charge.property] = system[charge.property] - charge.amount
+}
+RETURN ledger.id AS ledger_id;
+"""
+
+
+# Schema migrations
+
+GET_APPLIED_SCHEMA_MIGRATIONS = """
+MATCH (migration:SCHEMA_MIGRATION)
+RETURN migration.version AS version;
+"""
+
+RECORD_SCHEMA_MIGRATION = """
+MERGE (migration:SCHEMA_MIGRATION {version: $version})
+SET migration.description = $description, migration.applied_at = timestamp()
+RETURN migration.version AS version;
+"""
+
+
 def fetch_user_params_query(user_id: str, params: List[str]):
     """
     Define query to get
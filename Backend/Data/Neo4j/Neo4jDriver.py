@@ -1,11 +1,12 @@
 import logging
 import os
-from typing import Optional, Any, Dict
+from typing import Optional, Any, Dict, List, Tuple
 
 from neo4j import GraphDatabase, basic_auth
 
-from Constants.Constants import NEO4J_URI, NEO4J_PASSWORD
+from Constants.Constants import NEO4J_URI, NEO4J_PASSWORD, NEO4J_MAX_TRANSACTION_RETRY_TIME
 from Utilities.Decorators.Decorators import handle_errors
+from Utilities.Tracing import traced, annotate
 
 
 class Neo4jDriver:
@@ -21,13 +22,18 @@ class Neo4jDriver:
         if not uri or not password:
             raise ValueError("NEO4J_URI and NEO4J_PASSWORD environment variables must be set.")
 
-        self.driver = GraphDatabase.driver(uri, auth=basic_auth("neo4j", password))
+        self.driver = GraphDatabase.driver(
+            uri,
+            auth=basic_auth("neo4j", password),
+            max_transaction_retry_time=NEO4J_MAX_TRANSACTION_RETRY_TIME
+        )
 
     def close(self) -> None:
         """Closes the connection to the Neo4j database."""
         if self.driver:
             self.driver.close()
 
+    @traced("neo4j.execute_write")
     @handle_errors(debug_logging=True)
     def execute_write(self,
                       query: str,
@@ -41,11 +47,17 @@ class Neo4jDriver:
         :param field: Optional field to return from the executed query.
         :return: The value extracted from the query result if a field is specified.
         """
+        annotate(query=self._query_summary(query))
         with self.driver.session() as session:
             return session.write_transaction(
                 lambda tx: self._extract_field(tx.run(query, parameters), field)
             )
 
+    @staticmethod
+    def _query_summary(query: str) -> str:
+        """The first line of a query, enough to identify it in a trace without recording its parameters"""
+        return next((line.strip() for line in query.splitlines() if line.strip()), "")
+
     @staticmethod
     def _extract_field(result, field: Optional[str]) -> Optional[Any]:
         """
@@ -72,6 +84,7 @@ class Neo4jDriver:
 
         return None
 
+    @traced("neo4j.execute_read")
     @handle_errors()
     def execute_read(self, query: str, parameters: Optional[Dict[str, Any]] = None) -> Any:
         """
@@ -81,9 +94,66 @@ class Neo4jDriver:
         :param parameters: Optional parameters for the query.
         :return: A list of records returned by the query.
         """
+        annotate(query=self._query_summary(query))
         with self.driver.session() as session:
             return session.read_transaction(lambda tx: list(tx.run(query, parameters)))
 
+    def unit_of_work(self, write: bool = True) -> "UnitOfWork":
+        """
+        Queues statements to run together in one transaction, e.g.
+
+            with neo4jDriver.unit_of_work() as unit:
+                unit.add(CypherQueries.CREATE_FILE_NODE, file_parameters)
+                unit.add(CypherQueries.UPDATE_USER_DATA_UPLOADED_SIZE, size_parameters)
+
+        :param write: Whether the statements write to the database, read only units can be routed to any cluster member
+        :return: An empty unit of work
+        """
+        return UnitOfWork(self, write)
+
+    @traced("neo4j.execute_batch")
+    @handle_errors(debug_logging=True, raise_errors=True)
+    def execute_batch(self, statements: List[Tuple[str, Optional[Dict[str, Any]]]], write: bool = True) -> List[list]:
+        """
+        Executes several statements in a single managed transaction, committed all together or not at all.
+
+        Managed transactions are retried by the driver on transient errors, e.g. deadlocks or a lost connection, for up
+        to NEO4J_MAX_TRANSACTION_RETRY_TIME seconds. Each retry re-runs every statement.
+
+        :param statements: The Cypher queries to execute, with their parameters, in order.
+        :param write: Whether the statements write to the database.
+        :return: The records returned by each statement, in the same order.
+        """
+        annotate(statements=len(statements), query=self._query_summary(statements[0][0]) if statements else "")
+
+        def work(tx) -> List[list]:
+            return [list(tx.run(query, parameters)) for query, parameters in statements]
+
+        with self.driver.session() as session:
+            return session.execute_write(work) if write else session.execute_read(work)
+
+    def execute_schema(self, statement: str) -> None:
+        """
+        Executes a schema statement, e.g. creating an index, these can't share a transaction with data changes so run in
+        an auto-commit transaction of their own.
+
+        :param statement: The Cypher schema statement.
+        """
+        with self.driver.session() as session:
+            session.run(statement).consume()
+
+    def explain(self, query: str, parameters: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """
+        The plan Neo4j would use for a query, without running it.
+
+        :param query: The Cypher query to plan.
+        :param parameters: Parameters of the query, their values don't matter.
+        :return: The root operator of the plan, each operator holds its children under 'children'.
+        """
+        with self.driver.session() as session:
+            return session.run(f"EXPLAIN {query}", parameters).consume().plan
+
+    @traced("neo4j.execute_delete")
     @handle_errors(debug_logging=True, raise_errors=True)
     def execute_delete(self, query: str, parameters: Optional[Dict[str, Any]] = None) -> None:
         """
@@ -92,6 +162,56 @@ class Neo4jDriver:
         :param query: The Cypher query for the delete operation.
         :param parameters: Optional parameters for the query.
         """
+        annotate(query=self._query_summary(query))
         with self.driver.session() as session:
             session.write_transaction(lambda tx: tx.run(query, parameters))
             logging.info(f"Successfully executed delete operation: {query} with params: {parameters}")
+
+
+class UnitOfWork:
+    """
+    Statements queued up to be committed in one managed transaction, so an operation spanning several statements
+    opens a single session, makes a single round of commits and is applied all or nothing.
+
+    Used as a context manager the statements are committed when the block exits, unless it raised, in which case they
+    are discarded. The results of each statement are available once committed.
+    """
+
+    def __init__(self, driver: Neo4jDriver, write: bool = True):
+        self._driver = driver
+        self.write = write
+        self.statements: List[Tuple[str, Optional[Dict[str, Any]]]] = []
+        self.results: Optional[List[list]] = None
+
+    def add(self, query: str, parameters: Optional[Dict[str, Any]] = None) -> int:
+        """
+        Queues a statement.
+
+        :param query: The Cypher query string to execute.
+        :param parameters: The parameters to be passed to the query.
+        :return: The statement's index, to look up its result after commit.
+        """
+        if self.results is not None:
+            raise RuntimeError("Statements can't be added to a unit of work that has been committed")
+
+        self.statements.append((query, parameters))
+        return len(self.statements) - 1
+
+    def commit(self) -> List[list]:
+        """Runs the queued statements in one transaction, returning the records of each"""
+        if self.results is None:
+            self.results = self._driver.execute_batch(self.statements, self.write) if self.statements else []
+        return self.results
+
+    def value(self, index: int, field: str) -> Optional[Any]:
+        """A field of the first record returned by a committed statement, None if it returned no records"""
+        records = self.results[index]
+        return records[0].get(field) if records else None
+
+    def __enter__(self) -> "UnitOfWork":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> bool:
+        if exc_type is None:
+            self.commit()
+        return False
@@ -6,15 +6,17 @@ import time
 import shortuuid
 
 from datetime import datetime
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Tuple
 
 from Data.Neo4j import CypherQueries
-from Constants.Constants import DEFAULT_USER_PARAMETERS
+from Constants.Constants import DEFAULT_USER_PARAMETERS, SEARCH_TYPES, DEFAULT_SEARCH_PAGE_SIZE, PREVIEW_LENGTH
 from Constants.Exceptions import failed_to_create_user_topic
 from Data.Neo4j.Neo4jDriver import Neo4jDriver
 from Data.Files.StorageMethodology import StorageMethodology
 from Utilities.Contexts import get_user_context, get_message_context, get_earmarked_sum, set_earmarked_sum
 from Utilities.Decorators.Decorators import handle_errors
+from Utilities.Pagination import Page, paginate
+from Utilities.Search import lucene_query, search_terms, snippet
 from Utilities.Validation import check_valid_uuid
 
 
@@ -169,16 +171,42 @@ class NodeDatabaseManagement:
         )
 
         if records:
-            record = records[0]
-            return {
-                "id": record["id"],
-                "prompt": record["prompt"],
-                "response": record["response"],
-                "time": record["time"]
-            }
+            return self._message_from_record(records[0])
 
         return None
 
+    @handle_errors()
+    def get_messages_by_ids(self, message_ids: List[str]) -> List[Dict[str, Any]]:
+        """Retrieve several messages in a single query.
+
+        :param message_ids: IDs of the messages.
+        :return: The user's messages in the order their ids were given, ids that weren't found are left out.
+        """
+        if not message_ids:
+            return []
+
+        parameters = {
+            "user_id": get_user_context(),
+            "message_ids": list(dict.fromkeys(message_ids)),
+        }
+
+        records = self.neo4jDriver.execute_read(
+            CypherQueries.GET_MESSAGES_BY_IDS,
+            parameters
+        )
+
+        messages = {record["id"]: self._message_from_record(record) for record in records}
+        return [messages[message_id] for message_id in message_ids if message_id in messages]
+
+    @staticmethod
+    def _message_from_record(record) -> Dict[str, Any]:
+        return {
+            "id": record["id"],
+            "prompt": record["prompt"],
+            "response": record["response"],
+            "time": record["time"]
+        }
+
     @handle_errors()
     def create_user_prompt_node(self, category: str) -> str:
         """
@@ -203,6 +231,103 @@ class NodeDatabaseManagement:
         logging.info(f"User prompt node created with ID: {user_prompt_id} for category: {category}")
         return user_prompt_id
 
+    @handle_errors(raise_errors=True)
+    def create_user_prompt_node_in_existing_category(self, category: str) -> Optional[str]:
+        """
+        Looks up the category and creates the placeholder USER_PROMPT node in it, in one transaction.
+
+        :param category: Name of the category the new user prompt will belong to
+        :return: The id of the category, or None if the user has no such category, in which case no node is created
+        """
+        parameters = {
+            "user_id": get_user_context(),
+            "message_id": get_message_context(),
+            "category": category,
+            "category_name": category
+        }
+
+        with self.neo4jDriver.unit_of_work() as unit:
+            category_lookup = unit.add(CypherQueries.GET_CATEGORY_ID, parameters)
+            user_prompt_creation = unit.add(CypherQueries.CREATE_USER_PROMPT_NODE, parameters)
+
+        category_id = unit.value(category_lookup, "category_id")
+        if category_id:
+            logging.info(
+                f"User prompt node created with ID: {unit.value(user_prompt_creation, 'user_prompt_id')} for "
+                f"category: {category}"
+            )
+        return category_id
+
+    @handle_errors()
+    def create_unassigned_user_prompt_node(self) -> str:
+        """
+        Creates a placeholder USER_PROMPT node before its category is known, so costs can be expensed against it while
+        categorisation is still running. See assign_user_prompt_to_category.
+
+        :return: The user_prompt_id associated with the new user prompt node.
+        """
+        parameters = {
+            "user_id": get_user_context(),
+            "message_id": get_message_context()
+        }
+
+        user_prompt_id = self.neo4jDriver.execute_write(
+            CypherQueries.CREATE_UNASSIGNED_USER_PROMPT_NODE,
+            parameters,
+            "user_prompt_id"
+        )
+
+        logging.info(f"Unassigned user prompt node created with ID: {user_prompt_id}")
+        return user_prompt_id
+
+    @handle_errors(raise_errors=True)
+    def assign_user_prompt_to_category(self, category_id: str) -> str:
+        """
+        (Re-)parents the current USER_PROMPT node to the given category, replacing any category it previously belonged
+        to.
+
+        :param category_id: The id of the category the user prompt belongs to
+        :return: The user_prompt_id of the re-parented node.
+        """
+        parameters = {
+            "user_id": get_user_context(),
+            "message_id": get_message_context(),
+            "category_id": category_id
+        }
+
+        user_prompt_id = self.neo4jDriver.execute_write(
+            CypherQueries.ASSIGN_USER_PROMPT_TO_CATEGORY,
+            parameters,
+            "user_prompt_id"
+        )
+
+        logging.info(f"User prompt node {user_prompt_id} assigned to category: {category_id}")
+        return user_prompt_id
+
+    @handle_errors(raise_errors=True)
+    def assign_user_prompt_to_existing_category(self, category: str) -> Optional[str]:
+        """
+        (Re-)parents the current USER_PROMPT node to the category with the given name, if the user has one.
+
+        :param category: Name of the category the user prompt belongs to
+        :return: The id of the category, or None if the user has no such category
+        """
+        parameters = {
+            "user_id": get_user_context(),
+            "message_id": get_message_context(),
+            "category_name": category
+        }
+
+        category_id = self.neo4jDriver.execute_write(
+            CypherQueries.ASSIGN_USER_PROMPT_TO_NAMED_CATEGORY,
+            parameters,
+            "category_id"
+        )
+
+        if category_id:
+            logging.info(f"User prompt node assigned to category: {category} [{category_id}]")
+        return category_id
+
     @handle_errors()
     def populate_user_prompt_node(self, category: str, user_prompt: str, llm_response: str) -> str | None:
         """
@@ -239,26 +364,33 @@ class NodeDatabaseManagement:
         logging.info(f"User prompt node populated with ID: {user_prompt_id}")
         return user_prompt_id
 
-    @handle_errors()
-    def get_messages_by_category(self, category_name: str) -> List[Dict[str, Any]]:
-        """Retrieve messages linked to a specific category.
+    @handle_errors(raise_errors=True)
+    def get_messages_by_category(
+        self,
+        category_name: str,
+        page: Page = Page()
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Retrieve a page of the messages linked to a specific category, newest first.
 
         :param category_name: The category to retrieve messages for.
-        :return: A list of messages related to that category.
+        :param page: Which page to retrieve, and whether to truncate the prompts and responses to previews.
+        :return: The messages in the page and the cursor of the next page, None if this is the last page.
         """
         parameters = {
             "user_id": get_user_context(),
-            "category_name": category_name
+            "category_name": category_name,
+            **page.parameters()
         }
 
         records = self.neo4jDriver.execute_read(CypherQueries.GET_MESSAGES, parameters)
-        return [
-            {"id": record["id"],
-             "prompt": record["prompt"],
-             "response": record["response"],
-             "cost": record.get("cost", 0),
-             "time": record["time"]} for record in records
-        ]
+        return paginate(records, page, lambda record: {
+            "id": record["id"],
+            "prompt": record["prompt"],
+            "response": record["response"],
+            "cost": record.get("cost", 0),
+            "time": record["time"],
+            "truncated": record["truncated"]
+        })
 
     @handle_errors()
     def delete_message_by_id(self, message_id: str) -> None:
@@ -352,6 +484,38 @@ class NodeDatabaseManagement:
             parameters
         )
 
+    @handle_errors(raise_errors=True)
+    def create_category_and_assign_user_prompt(
+        self,
+        category_id: str,
+        category_name: str,
+        category_instructions: str,
+        colour: str = "#111111",
+    ) -> None:
+        """
+        The speculative counterpart to create_category_and_user_prompt, creates a new category and re-parents the
+        existing USER_PROMPT node to it, in one transaction.
+
+        :param category_id: The id of the new category node
+        :param category_name: The name of the new category.
+        :param category_instructions: A concise one sentence instructions of the new category
+        :param colour: the HEX colour assigned to the category
+        """
+        logging.info(f"Creating new category [{category_id}]: {category_name} - {category_instructions}")
+
+        parameters = {
+            "user_id": get_user_context(),
+            "message_id": get_message_context(),
+            "category_name": category_name.lower(),
+            "category_instructions": category_instructions,
+            "category_id": category_id,
+            "colour": colour
+        }
+
+        with self.neo4jDriver.unit_of_work() as unit:
+            unit.add(CypherQueries.CREATE_CATEGORY, parameters)
+            unit.add(CypherQueries.ASSIGN_USER_PROMPT_TO_CATEGORY, parameters)
+
     @handle_errors()
     def get_category_id(self, category_name: str) -> Optional[str]:
         """Retrieve the ID of a category by its name.
@@ -376,6 +540,34 @@ class NodeDatabaseManagement:
             logging.info(f"Category ID not found for {category_name}.")
             return None
 
+    @handle_errors()
+    def get_category_conversation_summary(self, category_id: str) -> Tuple[Optional[str], int]:
+        """
+        :param category_id: ID of the category in the node database.
+        :return: The category's conversation summary, None if it hasn't been summarised, and its version
+        """
+        records = self.neo4jDriver.execute_read(
+            CypherQueries.GET_CATEGORY_CONVERSATION_SUMMARY,
+            {"user_id": get_user_context(), "category_id": category_id}
+        )
+        if not records:
+            return None, 0
+        return records[0]["summary"], records[0]["version"]
+
+    @handle_errors(raise_errors=True)
+    def update_category_conversation_summary(self, category_id: str, summary: str, version: int) -> Optional[int]:
+        """
+        :param category_id: ID of the category in the node database.
+        :param summary: The new conversation summary
+        :param version: The version of the summary it was built on
+        :return: The summary's new version, None if it's no longer at the version given
+        """
+        return self.neo4jDriver.execute_write(
+            CypherQueries.UPDATE_CATEGORY_CONVERSATION_SUMMARY,
+            {"user_id": get_user_context(), "category_id": category_id, "summary": summary, "version": version},
+            "version"
+        )
+
     @handle_errors()
     def get_category_system_message(self, category_id: str) -> Optional[str]:
         """Retrieve the system message of a category by its id.
@@ -450,7 +642,8 @@ class NodeDatabaseManagement:
                 "id": record["category_id"],
                 "name": record["category_name"],
                 "instructions": record.get("instructions"),
-                "colour": record["colour"]
+                "colour": record["colour"],
+                "message_count": record["message_count"]
             } for record in result]
 
         return categories
@@ -466,7 +659,8 @@ class NodeDatabaseManagement:
             {
                 "id": record["category_id"],
                 "name": record["category_name"],
-                "colour": record["colour"]
+                "colour": record["colour"],
+                "file_count": record["file_count"]
             } for record in result]
 
         return categories
@@ -498,38 +692,47 @@ class NodeDatabaseManagement:
         :param summary: An optional summary describing the document for the user
         :returns: The UUID of the new file node
         """
-        file_uuid = str(shortuuid.uuid())
-        time = int(datetime.now().timestamp())
-        file_name = os.path.basename(file_path)
-        user_prompt_id = get_user_context()
+        return self.create_file_nodes([(category_id, file_path, size, summary)])[0]
 
-        parameters = {
-            "file_id": file_uuid,
-            "user_id": get_user_context(),
-            "category_id": category_id,
-            "user_prompt_id": user_prompt_id,
-            "name": file_name,
-            "time": time,
-            "size": size,
-            "summary": summary,
-            "structure": "PROTOTYPING"
-        }
-
-        logging.info(f"Creating file node: {file_path} against prompt [{user_prompt_id}]\nSummary: {summary}")
-        self.neo4jDriver.execute_write(
-            CypherQueries.CREATE_FILE_NODE,
-            parameters
-        )
+    @handle_errors()
+    def create_file_nodes(self, files: List[Tuple[str, str, int, Optional[str]]]) -> List[str]:
+        """Creates file nodes for several files, and adds their size to the user's uploaded data, in one transaction.
 
-        self.neo4jDriver.execute_write(
-            CypherQueries.UPDATE_USER_DATA_UPLOADED_SIZE,
-            {
-                "user_id": get_user_context(),
-                "size": size
-            }
-        )
+        :param files: (category id, file path, size in bytes, optional summary) of each file.
+        :returns: The UUIDs of the new file nodes, in the same order
+        """
+        time = int(datetime.now().timestamp())
+        user_prompt_id = get_user_context()
 
-        return file_uuid
+        file_uuids = []
+        with self.neo4jDriver.unit_of_work() as unit:
+            for category_id, file_path, size, summary in files:
+                file_uuid = str(shortuuid.uuid())
+                parameters = {
+                    "file_id": file_uuid,
+                    "user_id": get_user_context(),
+                    "category_id": category_id,
+                    "user_prompt_id": user_prompt_id,
+                    "name": os.path.basename(file_path),
+                    "time": time,
+                    "size": size,
+                    "summary": summary,
+                    "structure": "PROTOTYPING"
+                }
+
+                logging.info(f"Creating file node: {file_path} against prompt [{user_prompt_id}]\nSummary: {summary}")
+                unit.add(CypherQueries.CREATE_FILE_NODE, parameters)
+                file_uuids.append(file_uuid)
+
+            unit.add(
+                CypherQueries.UPDATE_USER_DATA_UPLOADED_SIZE,
+                {
+                    "user_id": get_user_context(),
+                    "size": sum(size for _, _, size, _ in files)
+                }
+            )
+
+        return file_uuids
 
     @handle_errors()
     def get_file_by_id(self, file_id: str):
@@ -554,8 +757,37 @@ class NodeDatabaseManagement:
         if not records:
             return None
 
-        record = records[0]
+        return self._file_from_record(records[0])
+
+    @handle_errors()
+    def get_files_by_ids(self, file_ids: List[str]) -> List[Dict[str, Any]]:
+        """
+        Retrieve several files in a single query, including the categories they're attached to
+
+        :param file_ids: IDs of the files.
+        :return: The user's files in the order their ids were given, ids that are invalid or weren't found are left out.
+        """
+        valid_ids = []
+        for file_id in file_ids:
+            if file_id and check_valid_uuid(file_id):
+                valid_ids.append(file_id)
+            else:
+                logging.warning(f"Invalid file id {file_id}")
+
+        if not valid_ids:
+            return []
+
+        parameters = {
+            "user_id": get_user_context(),
+            "file_ids": list(dict.fromkeys(valid_ids))
+        }
+
+        records = self.neo4jDriver.execute_read(CypherQueries.GET_FILES_BY_IDS, parameters)
+        files = {record["id"]: self._file_from_record(record) for record in records}
+        return [files[file_id] for file_id in valid_ids if file_id in files]
 
+    @staticmethod
+    def _file_from_record(record) -> Dict[str, Any]:
         return {
             "id": record["id"],
             "category_id": record["category"],
@@ -566,30 +798,35 @@ class NodeDatabaseManagement:
             "size": record.get("size", 0)
         }
 
-    @handle_errors()
-    def get_files_by_category(self, category_name: str) -> List[Dict[str, Any]]:
-        """Retrieve all files associated with a specified category.
+    @handle_errors(raise_errors=True)
+    def get_files_by_category(
+        self,
+        category_name: str,
+        page: Page = Page()
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Retrieve a page of the files associated with a specified category, newest first.
 
         :param category_name: Name of the category.
-        :return: A list of files related to that category.
+        :param page: Which page to retrieve, and whether to truncate the summaries and structures to previews.
+        :return: The files in the page and the cursor of the next page, None if this is the last page.
         """
         parameters = {
             "user_id": get_user_context(),
-            "category_name": category_name
+            "category_name": category_name,
+            **page.parameters()
         }
 
         records = self.neo4jDriver.execute_read(CypherQueries.GET_FILES_FOR_CATEGORY, parameters)
-        return [
-            {
-                "id": record["id"],
-                "category_id": record["category_id"],
-                "name": record["name"],
-                "summary": record["summary"],
-                "structure": record["structure"],
-                "time": record["time"],
-                "size": record.get("size", 0)
-            } for record in records
-        ]
+        return paginate(records, page, lambda record: {
+            "id": record["id"],
+            "category_id": record["category_id"],
+            "name": record["name"],
+            "summary": record["summary"],
+            "structure": record["structure"],
+            "time": record["time"],
+            "size": record.get("size", 0),
+            "truncated": record["truncated"]
+        })
 
     @handle_errors()
     def delete_file_by_id(self, file_id: str) -> None:
@@ -612,25 +849,34 @@ class NodeDatabaseManagement:
     # User Topics
 
     def create_user_topic_nodes(self, terms: List[Dict[str, str]]) -> None:
-        """Creates user topic nodes in the database.
+        """Creates, or adds to, the user's topic nodes in a single write.
+
+        Terms noting the same topic are merged into one set of properties, a later term's content replacing an earlier
+        one's for the same parameter.
 
-        :param terms: List of terms to create user topics for.
+        :param terms: List of terms to create user topics for, each with a node, parameter and content.
         """
         logging.info(f"Noted the following user topics: {terms}")
 
+        topics: Dict[str, Dict[str, str]] = {}
         for term in terms:
-            parameters = {
-                "user_id": get_user_context(),
-                "node_name": term.get('node').lower(),
-                "content": term.get('content')
-            }
-            try:
-                self.neo4jDriver.execute_write(
-                    CypherQueries.format_create_user_topic_query(term.get('parameter')),
-                    parameters
-                )
-            except Exception:
-                logging.exception(failed_to_create_user_topic(str(term)))
+            node_name, parameter = term.get('node'), term.get('parameter')
+            if not node_name or not parameter or parameter == "_name_":
+                logging.warning(failed_to_create_user_topic(str(term)))
+                continue
+            topics.setdefault(node_name.lower(), {})[parameter] = term.get('content')
+
+        if not topics:
+            return
+
+        parameters = {
+            "user_id": get_user_context(),
+            "topics": [{"name": name, "properties": properties} for name, properties in topics.items()]
+        }
+        try:
+            self.neo4jDriver.execute_write(CypherQueries.CREATE_USER_TOPICS, parameters)
+        except Exception:
+            logging.exception(failed_to_create_user_topic(str(terms)))
 
     @handle_errors()
     def search_for_user_topic_content(self, term: str, synonyms: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
@@ -655,6 +901,7 @@ class NodeDatabaseManagement:
             record = records[0]
             if record:
                 node_content = record["all_properties"]
+                node_content.pop("_text_", None)
                 logging.info(f"Extracted content for {term}: {node_content}")
                 return node_content
 
@@ -688,6 +935,78 @@ class NodeDatabaseManagement:
         )
         return records[0]["data_uploaded"]
 
+    # Search
+
+    @handle_errors(raise_errors=True)
+    def search(
+        self,
+        query: str,
+        types: List[str] = SEARCH_TYPES,
+        limit: int = DEFAULT_SEARCH_PAGE_SIZE,
+        offset: int = 0
+    ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """Full-text search of the user's messages, files and topics, most relevant first.
+
+        :param query: The search as the user typed it.
+        :param types: Which of "messages", "files" and "topics" to search.
+        :param limit: How many results to return.
+        :param offset: How many results earlier pages held.
+        :return: The results, each with a snippet of the text that matched, and the offset of the next page, None if
+         this is the last page.
+        """
+        lucene = lucene_query(query)
+        if not lucene:
+            return [], None
+
+        parameters = {
+            "user_id": get_user_context(),
+            "query": lucene,
+            # Every result before the page could come from any of the types searched
+            "limit": offset + limit + 1
+        }
+
+        results = []
+        if "messages" in types:
+            results.extend({
+                "type": "message",
+                "id": record["id"],
+                "category_id": record["category_id"],
+                "category_name": record["category_name"],
+                "title": record["prompt"],
+                "text": f"{record['prompt'] or ''}\n{record['response'] or ''}",
+                "time": record["time"],
+                "score": record["score"]
+            } for record in self.neo4jDriver.execute_read(CypherQueries.SEARCH_MESSAGES, parameters))
+        if "files" in types:
+            results.extend({
+                "type": "file",
+                "id": record["id"],
+                "category_id": record["category_id"],
+                "category_name": record["category_name"],
+                "title": record["name"],
+                "text": record["summary"],
+                "time": record["time"],
+                "score": record["score"]
+            } for record in self.neo4jDriver.execute_read(CypherQueries.SEARCH_FILES, parameters))
+        if "topics" in types:
+            results.extend({
+                "type": "topic",
+                "id": record["name"],
+                "title": record["name"],
+                "text": record["text"],
+                "score": record["score"]
+            } for record in self.neo4jDriver.execute_read(CypherQueries.SEARCH_USER_TOPICS, parameters))
+
+        results.sort(key=lambda result: result["score"], reverse=True)
+        page = results[offset:offset + limit]
+
+        terms = search_terms(query)
+        for result in page:
+            result["title"] = snippet(result["title"], terms, PREVIEW_LENGTH)
+            result["snippet"] = snippet(result.pop("text"), terms)
+
+        return page, offset + limit if len(results) > offset + limit else None
+
     # Pricing
 
     @handle_errors()
@@ -865,6 +1184,44 @@ class NodeDatabaseManagement:
         )
         logging.info(f"System OpenAi balance updated by: {amount}")
 
+    @handle_errors(raise_errors=True)
+    def commit_cost_ledger(
+        self,
+        ledger_id: str,
+        user_id: str,
+        user_total: float,
+        node_charges: Dict[str, float],
+        functionality_charges: Dict[str, float],
+        system_charges: Dict[str, float]
+    ) -> Optional[str]:
+        """
+        Applies a request's aggregated costs in a single transaction, see CostLedger.
+
+        :param ledger_id: Identifies the request, a ledger is only ever applied once
+        :param user_id: The user to deduct the total from
+        :param user_total: The total cost of the request, positive
+        :param node_charges: Costs per node id
+        :param functionality_charges: Costs per user functionality cost property
+        :param system_charges: Costs per SYSTEM balance property
+        :return: The ledger id if applied, None if it had already been committed
+        """
+        parameters = {
+            "ledger_id": ledger_id,
+            "user_id": user_id,
+            "user_total": user_total,
+            "node_charges": [{"node_id": node_id, "amount": amount} for node_id, amount in node_charges.items()],
+            "functionality_charges": [
+                {"property": property_name, "amount": amount} for property_name, amount in functionality_charges.items()
+            ],
+            "system_charges": [
+                {"property": property_name, "amount": amount} for property_name, amount in system_charges.items()
+            ],
+        }
+
+        committed = self.neo4jDriver.execute_write(CypherQueries.COMMIT_COST_LEDGER, parameters, "ledger_id")
+        logging.info(f"Cost ledger [{ledger_id}] for user {user_id}: ${user_total} - committed: {committed}")
+        return committed
+
     @handle_errors()
     def expense_node(self, node_id: str, amount: float) -> None:
         """Attaches a cost information to a give node
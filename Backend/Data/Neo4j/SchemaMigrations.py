@@ -0,0 +1,246 @@
+"""
+Creates the indexes and constraints the queries in CypherQueries.py rely on, so they look nodes up by index rather than
+scanning every node of a label (or every node) in the graph.
+
+Migrations are applied in order and recorded as SCHEMA_MIGRATION nodes, each statement is idempotent (IF NOT EXISTS,
+or a backfill that recomputes its values) so a migration interrupted part way is simply run again. A failed migration
+stops the run, later ones may rely on it. The app applies the schema migrations when it starts and queues the data
+migrations, which touch every node of a label, as a background job. The CLI applies both.
+
+Usage (from the Backend directory):
+    python -m Data.Neo4j.SchemaMigrations
+    python -m Data.Neo4j.SchemaMigrations --check-plans
+    python -m Data.Neo4j.SchemaMigrations --backfill-category-stats
+"""
+import argparse
+import logging
+import re
+import string
+import sys
+from typing import Any, Dict, List, NamedTuple, Optional, Set
+
+from Constants.Exceptions import failed_to_apply_schema_migration, query_plan_scans, DATA_MIGRATIONS_FAILED
+from Data.Neo4j import CypherQueries
+from Data.Neo4j.Neo4jDriver import Neo4jDriver
+from Utilities.Decorators.Decorators import handle_errors
+from Utilities.JobQueue import JobQueue
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    statements: List[str]
+    data: bool = False
+
+
+MIGRATIONS = [
+    Migration(1, "Unique ids of users, categories and the system node", [
+        "CREATE CONSTRAINT user_id IF NOT EXISTS FOR (user:USER) REQUIRE user.id IS UNIQUE",
+        "CREATE CONSTRAINT category_id IF NOT EXISTS FOR (category:CATEGORY) REQUIRE category.id IS UNIQUE",
+        "CREATE CONSTRAINT system_id IF NOT EXISTS FOR (system:SYSTEM) REQUIRE system.id IS UNIQUE",
+    ]),
+    Migration(2, "Unique ids of messages, files and cost ledgers", [
+        "CREATE CONSTRAINT user_prompt_id IF NOT EXISTS FOR (user_prompt:USER_PROMPT) REQUIRE user_prompt.id IS UNIQUE",
+        "CREATE CONSTRAINT file_id IF NOT EXISTS FOR (file:FILE) REQUIRE file.id IS UNIQUE",
+        "CREATE CONSTRAINT cost_ledger_id IF NOT EXISTS FOR (ledger:COST_LEDGER) REQUIRE ledger.id IS UNIQUE",
+        "CREATE CONSTRAINT schema_migration_version IF NOT EXISTS "
+        "FOR (migration:SCHEMA_MIGRATION) REQUIRE migration.version IS UNIQUE",
+    ]),
+    Migration(3, "Lookups by email and name", [
+        "CREATE INDEX user_email IF NOT EXISTS FOR (user:USER) ON (user.email)",
+        "CREATE INDEX category_name IF NOT EXISTS FOR (category:CATEGORY) ON (category.name)",
+        "CREATE INDEX file_name IF NOT EXISTS FOR (file:FILE) ON (file.name)",
+        "CREATE INDEX user_topic_name IF NOT EXISTS FOR (user_topic:USER_TOPIC) ON (user_topic._name_)",
+    ]),
+    # Run in an auto-commit transaction, like the schema statements, so it can commit in batches
+    Migration(4, "Backfill category activity stats", [
+        CypherQueries.BACKFILL_CATEGORY_STATS,
+    ], data=True),
+    Migration(5, "A copy of each shared user topic for every user it relates to", [
+        CypherQueries.SPLIT_SHARED_USER_TOPICS,
+    ], data=True),
+    # Named in the SEARCH_ queries
+    Migration(6, "Full-text indexes over messages, files and user topics", [
+        "CREATE FULLTEXT INDEX user_prompt_text IF NOT EXISTS "
+        "FOR (user_prompt:USER_PROMPT) ON EACH [user_prompt.prompt, user_prompt.response]",
+        "CREATE FULLTEXT INDEX file_text IF NOT EXISTS FOR (file:FILE) ON EACH [file.name, file.summary]",
+        "CREATE FULLTEXT INDEX user_topic_text IF NOT EXISTS "
+        "FOR (user_topic:USER_TOPIC) ON EACH [user_topic._name_, user_topic._text_]",
+    ]),
+    # Split from 6 so the index is created at startup, recomputes _text_ where 6 already ran
+    Migration(7, "Backfill the searchable text of user topics", [
+        CypherQueries.BACKFILL_USER_TOPIC_TEXT,
+    ], data=True),
+]
+
+SCAN_OPERATORS = {"AllNodesScan", "NodeByLabelScan"}
+
+# Queries allowed to scan, with why it's harmless
+ALLOWED_SCANS = {
+    "GET_SYSTEM_GEMINI_BALANCE": "there's a single SYSTEM node",
+    "UPDATE_SYSTEM_GEMINI_BALANCE": "there's a single SYSTEM node",
+    "UPDATE_SYSTEM_OPEN_AI_BALANCE": "there's a single SYSTEM node",
+    "NEW_USER_PROMOTIONS_REMAINING": "there's a single SYSTEM node",
+    "APPLY_NEW_USER_PROMOTION": "there's a single SYSTEM node",
+    "COMMIT_COST_LEDGER": "there's a single SYSTEM node",
+    "GET_APPLIED_SCHEMA_MIGRATIONS": "run at startup, over a handful of nodes",
+    "BACKFILL_CATEGORY_STATS": "a one off backfill of every category",
+    "SPLIT_SHARED_USER_TOPICS": "a one off migration of every user topic",
+    "BACKFILL_USER_TOPIC_TEXT": "a one off backfill of every user topic",
+}
+
+PARAMETER = re.compile(r"\$(\w+)")
+
+
+def _driver() -> Neo4jDriver:
+    from Data.Neo4j.NodeDatabaseManagement import NodeDatabaseManagement
+    return NodeDatabaseManagement().neo4jDriver
+
+
+def _applied(driver: Neo4jDriver) -> Set[int]:
+    return {record["version"] for record in driver.execute_read(CypherQueries.GET_APPLIED_SCHEMA_MIGRATIONS) or []}
+
+
+@handle_errors()
+def migrate(driver: Optional[Neo4jDriver] = None, include_data: bool = True) -> List[int]:
+    """
+    Applies every migration that hasn't been applied yet.
+
+    A migration that fails is left unrecorded, so it's retried next time, and stops the run.
+
+    :param driver: The database to migrate, by default the app's
+    :param include_data: False to leave the data migrations pending, e.g. for schedule_data_migrations
+    :return: The versions applied by this run, None if a migration failed
+    """
+    driver = driver or _driver()
+    applied = _applied(driver)
+
+    newly_applied = []
+    for migration in MIGRATIONS:
+        if migration.version in applied or (migration.data and not include_data):
+            continue
+
+        try:
+            for statement in migration.statements:
+                driver.execute_schema(statement)
+        except Exception as e:
+            raise Exception(failed_to_apply_schema_migration(migration.version, e)) from e
+
+        driver.execute_write(
+            CypherQueries.RECORD_SCHEMA_MIGRATION,
+            {"version": migration.version, "description": migration.description}
+        )
+        logging.info(f"Applied schema migration {migration.version}: {migration.description}")
+        newly_applied.append(migration.version)
+
+    return newly_applied
+
+
+def migrate_data() -> None:
+    """Applies the pending migrations, raises on failure so the job is retried"""
+    if migrate() is None:
+        raise Exception(DATA_MIGRATIONS_FAILED)
+
+
+@handle_errors()
+def schedule_data_migrations(driver: Optional[Neo4jDriver] = None) -> None:
+    """
+    Queues the data migrations that haven't been applied yet as a background job, so they don't hold up startup.
+    Keyed by the versions pending, so each set is queued once.
+    """
+    applied = _applied(driver or _driver())
+    pending = [
+        str(migration.version) for migration in MIGRATIONS if migration.data and migration.version not in applied
+    ]
+    if pending:
+        JobQueue().enqueue(MIGRATE_DATA_JOB, {}, f"{MIGRATE_DATA_JOB}:{','.join(pending)}")
+
+
+def queries() -> Dict[str, str]:
+    """Every query in CypherQueries.py, by name, with any templated fields filled in"""
+    found = {}
+    for name, value in vars(CypherQueries).items():
+        if not name.isupper() or not isinstance(value, str):
+            continue
+
+        if "{{" in value:
+            # Templated, the fields are filled in before the query is run
+            fields = {field for _, field, _, _ in string.Formatter().parse(value) if field}
+            value = value.format(**{field: "plan_check" for field in fields})
+        found[name] = value
+    return found
+
+
+def scans(plan: Dict[str, Any]) -> List[str]:
+    """The scan operators in a plan, with the details of what they scan"""
+    found = []
+    operator = plan.get("operatorType", "").split("@")[0]
+    if operator in SCAN_OPERATORS:
+        found.append(f"{operator} {plan.get('args', plan.get('arguments', {})).get('Details', '')}".strip())
+
+    for child in plan.get("children", []):
+        found.extend(scans(child))
+    return found
+
+
+def check_query_plans(driver: Optional[Neo4jDriver] = None) -> Dict[str, List[str]]:
+    """
+    EXPLAINs every query in CypherQueries.py, parameters are set to null as their values don't affect the plan.
+
+    :param driver: The database to plan against, it should already be migrated
+    :return: The scans planned by each query not in ALLOWED_SCANS, an empty dict if there are none
+    """
+    driver = driver or _driver()
+
+    failures = {}
+    for name, query in queries().items():
+        if name in ALLOWED_SCANS:
+            continue
+
+        plan = driver.explain(query, {parameter: None for parameter in PARAMETER.findall(query)})
+        found = scans(plan or {})
+        if found:
+            logging.error(query_plan_scans(name, found))
+            failures[name] = found
+
+    return failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Apply Neo4j schema migrations")
+    parser.add_argument("--check-plans", action="store_true",
+                        help="After migrating, fail if any query in CypherQueries.py plans a scan")
+    parser.add_argument("--backfill-category-stats", action="store_true",
+                        help="Recompute every category's message and file counts and latest activity times")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    driver = _driver()
+
+    applied = migrate(driver)
+    if applied is None:
+        return 1
+    print(f"Applied migrations: {applied or 'none, the schema is current'}")
+
+    if args.backfill_category_stats:
+        driver.execute_schema(CypherQueries.BACKFILL_CATEGORY_STATS)
+        print("Backfilled category activity stats")
+
+    if args.check_plans:
+        failures = check_query_plans(driver)
+        for name, found in failures.items():
+            print(f"{name}: {', '.join(found)}")
+        if failures:
+            return 1
+        print("No query plans a scan")
+
+    return 0
+
+
+MIGRATE_DATA_JOB = "migrate_data"
+
+JobQueue().register(MIGRATE_DATA_JOB, migrate_data)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
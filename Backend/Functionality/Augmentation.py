@@ -6,7 +6,7 @@ from AiOrchestration.AiOrchestrator import AiOrchestrator
 from Data.Configuration import Configuration
 from Constants.Instructions import AUTO_ENGINEER_PROMPT_SYSTEM_MESSAGE, QUESTION_PROMPT_SYSTEM_MESSAGE, \
     AUTO_SELECT_WORKFLOW_SYSTEM_MESSAGE, AUTO_SELECT_WORKER_SYSTEM_MESSAGE
-from Utilities.Decorators.Decorators import return_for_error
+from Utilities.Decorators.Decorators import return_for_error, specify_functionality_context
 from Workers.BaseWorker import BaseWorker
 from Workers.Default import Default
 from Workers.WorkerManagement import get_selected_worker, WORKER_MAPPING, DEFAULT_WORKER
@@ -25,6 +25,7 @@ DEFAULT_WORKFLOW = Workflow.CHAT
 class Augmentation:
     @staticmethod
     @return_for_error(Default)
+    @specify_functionality_context("select_worker")
     def select_worker(user_prompt: str) -> str:
         """
         Provides a string representing a worker based on the user prompt.
@@ -40,7 +41,8 @@ class Augmentation:
 
         llm_response = AiOrchestrator().execute(
             [worker_selection_system_message],
-            [f"user prompt: \"\"\"\n{user_prompt}\n\"\"\""]
+            [f"user prompt: \"\"\"\n{user_prompt}\n\"\"\""],
+            cache=True
         ).strip().lower()
 
         logging.info(f"LLM selected worker: {llm_response}")
@@ -52,6 +54,7 @@ class Augmentation:
 
     @staticmethod
     @return_for_error(DEFAULT_WORKFLOW)
+    @specify_functionality_context("select_workflow")
     def select_workflow(user_prompt: str, tags: Dict[str, str] = None, selected_files: List[Dict[str, str]] = None) -> Workflow:
         """
         Automatically selects a workflow based on the user prompt using AI deliberation.
@@ -81,7 +84,8 @@ class Augmentation:
         # Execute the LLM call to determine the workflow
         llm_response = AiOrchestrator().execute(
             [workflow_selection_system_message],
-            [f"user prompt: \"\"\"\n{user_prompt}\n\"\"\""]
+            [f"user prompt: \"\"\"\n{user_prompt}\n\"\"\""],
+            cache=True
         ).strip().lower()
 
         logging.info(f"LLM selected workflow: {llm_response}")
@@ -1,6 +1,7 @@
 import logging
 import os
 import sys
+from typing import Optional, List, Tuple
 
 from AiOrchestration.AiOrchestrator import AiOrchestrator
 from Constants.Constants import USER_DATA_LIMIT
@@ -9,9 +10,10 @@ from Data.Files.StorageMethodology import StorageMethodology
 from Data.Neo4j.NodeDatabaseManagement import NodeDatabaseManagement as nodeDB
 from Data.UserContextManagement import UserContextManagement
 from Constants.Instructions import SUMMARISER_SYSTEM_INSTRUCTIONS
-from Utilities.Contexts import get_user_context
+from Utilities.Contexts import get_user_context, get_message_context, get_category_context
 from Utilities.Decorators.Decorators import handle_errors, specify_functionality_context
-from Utilities.Utility import Utility
+from Utilities.JobQueue import JobQueue
+from Utilities.Tracing import traced
 
 
 class Organising:
@@ -20,10 +22,7 @@ class Organising:
     def process_files(files):
         file_references = []
         if files:
-            for file in files:
-                file_data = nodeDB().get_file_by_id(file.get("id"))
-                if not file_data:
-                    continue
+            for file_data in nodeDB().get_files_by_ids([file.get("id") for file in files]) or []:
                 file_system_address = f"{file_data['category_id']}\\{file_data['name']}"
                 file_references.append(file_system_address)
         return file_references
@@ -60,6 +59,41 @@ class Organising:
 
         return file_uuid
 
+    @staticmethod
+    def save_files(files: List[Tuple[str, str, str]], overwrite=True) -> List[Optional[str]]:
+        """
+        Stores several files, like save_file, with their content uploaded to storage in one batch
+
+        :parameter files: (content, category_id, filename) of each file
+        :parameter overwrite: Whether any existing files should be overwritten with these files content
+        :return: The uuid of each file node, in the same order, None for any file that couldn't be saved
+        """
+        config = Configuration.load_config()
+        summarise = config.get('files', {}).get('summarise_files', False)
+
+        new_user_data_size = nodeDB().retrieve_user_data_uploaded_size() + sum(len(content) for content, _, _ in files)
+        if new_user_data_size > USER_DATA_LIMIT:
+            new_user_data_size_in_gb = new_user_data_size / (1024 * 1024 * 1024)
+            logging.error(
+                f"Safety limit for user {get_user_context()} breached: ({new_user_data_size_in_gb} GB)"
+            )
+            return [None] * len(files)
+
+        file_paths = [os.path.join(category_id, filename) for _, category_id, filename in files]
+        results = StorageMethodology.select().save_many(
+            [(content, file_path) for (content, _, _), file_path in zip(files, file_paths)],
+            overwrite=overwrite
+        )
+
+        saved = [
+            (category_id, file_path, len(content), Organising.summarise_content(content) if summarise else None)
+            for (content, category_id, _), file_path, result in zip(files, file_paths, results)
+            if result.ok
+        ]
+        saved_uuids = iter((nodeDB().create_file_nodes(saved) or [None] * len(saved)) if saved else [])
+
+        return [next(saved_uuids) if result.ok else None for result in results]
+
     @staticmethod
     @specify_functionality_context("summarise_files")
     def summarise_content(content: str) -> str:
@@ -74,29 +108,74 @@ class Organising:
         )
 
     @staticmethod
+    @traced("store_prompt_data")
     @handle_errors
     def store_prompt_data(
         user_prompt: str,
         response_message: str,
-        category: str
+        category: str,
+        sid: Optional[str] = None
     ):
         """
-        Populate the initialised message node with the information created by the request workflow
+        Queues the population of the initialised message node, and the extraction of user topics if enabled, to be
+        done in the background once the response has been sent. Both are keyed by the message id so they only ever
+        happen once per message.
 
         :param user_prompt: The given user prompt starting the evaluation process
         :param response_message: The systems response
         :param category: The category to register against the prompt node
-        :return:
+        :param sid: The socket session to notify once the message has been stored
         """
         config = Configuration.load_config()
-
-        Utility.execute_with_retries(
-            lambda: nodeDB().populate_user_prompt_node(category, user_prompt, response_message)
-        )
+        contexts = {
+            "user_id": get_user_context(),
+            "message_id": get_message_context(),
+            "category_id": get_category_context()
+        }
+
+        JobQueue().enqueue(STORE_PROMPT_DATA_JOB, {
+            **contexts,
+            "user_prompt": user_prompt,
+            "response_message": response_message,
+            "category": category,
+            "sid": sid
+        }, contexts["message_id"])
 
         if config['response_improvement']['user_context_enabled']:
-            terms = UserContextManagement.extract_terms_from_input([user_prompt])
-            nodeDB().create_user_topic_nodes(terms)
+            JobQueue().enqueue(EXTRACT_USER_TOPICS_JOB, {
+                **contexts,
+                "user_prompt": user_prompt
+            }, contexts["message_id"])
+
+    @staticmethod
+    def populate_prompt_data(user_prompt: str, response_message: str, category: str, sid: Optional[str] = None):
+        """
+        Populate the initialised message node with the information created by the request workflow.
+        Raises on failure so the job is retried.
+        """
+        if not nodeDB().populate_user_prompt_node(category, user_prompt, response_message):
+            raise Exception(f"Failed to populate user prompt node [{get_message_context()}]")
+
+        if sid:
+            from App import socketio
+            socketio.emit('trigger_refresh', {
+                "category_name": category,
+                "category_id": get_category_context(),
+                "prompt": user_prompt
+            }, to=sid)
+
+    @staticmethod
+    def extract_user_topics(user_prompt: str):
+        """Extracts user topics from the prompt and stores them against the user"""
+        terms = UserContextManagement.extract_terms_from_input([user_prompt])
+        nodeDB().create_user_topic_nodes(terms)
+
+
+STORE_PROMPT_DATA_JOB = "store_prompt_data"
+EXTRACT_USER_TOPICS_JOB = "extract_user_topics"
+
+JobQueue().register(STORE_PROMPT_DATA_JOB, Organising.populate_prompt_data)
+JobQueue().register(EXTRACT_USER_TOPICS_JOB, Organising.extract_user_topics)
 
 
 if __name__ == '__main__':
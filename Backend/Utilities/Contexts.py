@@ -1,4 +1,5 @@
 import logging
+from concurrent.futures import Future
 from typing import Dict
 
 from flask import g
@@ -50,20 +51,36 @@ def get_message_context() -> str | None:
     return getattr(g, 'message_context', None)
 
 
-def set_category_context(category_id: str):
+def set_category_context(category_id: str | Future):
     """
     Set the category_id for the current Flask context, corresponds directly with the CATEGORY node in the DB.
     Necessary as the code can be faster than getting category id from the DB which causes nothing to be returned for
     new categories
+
+    While the prompt is still being categorised in the background this is a Future of the category id.
     """
     g.category_context = category_id
 
 
-def get_category_context():
+def get_category_context(wait: bool = True):
     """
-    Get the message_id from Flask's g object. Returns None if not set.
+    Get the category_id from Flask's g object. Returns None if not set.
+
+    :param wait: If the category is still being determined, wait for it. Otherwise the pending Future is returned, so
+     it can be handed on to other threads without blocking.
     """
     category_id = getattr(g, 'category_context', None)
+    if isinstance(category_id, Future):
+        if not wait:
+            return category_id
+
+        try:
+            category_id = category_id.result()
+        except Exception:
+            logging.exception("Failed to determine category in the background!")
+            category_id = None
+        g.category_context = category_id
+
     if not category_id:
         logging.error("No category id found!")
 
@@ -4,6 +4,7 @@ from functools import wraps
 
 from flask import request, jsonify
 
+from Constants.Constants import SYSTEM_CANNOT_AFFORD_GEMINI
 from Constants.Exceptions import failed_to_retrieve_user_balance
 from Data.Neo4j.NodeDatabaseManagement import NodeDatabaseManagement as NodeDB
 from Data.Pricing import Pricing
@@ -24,7 +25,7 @@ def evaluate_gemini_balance():
                     raise Exception("System cannot afford call")
             except Exception:
                 logging.exception("System cannot make Gemini Calls!")
-                return "SYSTEM ERROR : INCAPABLE OF MAKING GEMINI REQUESTS"
+                return SYSTEM_CANNOT_AFFORD_GEMINI
 
             result = method(*args, **kwargs)
             return result
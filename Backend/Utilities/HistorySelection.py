@@ -0,0 +1,224 @@
+"""
+Picks the entries of a conversation's history (see Data/ConversationMemory.py) that relate to the user's new messages,
+for optimisation.message_history.
+
+The 'llm' selector asks the background model to pick them, the 'bm25' and 'vector' selectors rank the entries' prompts
+locally, BM25 over their words or cosine similarity of hashed feature vectors (see AiOrchestration/SemanticCache.py),
+weighted towards recent entries. The local selectors take well under a millisecond for hundreds of entries, the terms
+and vector of each entry are cached so only the new messages are analysed on each call.
+"""
+import ast
+import logging
+import math
+import re
+from collections import Counter
+from functools import lru_cache
+from itertools import chain
+from typing import Callable, Dict, FrozenSet, List, Sequence, Tuple
+
+import numpy as np
+
+from AiOrchestration.AiOrchestrator import AiOrchestrator
+from AiOrchestration.SemanticCache import embed
+from Constants.Constants import LLM_HISTORY_SELECTOR, BM25_HISTORY_SELECTOR, VECTOR_HISTORY_SELECTOR, \
+    DEFAULT_HISTORY_SELECTOR, HISTORY_SELECTION_TOP_K, HISTORY_SELECTION_TOKEN_BUDGET, \
+    HISTORY_SELECTION_RECENCY_DECAY, HISTORY_SELECTION_MIN_SIMILARITY, HISTORY_SELECTION_DIMENSIONS, \
+    HISTORY_SELECTION_CACHE_SIZE, BM25_K1, BM25_B
+from Constants.Exceptions import FAILURE_TO_REVIEW_RELEVANT_HISTORY, unknown_history_selector
+from Constants.Instructions import DETECT_RELEVANT_HISTORY_SYSTEM_MESSAGE
+from Data.Configuration import Configuration
+from Data.ConversationMemory import MemoryEntry
+
+History = Sequence[MemoryEntry]
+
+WORD = re.compile(r"\w+")
+
+# Too common to say whether two prompts are about the same thing
+STOPWORDS = frozenset(
+    "a about all also am an and any are as at be been but by can could did do does for from had has have he her his "
+    "how i if in into is it its just me my no not of on or our please she should so some than that the their them "
+    "then there these they this to too us was we were what when where which who why will with would you your".split()
+)
+
+# The least BM25 score an entry needs to be picked, as a share of what one word no other entry has scores. IDF shrinks
+# with fewer entries, so a fixed score would pick nothing early in a conversation.
+MIN_BM25_SHARE = 0.33
+
+
+def format_entry(entry: MemoryEntry) -> str:
+    return f"{entry.prompt}: {entry.response}"
+
+
+@lru_cache(maxsize=HISTORY_SELECTION_CACHE_SIZE)
+def _terms(text: str) -> Tuple[Counter, FrozenSet[str], int]:
+    """
+    The term frequencies of a text, its distinct terms (intersecting frozensets is several times quicker than a dict's
+    keys) and its length in terms, ignoring stopwords
+    """
+    terms = Counter(word for word in WORD.findall(text.lower()) if word not in STOPWORDS)
+    return terms, frozenset(terms), sum(terms.values())
+
+
+@lru_cache(maxsize=HISTORY_SELECTION_CACHE_SIZE)
+def _vector(text: str) -> bytes:
+    """Kept as bytes, joining a history's vectors into one matrix is far cheaper than stacking arrays"""
+    return embed(text, HISTORY_SELECTION_DIMENSIONS).tobytes()
+
+
+def bm25_scores(history: History, user_messages: List[str]) -> List[float]:
+    """Okapi BM25 score of each entry's prompt against the words of the new messages"""
+    query = {word for message in user_messages for word in WORD.findall(message.lower())} - STOPWORDS
+    documents = [_terms(entry.prompt) for entry in history]
+    if not query or not documents:
+        return [0.0] * len(documents)
+
+    # Only the terms an entry shares with the query are visited, so long messages (e.g. file content) stay cheap
+    matches = [distinct & query for _, distinct, _ in documents]
+    idfs = {
+        term: math.log(1 + (len(documents) - frequency + 0.5) / (frequency + 0.5))
+        for term, frequency in Counter(chain.from_iterable(matches)).items()
+    }
+    average_length = sum(length for _, _, length in documents) / len(documents) or 1.0
+
+    scores = []
+    for matched, (terms, _, length) in zip(matches, documents):
+        score = 0.0
+        if matched:
+            normalisation = BM25_K1 * (1 - BM25_B + BM25_B * length / average_length)
+            for term in matched:
+                count = terms[term]
+                score += idfs[term] * count * (BM25_K1 + 1) / (count + normalisation)
+        scores.append(score)
+    return scores
+
+
+def bm25_minimum(entries: int) -> float:
+    """The least BM25 score an entry needs to be picked from a history of this many entries"""
+    # The IDF of a word only one entry has, scoring about that at the average length when it's there once
+    return MIN_BM25_SHARE * math.log(1 + (entries - 0.5) / 1.5)
+
+
+def vector_scores(history: History, user_messages: List[str]) -> List[float]:
+    """Cosine similarity of each entry's prompt to the new messages"""
+    if not history:
+        return []
+    vectors = np.frombuffer(b"".join(_vector(entry.prompt) for entry in history), dtype=np.float32)
+    query = embed("\n".join(user_messages), HISTORY_SELECTION_DIMENSIONS)
+    return (vectors.reshape(len(history), HISTORY_SELECTION_DIMENSIONS) @ query).tolist()
+
+
+def rank(
+    history: History,
+    scores: List[float],
+    minimum: float,
+    top_k: int,
+    token_budget: int,
+    recency_decay: float
+) -> List[int]:
+    """
+    :param history: The entries scored, oldest first
+    :param scores: The relevance of each entry
+    :param minimum: The least relevance an entry needs to be picked, before the recency weighting
+    :param top_k: The most entries to pick
+    :param token_budget: The most tokens the picked entries can add up to, entries that don't fit are skipped
+    :param recency_decay: Multiplies an entry's score once for each newer entry
+    :return: The indexes of the picked entries, oldest first
+    """
+    newest = len(history) - 1
+    weighted = sorted(
+        ((score * recency_decay ** (newest - index), index) for index, score in enumerate(scores) if score >= minimum),
+        reverse=True
+    )
+
+    picked, tokens = [], 0
+    for _, index in weighted:
+        if len(picked) == top_k:
+            break
+        if tokens + history[index].tokens <= token_budget:
+            picked.append(index)
+            tokens += history[index].tokens
+    return sorted(picked)
+
+
+def select_with_bm25(
+    history: History,
+    user_messages: List[str],
+    top_k: int = HISTORY_SELECTION_TOP_K,
+    token_budget: int = HISTORY_SELECTION_TOKEN_BUDGET,
+    recency_decay: float = HISTORY_SELECTION_RECENCY_DECAY,
+    min_similarity: float = HISTORY_SELECTION_MIN_SIMILARITY
+) -> List[int]:
+    """The best scoring entries by BM25, min_similarity only applies to the vector selector"""
+    scores = bm25_scores(history, user_messages)
+    return rank(history, scores, bm25_minimum(len(history)), top_k, token_budget, recency_decay)
+
+
+def select_with_vectors(
+    history: History,
+    user_messages: List[str],
+    top_k: int = HISTORY_SELECTION_TOP_K,
+    token_budget: int = HISTORY_SELECTION_TOKEN_BUDGET,
+    recency_decay: float = HISTORY_SELECTION_RECENCY_DECAY,
+    min_similarity: float = HISTORY_SELECTION_MIN_SIMILARITY
+) -> List[int]:
+    """The most similar entries, of at least min_similarity"""
+    return rank(history, vector_scores(history, user_messages), min_similarity, top_k, token_budget, recency_decay)
+
+
+def select_with_llm(history: History, user_messages: List[str], **limits) -> List[int]:
+    """
+    Asks the background model for the ids of the relevant prompts. The limits don't apply, the model is told to be
+    harsh instead.
+    """
+    numbered_prompts = "Prompt History: " + "\n".join(
+        [f"{idx}: {entry.prompt}" for idx, entry in enumerate(history)]
+    )
+
+    relevant_history_list = AiOrchestrator().execute(
+        [DETECT_RELEVANT_HISTORY_SYSTEM_MESSAGE,
+         numbered_prompts],
+        user_messages
+    )
+    logging.info(f"Relevant messages detected in history: {relevant_history_list}")
+
+    picked = []
+    try:
+        relevant_history_list = ast.literal_eval(relevant_history_list)
+        for id in relevant_history_list or []:
+            if 0 <= int(id) < len(history):
+                picked.append(int(id))
+    except Exception:
+        logging.exception(FAILURE_TO_REVIEW_RELEVANT_HISTORY)
+    return picked
+
+
+SELECTORS: Dict[str, Callable[..., List[int]]] = {
+    LLM_HISTORY_SELECTOR: select_with_llm,
+    BM25_HISTORY_SELECTOR: select_with_bm25,
+    VECTOR_HISTORY_SELECTOR: select_with_vectors,
+}
+
+
+def select_relevant_history(history: History, user_messages: List[str]) -> List[int]:
+    """
+    Picks the relevant entries with the selector set under optimisation.history_selector.
+
+    :param history: The conversation's entries, oldest first
+    :param user_messages: The user's new messages, the prompt and any file content
+    :return: The indexes of the relevant entries, oldest first
+    """
+    optimisation = Configuration.load_config().get('optimisation', {})
+
+    selector = optimisation.get('history_selector', DEFAULT_HISTORY_SELECTOR)
+    if selector not in SELECTORS:
+        logging.warning(unknown_history_selector(selector, DEFAULT_HISTORY_SELECTOR))
+        selector = DEFAULT_HISTORY_SELECTOR
+
+    return SELECTORS[selector](
+        history,
+        user_messages,
+        top_k=int(optimisation.get('history_top_k', HISTORY_SELECTION_TOP_K)),
+        token_budget=int(optimisation.get('history_token_budget', HISTORY_SELECTION_TOKEN_BUDGET)),
+        recency_decay=float(optimisation.get('history_recency_decay', HISTORY_SELECTION_RECENCY_DECAY)),
+        min_similarity=float(optimisation.get('history_min_similarity', HISTORY_SELECTION_MIN_SIMILARITY)),
+    )
@@ -0,0 +1,258 @@
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Any, Optional
+
+from Constants.Constants import JOB_QUEUE_PATH, JOB_QUEUE_WORKERS, MAX_JOB_ATTEMPTS, JOB_RETENTION_SECONDS, \
+    JOB_QUEUE_DRAIN_TIMEOUT
+from Constants.Exceptions import unknown_job, job_failed, job_abandoned
+from Utilities.Contexts import set_user_context, set_message_context, set_category_context
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Payload keys restored as request contexts rather than passed to the handler
+CONTEXT_KEYS = ("user_id", "message_id", "category_id")
+
+CREATE_JOBS_TABLE = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+)
+"""
+CREATE_JOBS_INDEX = "CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, available_at)"
+
+
+class JobQueue:
+    """
+    A durable, SQLite backed queue for work that can happen after a response has been sent, e.g. storing the prompt
+    and extracting user topics.
+
+    Jobs are persisted before they're acknowledged, so a crash or restart doesn't lose them: jobs left running by a
+    previous process are picked up again on start. Each job has an idempotency key, typically the message id, and
+    enqueueing the same key twice is a no-op. Failed jobs are retried with exponential backoff up to MAX_JOB_ATTEMPTS,
+    a job abandoned after that is queued again, with its attempts reset, if its key is enqueued again.
+    On shutdown the queue is drained, waiting up to JOB_QUEUE_DRAIN_TIMEOUT for outstanding jobs.
+
+    Handlers run in a Flask app context with the user, message and category contexts of the payload restored.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        """Create a new instance or return the existing one."""
+        if cls._instance is None:
+            cls._instance = super(JobQueue, cls).__new__(cls)
+            cls._instance.handlers: Dict[str, Callable[..., Any]] = {}
+            cls._instance.app = None
+            cls._instance.workers = []
+            cls._instance._wake = threading.Condition()
+            cls._instance._stopping = threading.Event()
+            cls._instance.path = os.getenv(
+                JOB_QUEUE_PATH,
+                os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../UserData', 'Jobs', 'jobs.sqlite3')
+            )
+        return cls._instance
+
+    @contextmanager
+    def _connect(self):
+        """A short-lived autocommit connection, SQLite connections can't be shared between threads"""
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        try:
+            yield connection
+        finally:
+            connection.close()
+
+    def register(self, name: str, handler: Callable[..., Any]) -> None:
+        """Registers the function run for jobs of the given name, it's called with the job payload as kwargs"""
+        self.handlers[name] = handler
+
+    @property
+    def running(self) -> bool:
+        return bool(self.workers) and not self._stopping.is_set()
+
+    def start(self, app, worker_count: Optional[int] = None) -> None:
+        """
+        Starts the worker threads, recovering any jobs interrupted by a previous shutdown.
+
+        :param app: The Flask app, jobs are run within its app context
+        :param worker_count: Number of worker threads, defaults to JOB_QUEUE_WORKERS or 2
+        """
+        if self.workers:
+            return
+
+        self.app = app
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(CREATE_JOBS_TABLE)
+            connection.execute(CREATE_JOBS_INDEX)
+            recovered = connection.execute(
+                "UPDATE jobs SET status = ?, available_at = ? WHERE status = ?", (PENDING, time.time(), RUNNING)
+            ).rowcount
+            connection.execute(
+                "DELETE FROM jobs WHERE status = ? AND updated_at < ?", (DONE, time.time() - JOB_RETENTION_SECONDS)
+            )
+        if recovered:
+            logging.warning(f"Recovered {recovered} job(s) interrupted by a previous shutdown")
+
+        self._stopping.clear()
+        worker_count = worker_count or int(os.getenv(JOB_QUEUE_WORKERS, 2))
+        for index in range(worker_count):
+            worker = threading.Thread(target=self._work, name=f"JobQueue-{index}", daemon=True)
+            worker.start()
+            self.workers.append(worker)
+
+        atexit.register(self.drain)
+        logging.info(f"Job queue started with {worker_count} worker(s) at {self.path}")
+
+    def enqueue(self, name: str, payload: Dict[str, Any], idempotency_key: str) -> bool:
+        """
+        Persists a job to be run in the background. If the queue isn't running, e.g. in a script, the job is run
+        immediately instead.
+
+        :param name: The registered job name
+        :param payload: JSON serialisable kwargs for the handler, user_id, message_id and category_id restore contexts
+        :param idempotency_key: Jobs with the same name and key are only queued once, unless abandoned
+        :return: True if the job was queued, or an abandoned one requeued, False if it was a duplicate
+        """
+        if name not in self.handlers:
+            raise ValueError(unknown_job(name))
+
+        if not self.running:
+            self._run(name, payload)
+            return True
+
+        now = time.time()
+        job_id = f"{name}:{idempotency_key}"
+        with self._connect() as connection:
+            inserted = connection.execute(
+                "INSERT OR IGNORE INTO jobs (id, name, payload, status, attempts, available_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, 0, ?, ?, ?)",
+                (job_id, name, json.dumps(payload), PENDING, now, now, now)
+            ).rowcount
+            if not inserted:
+                inserted = connection.execute(
+                    "UPDATE jobs SET payload = ?, status = ?, attempts = 0, available_at = ?, last_error = NULL, "
+                    "updated_at = ? WHERE id = ? AND status = ?",
+                    (json.dumps(payload), PENDING, now, now, job_id, FAILED)
+                ).rowcount
+
+        with self._wake:
+            self._wake.notify()
+        return bool(inserted)
+
+    def _claim(self) -> Optional[sqlite3.Row]:
+        """Atomically marks the oldest available job as running and returns it"""
+        with self._connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                job = connection.execute(
+                    "SELECT * FROM jobs WHERE status = ? AND available_at <= ? ORDER BY created_at LIMIT 1",
+                    (PENDING, time.time())
+                ).fetchone()
+                if job:
+                    connection.execute(
+                        "UPDATE jobs SET status = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                        (RUNNING, time.time(), job["id"])
+                    )
+                connection.execute("COMMIT")
+                return job
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+
+    def _complete(self, job: sqlite3.Row, error: Optional[Exception] = None) -> None:
+        attempts = job["attempts"] + 1
+        with self._connect() as connection:
+            if error is None:
+                connection.execute(
+                    "UPDATE jobs SET status = ?, last_error = NULL, updated_at = ? WHERE id = ?",
+                    (DONE, time.time(), job["id"])
+                )
+            elif attempts < MAX_JOB_ATTEMPTS:
+                connection.execute(
+                    "UPDATE jobs SET status = ?, last_error = ?, available_at = ?, updated_at = ? WHERE id = ?",
+                    (PENDING, str(error), time.time() + 2 ** attempts, time.time(), job["id"])
+                )
+            else:
+                logging.error(job_abandoned(job["id"], attempts))
+                connection.execute(
+                    "UPDATE jobs SET status = ?, last_error = ?, updated_at = ? WHERE id = ?",
+                    (FAILED, str(error), time.time(), job["id"])
+                )
+
+    def _run(self, name: str, payload: Dict[str, Any]) -> None:
+        """Runs a job's handler with the request contexts it was queued under"""
+        def run():
+            set_user_context(payload.get("user_id"))
+            set_message_context(payload.get("message_id"))
+            set_category_context(payload.get("category_id"))
+            self.handlers[name](**{key: value for key, value in payload.items() if key not in CONTEXT_KEYS})
+
+        if self.app is None:
+            run()
+            return
+
+        with self.app.app_context():
+            run()
+
+    def _work(self) -> None:
+        while True:
+            try:
+                job = self._claim()
+            except Exception:
+                logging.exception("Failed to claim job")
+                job = None
+
+            if job is None:
+                if self._stopping.is_set():
+                    return
+                with self._wake:
+                    self._wake.wait(timeout=1)
+                continue
+
+            try:
+                self._run(job["name"], json.loads(job["payload"]))
+                self._complete(job)
+            except Exception as e:
+                logging.exception(job_failed(job["id"], job["attempts"] + 1))
+                self._complete(job, e)
+
+    def drain(self, timeout: Optional[float] = None) -> None:
+        """
+        Stops the workers once every job currently available has run. Jobs still pending afterwards, e.g. waiting to
+        be retried, remain in the database and are run on the next start.
+
+        :param timeout: Seconds to wait for the workers, defaults to JOB_QUEUE_DRAIN_TIMEOUT
+        """
+        if not self.workers:
+            return
+
+        self._stopping.set()
+        with self._wake:
+            self._wake.notify_all()
+
+        deadline = time.monotonic() + (timeout if timeout is not None else JOB_QUEUE_DRAIN_TIMEOUT)
+        for worker in self.workers:
+            worker.join(max(0.0, deadline - time.monotonic()))
+
+        still_running = [worker.name for worker in self.workers if worker.is_alive()]
+        if still_running:
+            logging.warning(f"Job queue workers still running after drain: {still_running}")
+        self.workers = []
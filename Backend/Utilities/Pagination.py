@@ -0,0 +1,101 @@
+import base64
+import binascii
+import json
+from typing import Any, Callable, Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+from Constants.Constants import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, PREVIEW_LENGTH
+from Constants.Exceptions import invalid_page_parameter
+
+SUMMARY_VIEW = "summary"
+FULL_VIEW = "full"
+
+
+class Page(NamedTuple):
+    """
+    A request for one page of a listing, newest first.
+
+    Listings are paged by the (time, id) of the last item sent rather than an offset, so a page is found through the
+    same ordered read however deep it is, and items added while the user is paging don't shift later pages.
+    """
+    limit: int = DEFAULT_PAGE_SIZE
+    cursor: Optional[Tuple[int, str]] = None
+    summary: bool = False
+
+    def parameters(self) -> Dict[str, Any]:
+        """Query parameters for a paged query, one more item than the limit is read to tell if there's another page"""
+        return {
+            "cursor_time": self.cursor[0] if self.cursor else None,
+            "cursor_id": self.cursor[1] if self.cursor else None,
+            "limit": self.limit + 1,
+            "preview_length": PREVIEW_LENGTH if self.summary else None,
+        }
+
+
+def encode_cursor(time: int, item_id: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([time, item_id]).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[int, str]:
+    """
+    :raises ValueError: If the cursor wasn't produced by encode_cursor
+    """
+    try:
+        time, item_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        raise ValueError(invalid_page_parameter("cursor", cursor))
+
+    if not isinstance(time, int) or not isinstance(item_id, str):
+        raise ValueError(invalid_page_parameter("cursor", cursor))
+    return time, item_id
+
+
+def int_arg(args: Mapping[str, str], name: str, default: int, minimum: int = 1) -> int:
+    """
+    :raises ValueError: If the query parameter isn't an integer of at least the minimum
+    """
+    value = args.get(name, default)
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(invalid_page_parameter(name, value))
+
+    if number < minimum:
+        raise ValueError(invalid_page_parameter(name, value))
+    return number
+
+
+def page_from_args(args: Mapping[str, str]) -> Page:
+    """
+    Reads the limit, cursor and view query parameters of a listing request.
+
+    :param args: The request's query parameters, e.g. request.args
+    :return: The page requested, the limit is capped at MAX_PAGE_SIZE
+    :raises ValueError: If a parameter is malformed
+    """
+    limit = int_arg(args, "limit", DEFAULT_PAGE_SIZE)
+
+    view = args.get("view", FULL_VIEW)
+    if view not in (SUMMARY_VIEW, FULL_VIEW):
+        raise ValueError(invalid_page_parameter("view", view))
+
+    cursor = args.get("cursor")
+    return Page(
+        limit=min(limit, MAX_PAGE_SIZE),
+        cursor=decode_cursor(cursor) if cursor else None,
+        summary=view == SUMMARY_VIEW
+    )
+
+
+def paginate(records: List[Any], page: Page, item: Callable[[Any], Dict[str, Any]]) -> Tuple[List[Dict], Optional[str]]:
+    """
+    :param records: The records of a paged query, read with Page.parameters
+    :param page: The page requested
+    :param item: Converts a record to the item sent to the client, it must include the item's time and id
+    :return: The page's items and the cursor of the next page, None if this is the last page
+    """
+    items = [item(record) for record in records[:page.limit]]
+    if len(records) <= page.limit or not items:
+        return items, None
+
+    last = items[-1]
+    return items, encode_cursor(last["time"], last["id"])
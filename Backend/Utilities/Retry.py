@@ -0,0 +1,245 @@
+import logging
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from flask import has_app_context
+
+from Constants.Constants import MAX_PROMPT_RETRIES, RETRY_BASE_DELAY, RETRY_MAX_DELAY, LLM_CALL_DEADLINE, \
+    RETRY_BUDGET_RATIO, RETRY_BUDGET_MAX, CIRCUIT_BREAKER_FAILURE_THRESHOLD, CIRCUIT_BREAKER_RESET_SECONDS
+from Constants.Exceptions import EMPTY_PROVIDER_RESPONSE, circuit_open, retry_budget_exhausted, \
+    retry_deadline_exceeded, fatal_provider_error, retrying_provider_call, falling_back_to_provider
+from Utilities.Contexts import get_message_context
+from Utilities.Tracing import span, annotate
+
+# Rate limiting, timeouts and server side failures are worth retrying, any other 4xx will fail the same way again
+RETRYABLE_STATUS_CODES = {408, 409, 425, 429}
+
+
+class EmptyResponseError(Exception):
+    """The provider returned successfully, but with nothing in the response"""
+
+    def __init__(self):
+        super().__init__(EMPTY_PROVIDER_RESPONSE)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider that has been failing, until its circuit breaker resets"""
+
+    def __init__(self, provider: str):
+        super().__init__(circuit_open(provider))
+        self.provider = provider
+
+
+def status_code_of(error: BaseException) -> Optional[int]:
+    """The HTTP status of a provider error, OpenAI errors carry it as status_code and google-genai errors as code"""
+    for attribute in ("status_code", "code"):
+        status = getattr(error, attribute, None)
+        if isinstance(status, int):
+            return status
+
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    Whether a failed provider call could succeed if it's made again. Errors without a status code, e.g. dropped
+    connections, are assumed to be transient.
+    """
+    if isinstance(error, CircuitOpenError):
+        return False
+
+    status = status_code_of(error)
+    if status is None:
+        return True
+    return status in RETRYABLE_STATUS_CODES or status >= 500
+
+
+class CircuitBreaker:
+    """
+    Tracks consecutive failures of a provider. After CIRCUIT_BREAKER_FAILURE_THRESHOLD the circuit opens and calls fail
+    fast for CIRCUIT_BREAKER_RESET_SECONDS, then a single trial call is let through (half-open), closing the circuit
+    again if it succeeds.
+    """
+
+    def __init__(self, provider: str):
+        self.provider = provider
+        self._lock = threading.Lock()
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_flight = False
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < CIRCUIT_BREAKER_RESET_SECONDS or self.trial_in_flight:
+                return False
+
+            self.trial_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.opened_at is not None or self.failures >= CIRCUIT_BREAKER_FAILURE_THRESHOLD:
+                if self.opened_at is None:
+                    logging.error(circuit_open(self.provider))
+                self.opened_at = time.monotonic()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self.opened_at >= CIRCUIT_BREAKER_RESET_SECONDS else "open"
+
+
+class RetryEngine:
+    """
+    Retries failed LLM provider calls without holding a worker thread hostage.
+
+    - Backoff is exponential with full jitter (a random wait between 0 and RETRY_BASE_DELAY * 2^attempt, capped at
+      RETRY_MAX_DELAY), and a retry is only attempted if it can finish before the deadline: LLM_CALL_DEADLINE for the
+      call or, if sooner, the deadline of the request it's part of.
+    - Only retryable failures (429, 5xx, connection errors, empty responses) are retried, fatal ones (e.g. 400) are
+      raised immediately.
+    - Retries are drawn from a process-wide budget, each call deposits RETRY_BUDGET_RATIO of a retry, so during an
+      outage retries can't multiply the load on a provider.
+    - Each provider has a CircuitBreaker. While it's open calls fail fast, or go to the fallback if one is given.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        """Create a new instance or return the existing one."""
+        if cls._instance is None:
+            cls._instance = super(RetryEngine, cls).__new__(cls)
+            cls._instance._lock = threading.Lock()
+            cls._instance.breakers: Dict[str, CircuitBreaker] = {}
+            cls._instance.deadlines: Dict[str, float] = {}
+            cls._instance.budget = RETRY_BUDGET_MAX
+        return cls._instance
+
+    # Deadlines
+
+    def open_deadline(self, message_id: str, seconds: float) -> None:
+        """Bounds the total time every provider call of a request, retries included, can take"""
+        with self._lock:
+            self.deadlines[message_id] = time.monotonic() + seconds
+
+    def close_deadline(self, message_id: str) -> None:
+        with self._lock:
+            self.deadlines.pop(message_id, None)
+
+    def _deadline(self) -> float:
+        deadline = time.monotonic() + LLM_CALL_DEADLINE
+        message_id = get_message_context() if has_app_context() else None
+        request_deadline = self.deadlines.get(message_id) if message_id else None
+        return min(deadline, request_deadline) if request_deadline else deadline
+
+    # Budget
+
+    def _deposit(self) -> None:
+        with self._lock:
+            self.budget = min(RETRY_BUDGET_MAX, self.budget + RETRY_BUDGET_RATIO)
+
+    def _withdraw(self) -> bool:
+        with self._lock:
+            if self.budget < 1:
+                return False
+            self.budget -= 1
+            return True
+
+    def breaker(self, provider: str) -> CircuitBreaker:
+        with self._lock:
+            if provider not in self.breakers:
+                self.breakers[provider] = CircuitBreaker(provider)
+            return self.breakers[provider]
+
+    @staticmethod
+    def backoff(attempt: int) -> float:
+        """Full jitter: a random wait up to the exponential backoff for the attempt"""
+        return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+
+    def execute(
+        self,
+        func: Callable[[], Any],
+        provider: str,
+        max_attempts: int = MAX_PROMPT_RETRIES,
+        fallback: Optional[Callable[[], Any]] = None,
+        fallback_provider: Optional[str] = None
+    ) -> Any:
+        """
+        Calls func until it returns a non-empty result, retrying according to the policy above.
+
+        :param func: The provider call
+        :param provider: Name of the provider called, each has its own circuit breaker
+        :param max_attempts: Maximum number of calls, including the first
+        :param fallback: Optional call to another provider, used if this provider's circuit is open or its retries are
+         exhausted
+        :param fallback_provider: Name of the fallback's provider
+        :return: The result of the call
+        :raises: The last error if every attempt failed, CircuitOpenError if the provider's circuit is open
+        """
+        try:
+            return self._execute(func, provider, max_attempts)
+        except Exception as e:
+            provider_unavailable = isinstance(e, CircuitOpenError) or is_retryable(e)
+            if fallback is None or not provider_unavailable:
+                raise
+
+            logging.warning(falling_back_to_provider(provider, fallback_provider, e))
+            annotate(fallback=fallback_provider or "")
+            return self._execute(fallback, fallback_provider or f"{provider}_fallback", max_attempts)
+
+    def _execute(self, func: Callable[[], Any], provider: str, max_attempts: int) -> Any:
+        breaker = self.breaker(provider)
+        deadline = self._deadline()
+        self._deposit()
+
+        attempt = 0
+        while True:
+            if not breaker.allow():
+                raise CircuitOpenError(provider)
+
+            attempt += 1
+            try:
+                result = func()
+                if result is None or result == "":
+                    raise EmptyResponseError()
+            except Exception as e:
+                if not is_retryable(e):
+                    # The request is at fault rather than the provider
+                    breaker.record_success()
+                    logging.error(fatal_provider_error(provider, e))
+                    raise
+
+                breaker.record_failure()
+                if attempt >= max_attempts or breaker.state != "closed":
+                    raise
+
+                wait_time = self.backoff(attempt)
+                if time.monotonic() + wait_time >= deadline:
+                    logging.error(retry_deadline_exceeded(provider, attempt))
+                    raise
+                if not self._withdraw():
+                    logging.error(retry_budget_exhausted(provider))
+                    raise
+
+                logging.warning(retrying_provider_call(provider, attempt, wait_time, e))
+                with span("retry_backoff", attempt=attempt, wait_time=wait_time, status=status_code_of(e) or 0):
+                    time.sleep(wait_time)
+                continue
+
+            breaker.record_success()
+            return result
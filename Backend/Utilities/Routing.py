@@ -20,6 +20,18 @@ def fetch_entity(entity, entity_name=None, success_status=200):
         return handle_error(e)
 
 
+def fetch_page(page, entity_name, success_status=200):
+    """ Jsonifies a page of a listing, together with the cursor the client sends back for the next page
+
+    :param page: The items in the page and the next page's cursor, None if there isn't one
+    :param entity_name: The key the items are labeled under
+    :param success_status: success status code, typically 200
+    :return: The json response with status, e.g { "entity_name": [...], "next_cursor": "..." }, 200
+    """
+    items, next_cursor = page
+    return fetch_entity({entity_name: items, "next_cursor": next_cursor}, success_status=success_status)
+
+
 def parse_and_validate_data(data, schema):
     """
     Generalized function to parse and validate data against a defined schema.
@@ -0,0 +1,46 @@
+import re
+from typing import List
+
+from Constants.Constants import SEARCH_SNIPPET_LENGTH
+
+WORD = re.compile(r"\w+")
+
+
+def search_terms(text: str) -> List[str]:
+    """The words of a search, lower cased and without duplicates"""
+    return list(dict.fromkeys(word.lower() for word in WORD.findall(text)))
+
+
+def lucene_query(text: str) -> str:
+    """
+    A full-text index query matching any word of the user's search. Only the words are kept, lower cased, so nothing
+    the user types is read as Lucene query syntax (operators, wildcards, fields etc.). Matches with more of the words,
+    or rarer ones, rank higher.
+
+    :param text: The search as the user typed it
+    :return: The query, empty if the search has no words
+    """
+    return " ".join(search_terms(text))
+
+
+def snippet(text: str, terms: List[str], length: int = SEARCH_SNIPPET_LENGTH) -> str:
+    """
+    The part of a text around the first occurrence of a search term, or its start if none occur exactly (e.g. the
+    index matched a different form of the word).
+
+    :param text: The matched text
+    :param terms: The search terms, as given by search_terms
+    :param length: Roughly how many characters to return
+    :return: The excerpt, with ellipses where the text was cut
+    """
+    text = " ".join((text or "").split())
+    if len(text) <= length:
+        return text
+
+    lowered = text.lower()
+    positions = [position for position in (lowered.find(term) for term in terms) if position != -1]
+    start = max(0, min(positions, default=0) - length // 4)
+    end = min(len(text), start + length)
+    start = max(0, end - length)
+
+    return ("…" if start > 0 else "") + text[start:end].strip() + ("…" if end < len(text) else "")
@@ -0,0 +1,298 @@
+import functools
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+import types
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Any
+
+from flask import has_app_context
+
+from Constants.Constants import TRACE_EXPORT_FORMAT, TRACE_EXPORT_DIRECTORY, DEFAULT_ENCODING, JSON_TRACE_FORMAT, \
+    OTLP_TRACE_FORMAT
+from Utilities.Contexts import get_message_context
+
+SERVICE_NAME = "thinker-backend"
+
+
+class Span:
+    """A single timed stage of a request, times are nanoseconds since the epoch so spans from any thread line up"""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "start", "end", "attributes", "error", "thread")
+
+    def __init__(self, trace_id: str, name: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.start = time.time_ns()
+        self.end = None
+        self.attributes = attributes
+        self.error = None
+        self.thread = threading.current_thread().name
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        self.end = time.time_ns()
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+
+    @property
+    def duration(self) -> float:
+        """Duration in seconds, spans still open are measured up until now"""
+        return ((self.end or time.time_ns()) - self.start) / 1e9
+
+
+class Tracer:
+    """
+    Collects nested spans for each request, keyed by the message UUID of process_message.
+
+    Spans opened in a thread with no open span of its own (e.g. a ThreadPoolExecutor worker running with
+    copy_current_request_context) are parented to the root span of the request. When the request finishes the trace is
+    logged as a waterfall and, if TRACE_EXPORT_FORMAT is set to 'json' and/or 'otlp', exported to
+    TRACE_EXPORT_DIRECTORY.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        """Create a new instance or return the existing one."""
+        if cls._instance is None:
+            cls._instance = super(Tracer, cls).__new__(cls)
+            cls._instance._lock = threading.Lock()
+            cls._instance._local = threading.local()
+            cls._instance.traces: Dict[str, List[Span]] = {}
+            cls._instance.export_formats = [
+                export_format.strip() for export_format in os.getenv(TRACE_EXPORT_FORMAT, "").lower().split(",")
+                if export_format.strip()
+            ]
+            cls._instance.export_directory = os.getenv(
+                TRACE_EXPORT_DIRECTORY,
+                os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../UserData', 'Traces')
+            )
+        return cls._instance
+
+    def _stack(self) -> List[Span]:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    @staticmethod
+    def current_trace_id() -> Optional[str]:
+        return get_message_context() if has_app_context() else None
+
+    def start_trace(self, trace_id: str, name: str, **attributes) -> Span:
+        """Opens the root span for a request, every span opened under the same message id becomes a descendant"""
+        root = Span(trace_id, name, None, attributes)
+        with self._lock:
+            self.traces[trace_id] = [root]
+        self._stack().append(root)
+        return root
+
+    def start_span(self, name: str, **attributes) -> Optional[Span]:
+        """Opens a span under the current one, returns None outside a traced request"""
+        trace_id = self.current_trace_id()
+        with self._lock:
+            spans = self.traces.get(trace_id) if trace_id else None
+            if spans is None:
+                return None
+
+            stack = self._stack()
+            parent = stack[-1] if stack and stack[-1].trace_id == trace_id else spans[0]
+            span = Span(trace_id, name, parent.span_id, attributes)
+            spans.append(span)
+
+        return span
+
+    def finish_trace(self, trace_id: str, error: Optional[BaseException] = None) -> Optional[List[Span]]:
+        """Closes the root span, logs the waterfall and exports it. The trace is then released from memory."""
+        with self._lock:
+            spans = self.traces.pop(trace_id, None)
+        if not spans:
+            return None
+
+        stack = self._stack()
+        if spans[0] in stack:
+            stack.remove(spans[0])
+        spans[0].finish(error)
+
+        logging.info(f"[{trace_id}] Trace waterfall:\n{self.waterfall(spans)}")
+        self.export(trace_id, spans)
+        return spans
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """Times the enclosed block as a child of the current span"""
+        span = self.start_span(name, **attributes)
+        if span is None:
+            yield None
+            return
+
+        stack = self._stack()
+        stack.append(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.finish(e)
+            raise
+        finally:
+            if span.end is None:
+                span.finish()
+            if span in stack:
+                stack.remove(span)
+
+    def annotate(self, **attributes) -> None:
+        """Adds attributes to the innermost open span of this thread, if any"""
+        stack = self._stack()
+        if stack:
+            stack[-1].attributes.update(attributes)
+
+    # Reporting
+
+    @staticmethod
+    def waterfall(spans: List[Span]) -> str:
+        """Indented, chronological view of the trace with each span's offset from the start of the request"""
+        children: Dict[Optional[str], List[Span]] = {}
+        for span in spans:
+            children.setdefault(span.parent_id, []).append(span)
+
+        origin = spans[0].start
+        lines = []
+
+        def render(span: Span, depth: int):
+            offset = (span.start - origin) / 1e9
+            error = f" ERROR {span.error}" if span.error else ""
+            lines.append(f"{offset:8.3f}s {span.duration:8.3f}s {'  ' * depth}{span.name}{error}")
+            for child in sorted(children.get(span.span_id, []), key=lambda child_span: child_span.start):
+                render(child, depth + 1)
+
+        render(spans[0], 0)
+        return "\n".join(lines)
+
+    @staticmethod
+    def to_json(spans: List[Span]) -> Dict[str, Any]:
+        origin = spans[0].start
+        return {
+            "trace_id": spans[0].trace_id,
+            "duration": spans[0].duration,
+            "spans": [{
+                "span_id": span.span_id,
+                "parent_id": span.parent_id,
+                "name": span.name,
+                "offset": (span.start - origin) / 1e9,
+                "duration": span.duration,
+                "thread": span.thread,
+                "attributes": span.attributes,
+                "error": span.error,
+            } for span in sorted(spans, key=lambda span: span.start)]
+        }
+
+    @staticmethod
+    def to_otlp(spans: List[Span]) -> Dict[str, Any]:
+        """OTLP/JSON (ExportTraceServiceRequest), importable by the OpenTelemetry collector, Jaeger, Tempo etc."""
+        # OTLP trace ids are 16 bytes of hex, message ids are shortuuids, so the id is derived and kept as an attribute
+        trace_id = spans[0].trace_id.encode(DEFAULT_ENCODING).hex()[:32].ljust(32, "0")
+
+        def attribute(key: str, value: Any) -> Dict[str, Any]:
+            if isinstance(value, bool):
+                return {"key": key, "value": {"boolValue": value}}
+            if isinstance(value, int):
+                return {"key": key, "value": {"intValue": str(value)}}
+            if isinstance(value, float):
+                return {"key": key, "value": {"doubleValue": value}}
+            return {"key": key, "value": {"stringValue": str(value)}}
+
+        return {"resourceSpans": [{
+            "resource": {"attributes": [attribute("service.name", SERVICE_NAME)]},
+            "scopeSpans": [{
+                "scope": {"name": __name__},
+                "spans": [{
+                    "traceId": trace_id,
+                    "spanId": span.span_id,
+                    "parentSpanId": span.parent_id or "",
+                    "name": span.name,
+                    "kind": 1,
+                    "startTimeUnixNano": str(span.start),
+                    "endTimeUnixNano": str(span.end or time.time_ns()),
+                    "attributes": [attribute(key, value) for key, value in span.attributes.items()] + [
+                        attribute("message.id", span.trace_id),
+                        attribute("thread.name", span.thread)
+                    ],
+                    "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+                } for span in spans]
+            }]
+        }]}
+
+    def export(self, trace_id: str, spans: List[Span]) -> None:
+        if not self.export_formats:
+            return
+
+        try:
+            os.makedirs(self.export_directory, exist_ok=True)
+            for export_format in self.export_formats:
+                if export_format == JSON_TRACE_FORMAT:
+                    path, content = f"{trace_id}.json", self.to_json(spans)
+                elif export_format == OTLP_TRACE_FORMAT:
+                    path, content = f"{trace_id}.otlp.json", self.to_otlp(spans)
+                else:
+                    logging.warning(f"Unknown trace export format '{export_format}'")
+                    continue
+
+                with open(os.path.join(self.export_directory, path), "w", encoding=DEFAULT_ENCODING) as file:
+                    json.dump(content, file, indent=2)
+        except Exception:
+            logging.exception(f"[{trace_id}] Failed to export trace")
+
+
+def span(name: str, **attributes):
+    """Context manager timing the enclosed block as a span of the current request, a no-op outside one"""
+    return Tracer().span(name, **attributes)
+
+
+def annotate(**attributes) -> None:
+    """Adds attributes, e.g. the model used, to the current span"""
+    Tracer().annotate(**attributes)
+
+
+def traced(name: Optional[str] = None):
+    """
+    Records each call of the decorated function as a span of the current request.
+
+    Generators, i.e. streamed responses, are timed until they are exhausted rather than until they are created.
+
+    :param name: The span name, defaults to the function's qualified name
+    """
+    def decorator(method):
+        span_name = name or method.__qualname__
+
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            tracer = Tracer()
+            if not tracer.traces:
+                return method(*args, **kwargs)
+
+            with tracer.span(span_name) as current_span:
+                result = method(*args, **kwargs)
+                if current_span is None or not isinstance(result, types.GeneratorType):
+                    return result
+
+                # Closed by the generator instead, once streaming has finished
+                current_span.attributes["streaming"] = True
+                generator_span = tracer.start_span(f"{span_name} (stream)")
+
+            def generator_wrapper():
+                error = None
+                try:
+                    return (yield from result)
+                except BaseException as e:
+                    error = e
+                    raise
+                finally:
+                    if generator_span:
+                        generator_span.finish(error)
+
+            return generator_wrapper()
+        return wrapper
+    return decorator
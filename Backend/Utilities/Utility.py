@@ -1,8 +1,7 @@
 import logging
 import os
 import threading
-import time
-from typing import List, Dict, Callable, Any
+from typing import List, Dict
 
 import tiktoken
 from google import genai
@@ -10,7 +9,7 @@ from google import genai
 from AiOrchestration.AiModel import AiModel
 from AiOrchestration.GeminiModel import GeminiModel
 from AiOrchestration.ChatGptModel import ChatGptModel
-from Constants import Constants
+from AiOrchestration.LocalModel import LocalModel
 from Constants.Constants import GEMINI_API_KEY
 
 
@@ -86,31 +85,12 @@ class Utility:
                 contents=character_soup
             ).total_tokens.bit_count()
 
-        return token_count
-
-    @staticmethod
-    def execute_with_retries(func: Callable[[], Any], max_retries: int = Constants.MAX_PROMPT_RETRIES) -> Any:
-        """
-        Execute a callable with retries on failure or None result
-        (not suitable for methods that can return None or False for a successful operation)
+        if model_type == LocalModel:
+            # Offline, so no tokenizer downloads or count_tokens calls: ~4 characters per token
+            for message in messages:
+                token_count += len(message.get("content", "")) // 4 + extra_tokens_per_message
 
-        :param func: A callable that will be executed
-        :param max_retries: Maximum number of retries for the callable
-        :return: The return value of the callable if successful, or None if all retries fail
-        """
-        for attempt in range(1, max_retries + 1):
-            try:
-                result = func()
-                if not result:
-                    raise Exception("Function failed to return result")
-                else:
-                    return result
-            except Exception as e:
-                wait_time = Constants.BACKOFF_INITIAL ** attempt  # Exponential backoff
-                logging.exception(f"Attempt {attempt + 1} failed: {e}. Retrying in {wait_time} seconds...")
-                time.sleep(wait_time)  # Wait before retrying
-        logging.error("Max retries exceeded. Failed to get response from callable.")
-        return None
+        return token_count
 
 
 if __name__ == '__main__':
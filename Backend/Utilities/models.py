@@ -1,15 +1,38 @@
+import os
+
 from AiOrchestration.AiModel import AiModel
 from AiOrchestration.ChatGptModel import ChatGptModel
 from AiOrchestration.ChatGptWrapper import ChatGptWrapper
 from AiOrchestration.GeminiModel import GeminiModel
 from AiOrchestration.GeminiWrapper import GeminiWrapper
+from AiOrchestration.LocalModel import LocalModel
+from AiOrchestration.LocalWrapper import LocalWrapper
+from Constants.Constants import LLM_PROVIDER, LOCAL_LLM_PROVIDER
 
 chat_gpt_models = {model.value for model in ChatGptModel}
 gemini_models = {model.value for model in GeminiModel}
+local_models = {model.value for model in LocalModel}
+
+# The closest equivalent of each model at the other provider, used when a provider is unavailable
+FALLBACK_MODELS = {
+    ChatGptModel.CHAT_GPT_4_POINT_ONE_NANO: GeminiModel.GEMINI_2_FLASH_LITE,
+    ChatGptModel.CHAT_GPT_4_POINT_ONE_MINI: GeminiModel.GEMINI_2_FLASH,
+    ChatGptModel.CHAT_GPT_O4_MINI: GeminiModel.GEMINI_2_PRO_PREVIEW,
+    GeminiModel.GEMINI_2_FLASH_LITE: ChatGptModel.CHAT_GPT_4_POINT_ONE_NANO,
+    GeminiModel.GEMINI_2_FLASH: ChatGptModel.CHAT_GPT_4_POINT_ONE_MINI,
+    GeminiModel.GEMINI_2_PRO_PREVIEW: ChatGptModel.CHAT_GPT_O4_MINI,
+}
+
+
+def local_provider_enabled() -> bool:
+    """When enabled every model is served by the offline LocalWrapper, e.g. for benchmarks and load tests"""
+    return os.getenv(LLM_PROVIDER) == LOCAL_LLM_PROVIDER
 
 
 def determine_llm_client(model_string: str):
-    if model_string in chat_gpt_models:
+    if model_string in local_models or local_provider_enabled():
+        return LocalWrapper()
+    elif model_string in chat_gpt_models:
         return ChatGptWrapper()
     elif model_string in gemini_models:
         return GeminiWrapper()
@@ -17,8 +40,25 @@ def determine_llm_client(model_string: str):
         raise Exception(f"Invalid model! {model_string}")
 
 
+def determine_provider(model: AiModel) -> str:
+    """The name of the provider serving a model, e.g. for its circuit breaker"""
+    if isinstance(model, LocalModel) or local_provider_enabled():
+        return "local"
+    if isinstance(model, GeminiModel):
+        return "gemini"
+    return "open_ai"
+
+
+def find_fallback_model(model: AiModel) -> AiModel | None:
+    if local_provider_enabled():
+        return None
+    return FALLBACK_MODELS.get(model)
+
+
 def find_model_enum_value(model_string: str) -> AiModel:
-    if model_string in chat_gpt_models:
+    if model_string in local_models or local_provider_enabled():
+        return LocalModel.find_enum_value(model_string)
+    elif model_string in chat_gpt_models:
         return ChatGptModel.find_enum_value(model_string)
     elif model_string in gemini_models:
         return GeminiModel.find_enum_value(model_string)
@@ -1,19 +1,28 @@
-import ast
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, Future, TimeoutError as FuturesTimeoutError
 
-from typing import List, Tuple, Any, Dict
+from typing import List, Any, Dict
+from flask import copy_current_request_context
 from flask_socketio import emit
 
 from AiOrchestration.AiModel import AiModel
 from AiOrchestration.AiOrchestrator import AiOrchestrator
-from Constants.Exceptions import FAILURE_TO_REVIEW_RELEVANT_HISTORY
+from Constants.Constants import CONTEXT_GATHERING_TIMEOUTS, HISTORY_SELECTION_TOKEN_BUDGET
+from Constants.Exceptions import context_source_timed_out, failure_to_gather_context, file_not_loaded
 from Data.Configuration import Configuration
+from Data.ConversationMemory import ConversationMemory
+from Data.ConversationSummary import ConversationSummary
 from Data.InternetSearch import InternetSearch
 from Data.Neo4j.NodeDatabaseManagement import NodeDatabaseManagement as nodeDB
 from Data.Files.StorageMethodology import StorageMethodology
 from Data.UserContextManagement import UserContextManagement
-from Constants.Instructions import DEFAULT_BEST_OF_SYSTEM_MESSAGE, DETECT_RELEVANT_HISTORY_SYSTEM_MESSAGE
-from Utilities.Contexts import get_category_context
+from Constants.Instructions import DEFAULT_BEST_OF_SYSTEM_MESSAGE, conversation_summary_message
+from Utilities.Contexts import get_category_context, get_user_context, get_message_context, set_user_context, \
+    set_message_context, set_category_context, set_user_configuration, get_functionality_context, \
+    set_functionality_context
+from Utilities.HistorySelection import format_entry, select_relevant_history
+from Utilities.Tracing import span
 from Utilities.Validation import is_valid_prompt
 from Workflows.ChatWorkflow import ChatWorkflow
 
@@ -24,18 +33,16 @@ class BaseWorker:
 
     :param name: Name of the worker.
 
-    history: Note that history is written first on the left, latest on the right, but OpenAI uses latest on
-    the left, first on the right. Therefore, it must be reversed if submitted to OpenAI API as messages.
+    History is kept per user and category by ConversationMemory, oldest first. Note that OpenAI uses latest on the
+    left, first on the right. Therefore, it must be reversed if submitted to OpenAI API as messages.
     """
 
-    MAX_HISTORY = 5
     WORKFLOWS: Dict[str, Any] = {
         'chat': ChatWorkflow(),
     }
 
     def __init__(self, name: str):
         self.name = name
-        self.history: List[Tuple[str, str]] = []  # question-response pairs
         self.instructions = ""
         self.configuration = ""
 
@@ -132,7 +139,8 @@ class BaseWorker:
         best_of: int = 1,
         loops: int = 1,
         streaming: bool = False,
-        model: AiModel = None
+        model: AiModel = None,
+        file_contents: Dict[str, str] = None
     ) -> str:
         """
         Process and store the user's question.
@@ -144,42 +152,195 @@ class BaseWorker:
         :param loops: Number of sequential re-runs
         :param streaming: Whether to stream the response.
         :param model: The model to use for generating responses.
+        :param file_contents: Content of the referenced files already read by the caller, by file reference
         :return: Generated response.
         """
-        file_content = []
-        for file_reference in file_references:
-            content = StorageMethodology.select().read_file(file_reference)
-            logging.info(f"Extracting file content [{file_reference}]: {content}")
-            file_content.append(content)
-
-        messages = []
-        if selected_message_ids:
-            for message_id in selected_message_ids:
-                message = nodeDB().get_message_by_id(message_id)
-                content = message["prompt"] + " : \n\n" + message["response"]
-                messages.append(content)
-
-        config = Configuration.load_config()
-        if config['response_improvement'].get('internet_search_enabled', False) == 'on':
-            internet_search_results = InternetSearch().search_internet_based_on_prompt(prompt)
-            for search_result in internet_search_results:
-                messages.append(str(search_result))
+        context = self.gather_context(prompt, file_references, selected_message_ids, file_contents=file_contents)
 
+        messages = context["messages"] + [str(search_result) for search_result in context["internet_search"]]
         logging.info(f"Message content: {messages}")
 
-        input_messages = file_content + [prompt]
+        input_messages = context["files"] + [prompt]
         response = self.think(
             input_messages,
             messages,
             best_of=best_of,
             loops=loops,
             streaming=streaming,
-            model=model
+            model=model,
+            context=context
         )
-        self.history.append((prompt, response))
+        if isinstance(response, str):
+            # Streamed responses are remembered by the socket handler, once they've been consumed
+            self.remember(prompt, response)
 
         return response
 
+    @staticmethod
+    def remember(prompt: str, response: str) -> None:
+        """
+        Adds the prompt and its response to the conversation in the current category, once the category is known if
+        it's still being determined, rather than holding up the caller
+        """
+        user_id = get_user_context()
+        category_id = get_category_context(wait=False)
+        if not isinstance(category_id, Future):
+            ConversationMemory().append(user_id, category_id, prompt, response)
+            return
+
+        def append(future: Future) -> None:
+            if future.exception() is None:
+                ConversationMemory().append(user_id, future.result(), prompt, response)
+        category_id.add_done_callback(append)
+
+    def gather_context(
+        self,
+        prompt: str,
+        file_references: List[str] = None,
+        selected_message_ids: List[str] = None,
+        user_messages: List[str] = None,
+        file_contents: Dict[str, str] = None
+    ) -> Dict[str, Any]:
+        """
+        Gathers every source of context for a prompt concurrently, rather than stacking them end to end before the
+        main LLM call.
+
+        Each source has its own timeout (CONTEXT_GATHERING_TIMEOUTS, overridable under optimisation.context_timeouts),
+        a source that fails or times out is logged and left out, the prompt is still answered. User context and
+        relevant history depend on the referenced file content, so they wait on the file reads but run alongside
+        everything else. Without optimisation.message_history the newest entries of the conversation are sent instead
+        (recent_history).
+
+        :param prompt: The user's question.
+        :param file_references: List of file paths referenced for context.
+        :param selected_message_ids: UUIDs of previously selected relevant messages.
+        :param user_messages: The full user messages if already known, otherwise the file content followed by the
+         prompt
+        :param file_contents: Content of the referenced files already read, by file reference. The rest are read in
+         one batch.
+        :return: A dictionary of each source's results, always in the same order regardless of completion order
+        """
+        config = Configuration.load_config()
+        timeouts = {**CONTEXT_GATHERING_TIMEOUTS, **config.get('optimisation', {}).get('context_timeouts', {})}
+        start = time.monotonic()
+
+        user_id = get_user_context()
+        message_id = get_message_context()
+        functionality = get_functionality_context()
+        category_id = get_category_context(wait=False)
+        if isinstance(category_id, Future):
+            # Speculative categorisation, the category system message and history are only waited on when enabled
+            timeouts["category_system_message"] += timeouts["categorisation"]
+            timeouts["relevant_history"] += timeouts["categorisation"]
+            timeouts["recent_history"] += timeouts["categorisation"]
+            timeouts["conversation_summary"] += timeouts["categorisation"]
+
+        def wrapped_source(source, function, *args):
+            set_user_context(user_id)
+            set_message_context(message_id)
+            set_category_context(category_id)
+            set_functionality_context(functionality)
+            set_user_configuration(config)
+
+            with span(f"context.{source}"):
+                return function(*args)
+
+        def resolve(source, future, default):
+            try:
+                remaining = max(0.0, start + timeouts[source] - time.monotonic())
+                return future.result(timeout=remaining)
+            except FuturesTimeoutError:
+                logging.warning(context_source_timed_out(source, timeouts[source]))
+            except Exception:
+                logging.exception(failure_to_gather_context(source))
+            return default
+
+        file_references = file_references or []
+        file_contents = file_contents or {}
+        unread_files = [reference for reference in file_references if reference not in file_contents]
+        sources = {}
+        executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='ContextGathering')
+        try:
+            def submit(source, function, *args):
+                sources[source] = executor.submit(
+                    copy_current_request_context(wrapped_source), source, function, *args
+                )
+
+            if unread_files:
+                submit("files", StorageMethodology.select().read_many, unread_files)
+
+            def file_content() -> List[str]:
+                contents = dict(file_contents)
+                for result in resolve("files", sources["files"], []) if "files" in sources else []:
+                    contents[result.path] = result.value if result.ok else file_not_loaded(result.path)
+                return [contents.get(reference, file_not_loaded(reference)) for reference in file_references]
+
+            def full_user_messages() -> List[str]:
+                return user_messages if user_messages is not None else file_content() + [prompt]
+
+            if selected_message_ids:
+                submit("messages", self._load_selected_messages, selected_message_ids)
+            if config['response_improvement'].get('internet_search_enabled', False) == 'on':
+                submit("internet_search", InternetSearch().search_internet_based_on_prompt, prompt)
+            if config['category'].get('category_system_message', True):
+                submit("category_system_message", lambda: nodeDB().get_category_system_message(get_category_context()))
+            if config['response_improvement']['user_context_enabled']:
+                submit("user_context", lambda: UserContextManagement().search_encyclopedia(full_user_messages()))
+
+            # While the prompt is being categorised the conversation is only read if the category is waited on anyway,
+            # so the response isn't held up for it
+            category_awaited = not isinstance(category_id, Future) or "category_system_message" in sources
+            if config['optimisation']['message_history']:
+                submit("relevant_history", lambda: self.detect_relevant_history(full_user_messages()))
+            elif category_awaited:
+                submit("recent_history", self._recent_history, config)
+            if ConversationSummary.enabled() and category_awaited:
+                # Stands in for the entries folded out of the conversation
+                submit(
+                    "conversation_summary",
+                    lambda: ConversationSummary.current(get_user_context(), get_category_context())[0]
+                )
+
+            files = file_content()
+            for file_reference, content in zip(file_references, files):
+                logging.info(f"Extracting file content [{file_reference}]: {content}")
+
+            return {
+                "files": files,
+                "messages": resolve("messages", sources["messages"], []) if "messages" in sources else [],
+                "internet_search": resolve("internet_search", sources["internet_search"], [])
+                if "internet_search" in sources else [],
+                "category_system_message": resolve("category_system_message", sources["category_system_message"], None)
+                if "category_system_message" in sources else None,
+                "user_context": resolve("user_context", sources["user_context"], None)
+                if "user_context" in sources else None,
+                "relevant_history": resolve("relevant_history", sources["relevant_history"], [])
+                if "relevant_history" in sources else None,
+                "recent_history": resolve("recent_history", sources["recent_history"], [])
+                if "recent_history" in sources else [],
+                "conversation_summary": resolve("conversation_summary", sources["conversation_summary"], None)
+                if "conversation_summary" in sources else None,
+            }
+        finally:
+            # Sources that timed out are abandoned rather than waited on
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def _recent_history(config: Dict[str, Any]) -> List[str]:
+        """The newest entries of the conversation in the current category, within the history token budget"""
+        token_budget = int(config.get('optimisation', {}).get('history_token_budget', HISTORY_SELECTION_TOKEN_BUDGET))
+        return [
+            format_entry(entry)
+            for entry in ConversationMemory().window(get_user_context(), get_category_context(), token_budget)
+        ]
+
+    @staticmethod
+    def _load_selected_messages(selected_message_ids: List[str]) -> List[str]:
+        return [
+            message["prompt"] + " : \n\n" + message["response"]
+            for message in nodeDB().get_messages_by_ids(selected_message_ids) or []
+        ]
+
     def think(
         self,
         user_messages: List[str],
@@ -187,7 +348,8 @@ class BaseWorker:
         best_of: int = 1,
         loops: int = 1,
         streaming: bool = False,
-        model: AiModel = None
+        model: AiModel = None,
+        context: Dict[str, Any] = None
     ) -> str:
         """
         Process the input question and create a response.
@@ -200,30 +362,28 @@ class BaseWorker:
         :param loops: How many 'thoughts' to think before returning a (hopefully) well thought out response
         :param streaming: Whether to stream the response.
         :param model: The AI model used for generating the response.
+        :param context: Context already gathered by gather_context, gathered here if not provided
         :return: Generated response or an error message.
         """
         logging.info("Processing user messages: %s", user_messages)
 
         config = Configuration.load_config()
+        if context is None:
+            context = self.gather_context(user_messages[-1] if user_messages else "", user_messages=user_messages)
 
         system_messages = [self.instructions, self.configuration]
+        if context["category_system_message"]:
+            system_messages.append(context["category_system_message"])
+        if context["user_context"]:
+            system_messages.append(context["user_context"])
 
-        if config['category'].get('category_system_message', True):
-            category_system_message = nodeDB().get_category_system_message(get_category_context())
-            if category_system_message:
-                system_messages.append(category_system_message)
-
-        if config['response_improvement']['user_context_enabled']:
-            user_encyclopedia_manager = UserContextManagement()
-            user_context = user_encyclopedia_manager.search_encyclopedia(user_messages)
-            if user_context:
-                system_messages.append(user_context)
-
-        if config['optimisation']['message_history']:
-            recent_history = self.detect_relevant_history(user_messages)
+        if context["relevant_history"] is not None:
+            recent_history = list(context["relevant_history"])
         else:
-            recent_history = [f"{entry[0]}: {entry[1]}" for entry in self.history[-self.MAX_HISTORY:]]
-        recent_history.extend(history_messages)
+            recent_history = list(context["recent_history"])
+        if context["conversation_summary"]:
+            recent_history.insert(0, conversation_summary_message(context["conversation_summary"]))
+        recent_history.extend(history_messages or [])
 
         best_of_system_message = config['system_messages'].get(
             "best_of_message",
@@ -254,7 +414,8 @@ class BaseWorker:
         """
         ⚠ WIP
 
-        Automatically determine which prompt-response pairs are relevant for the current context.
+        Automatically determine which prompt-response pairs are relevant for the current context, with the selector set
+        under optimisation.history_selector (see Utilities/HistorySelection.py).
 
         ToDo: latter this project would probably be better suited extracting 'concepts' from prompts, these concepts
          would be keywords that can then relate *back* to the knowledge base, user knowledge, history, configuration,
@@ -263,25 +424,5 @@ class BaseWorker:
         :param user_messages: List of messages inputted by the user.
         :return: Relevant history entries.
         """
-        numbered_prompts = "Prompt History: " + "\n".join(
-            [f"{idx}: {entry[0]}" for idx, entry in enumerate(self.history)]
-        )
-
-        executor = AiOrchestrator()
-        relevant_history_list = executor.execute(
-            [DETECT_RELEVANT_HISTORY_SYSTEM_MESSAGE,
-             numbered_prompts],
-            user_messages
-        )
-        logging.info(f"Relevant messages detected in history: {relevant_history_list}")
-
-        relevant_history = []
-        try:
-            relevant_history_list = ast.literal_eval(relevant_history_list)
-            if relevant_history_list:
-                for id in relevant_history_list:
-                    relevant_history.append(str(self.history[int(id)]))
-        except Exception:
-            logging.exception(FAILURE_TO_REVIEW_RELEVANT_HISTORY)
-
-        return relevant_history
+        history = ConversationMemory().entries(get_user_context(), get_category_context())
+        return [format_entry(history[index]) for index in select_relevant_history(history, user_messages)]
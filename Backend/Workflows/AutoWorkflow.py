@@ -71,13 +71,17 @@ class AutoWorkflow(BaseWorkflow):
             logging.warning("No file references provided. Exiting AutoWorkflow.")
             return "No files to process."
 
+        file_contents = self._read_files(file_references)
+
         if self.USE_PARALLEL_PROCESSING:
             self._execute_parallel(
-                process_prompt, initial_message, file_references, selected_message_ids, best_of, loops, model
+                process_prompt, initial_message, file_references, selected_message_ids, best_of, loops, model,
+                file_contents
             )
         else:
             self._execute_sequential(
-                process_prompt, initial_message, file_references, selected_message_ids, best_of, loops, model
+                process_prompt, initial_message, file_references, selected_message_ids, best_of, loops, model,
+                file_contents
             )
 
         summary = self._summary_step(
@@ -87,10 +91,20 @@ class AutoWorkflow(BaseWorkflow):
             file_references=file_references,
             selected_message_ids=[],
             streaming=True,
+            file_contents=file_contents,
         )
 
         return summary
 
+    @staticmethod
+    def _read_files(file_references: List[str]) -> Dict[str, str]:
+        """
+        Reads every file in one batch before the steps start, rather than each step and the summary reading their own.
+        Files that fail to load are left out, the steps read them again themselves.
+        """
+        results = StorageMethodology.select().read_many(file_references)
+        return {result.path: result.value for result in results if result.ok}
+
     def _execute_parallel(
         self,
         process_prompt: Callable[[str, List[str], Dict[str, str]], str],
@@ -100,6 +114,7 @@ class AutoWorkflow(BaseWorkflow):
         best_of: int,
         loops: int,
         model: AiModel,
+        file_contents: Dict[str, str] = None,
     ):
         """
         Executes the workflow steps in parallel.
@@ -110,6 +125,7 @@ class AutoWorkflow(BaseWorkflow):
         :param selected_message_ids: List of selected message IDs for context.
         :param best_of: Number indicating how many completions to generate server-side.
         :param model: The model to use for AI interactions.
+        :param file_contents: Content of the files already read, by file reference.
         :return: Aggregated summary of all processing results.
         """
         message_id = get_message_context()
@@ -136,7 +152,8 @@ class AutoWorkflow(BaseWorkflow):
                 best_of,
                 loops,
                 model,
-                iteration_id
+                iteration_id,
+                file_contents
             )
 
         with ThreadPoolExecutor(max_workers=len(file_references)) as executor:
@@ -169,6 +186,7 @@ class AutoWorkflow(BaseWorkflow):
         best_of: int,
         loops: int,
         model: AiModel,
+        file_contents: Dict[str, str] = None,
     ):
         """
         Executes the workflow steps sequentially.
@@ -179,6 +197,7 @@ class AutoWorkflow(BaseWorkflow):
         :param selected_message_ids: List of selected message IDs for context.
         :param best_of: Number indicating how many completions to generate server-side.
         :param model: The model to use for AI interactions.
+        :param file_contents: Content of the files already read, by file reference.
         :return: Aggregated summary of all processing results.
         """
         results = []
@@ -197,7 +216,8 @@ class AutoWorkflow(BaseWorkflow):
                 best_of=best_of,
                 loops=loops,
                 model=model,
-                overwrite=True
+                overwrite=True,
+                file_contents=file_contents
             )
             results.append(f"Iteration {iteration_id} for '{file_reference}': {response}")
             logging.debug(f"Response for iteration {iteration_id} on '{file_reference}': {response}")
@@ -211,7 +231,8 @@ class AutoWorkflow(BaseWorkflow):
         best_of: int,
         loops: int,
         model: AiModel,
-        iteration_id: int
+        iteration_id: int,
+        file_contents: Dict[str, str] = None
     ) -> (int, str):
         """
         Helper method to process a single file in the workflow with a unique iteration ID.
@@ -223,6 +244,7 @@ class AutoWorkflow(BaseWorkflow):
         :param best_of: Number indicating how many completions to generate server-side.
         :param model: The model to use for AI interactions.
         :param iteration_id: Unique iteration ID for the processing step.
+        :param file_contents: Content of the files already read, by file reference.
         :return: A tuple of iteration_id and the AI's response.
         """
         file_name = StorageMethodology().extract_file_name(file_reference)
@@ -236,6 +258,7 @@ class AutoWorkflow(BaseWorkflow):
             best_of=best_of,
             loops=loops,
             model=model,
-            overwrite=True
+            overwrite=True,
+            file_contents=file_contents
         )
         return iteration_id, response
@@ -1,6 +1,6 @@
 import logging
 from abc import abstractmethod
-from typing import Callable, Any, List
+from typing import Callable, Any, List, Dict
 
 from flask_socketio import emit
 
@@ -83,6 +83,7 @@ class BaseWorkflow:
         loops: int = 1,
         streaming: bool = True,
         model: AiModel = None,
+        file_contents: Dict[str, str] = None,
     ) -> str:
         """
         Summarises the results of a workflow.
@@ -98,6 +99,7 @@ class BaseWorkflow:
         :param best_of: how many times to run the prompt and filter for best prompt
         :param streaming: Whether to stream the response.
         :param model: The AI model to use.
+        :param file_contents: Content of the referenced files if already read, by file reference
         :return: AI's response.
         """
         set_functionality_context("summarise_workflows")
@@ -123,6 +125,7 @@ class BaseWorkflow:
             loops=loops,
             streaming=streaming,
             model=model,
+            file_contents=file_contents,
         )
 
         logging.info(f"Summary Step {iteration}: process_prompt returned: {output}")
@@ -142,6 +145,7 @@ class BaseWorkflow:
         loops: int = 1,
         model: AiModel = ChatGptModel.CHAT_GPT_4_POINT_ONE_NANO,
         overwrite: bool = True,
+        file_contents: Dict[str, str] = None,
     ) -> str:
         """
         Handles the process of saving files to the selected category.
@@ -155,6 +159,7 @@ class BaseWorkflow:
         :param file_name: Name of the file to save including extension
         :param model: The AI model to use.
         :param overwrite: Whether or not any existing files should be overwrote
+        :param file_contents: Content of the referenced files if already read, by file reference
         :return: AI's response.
         """
 
@@ -191,6 +196,7 @@ class BaseWorkflow:
             best_of=best_of,
             loops=loops,
             model=model,
+            file_contents=file_contents,
         )
 
         response = remove_enclosing_fenced_code_block(response)
@@ -3,6 +3,17 @@
 export const FLASK_PORT = process.env.REACT_APP_THE_THINKER_BACKEND_URL || "http://localhost:5000";
 
 
+/**
+ * Query string for a paged listing, parameters that aren't set are left out.
+ */
+function pageQuery(parameters) {
+  const query = new URLSearchParams(
+    Object.entries(parameters).filter(([, value]) => value != null)
+  ).toString();
+  return query ? `?${query}` : '';
+}
+
+
 /* Auth */
 
 export const loginEndpoint = `${FLASK_PORT}/auth/login`;
@@ -33,8 +44,12 @@ export function fileIdEndpoint(uuid) {
   return `${FLASK_PORT}/file/${uuid}`
 }
 
-export function filesForCategoryNameEndpoint(categoryName) {
-  return `${FLASK_PORT}/files/category/${categoryName.toLowerCase()}`
+/**
+ * @param {string} categoryName - The category to list the files of.
+ * @param {string|null} cursor - The next_cursor of the previous page, null for the first page.
+ */
+export function filesForCategoryNameEndpoint(categoryName, cursor = null) {
+  return `${FLASK_PORT}/files/category/${categoryName.toLowerCase()}${pageQuery({ cursor })}`
 }
 
 export function fileAddressEndpoint(categoryId, fileName) {
@@ -51,8 +66,15 @@ export const userConfigEndpoint = `${FLASK_PORT}/info/config`;
 export function deleteMessageByIdEndpoint(messageId) {
   return `${FLASK_PORT}/messages/${messageId}`;
 }
-export function messagesForCategoryEndpoint(categoryName) {
-  return `${FLASK_PORT}/messages/${categoryName}`;
+/**
+ * @param {string} categoryName - The category to list the messages of.
+ * @param {object} page - cursor: the next_cursor of the previous page, view: "summary" for previews of each message.
+ */
+export function messagesForCategoryEndpoint(categoryName, { cursor = null, view = null } = {}) {
+  return `${FLASK_PORT}/messages/${categoryName}${pageQuery({ cursor, view })}`;
+}
+export function messageByIdEndpoint(messageId) {
+  return `${FLASK_PORT}/messages/message/${messageId}`;
 }
 
 /* Pricing */
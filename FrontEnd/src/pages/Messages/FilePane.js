@@ -26,6 +26,7 @@ const FilePane = ({ onFileSelect, isProcessing, selectedFiles, removeFile, refre
   const [expandedCategoryId, setExpandedCategoryId] = useState(null);
   const [fetchError, setFetchError] = useState('');
   const [loadingFiles, setLoadingFiles] = useState({});
+  const [nextCursors, setNextCursors] = useState({});
   const categoryListRef = useRef(null);
 
   const [itemsPerRow] = useCalculateItemsPerRow(categoryListRef, '.category-item');
@@ -54,13 +55,15 @@ const FilePane = ({ onFileSelect, isProcessing, selectedFiles, removeFile, refre
     }
   }, []);
 
-  // Fetch files for a given category – store in filesByCategory state.
-  const fetchFilesByCategory = useCallback(async (categoryName, categoryId) => {
-    setLoadingFiles(prev => ({ ...prev, [categoryId]: true }));
+  // Fetch a page of files for a given category – store in filesByCategory state, appended if a cursor is given.
+  const fetchFilesByCategory = useCallback(async (categoryName, categoryId, cursor = null) => {
+    if (!cursor) {
+      setLoadingFiles(prev => ({ ...prev, [categoryId]: true }));
+    }
 
     setFetchError('');
     try {
-      const response = await apiFetch(filesForCategoryNameEndpoint(categoryName.toLowerCase()), {
+      const response = await apiFetch(filesForCategoryNameEndpoint(categoryName.toLowerCase(), cursor), {
         method: "GET",
       });
 
@@ -69,7 +72,11 @@ const FilePane = ({ onFileSelect, isProcessing, selectedFiles, removeFile, refre
       }
 
       const data = await response.json();
-      setFilesByCategory(prev => ({ ...prev, [categoryId]: data.files }));
+      setFilesByCategory(prev => ({
+        ...prev,
+        [categoryId]: cursor ? [...(prev[categoryId] || []), ...data.files] : data.files
+      }));
+      setNextCursors(prev => ({ ...prev, [categoryId]: data.next_cursor }));
     } catch (error) {
       console.error("Error fetching files:", error);
       setFetchError(`Unable to load files for ${categoryName}. Please try again later.`);
@@ -182,6 +189,15 @@ const FilePane = ({ onFileSelect, isProcessing, selectedFiles, removeFile, refre
                         <p>No files available in this category.</p>
                       )
                     )}
+                    {!loadingFiles[category.id] && nextCursors[category.id] && (
+                      <button
+                        className="button"
+                        type="button"
+                        onClick={() => fetchFilesByCategory(category.name, category.id, nextCursors[category.id])}
+                      >
+                        Load more
+                      </button>
+                    )}
                   </div>
                 )}
               </div>
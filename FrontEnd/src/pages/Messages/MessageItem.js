@@ -1,10 +1,10 @@
-import React, { useState, useCallback } from 'react';
+import React, { useState, useCallback, useEffect } from 'react';
 import PropTypes from 'prop-types';
 
 import { shortenText, CodeHighlighter } from '../../utils/textUtils';
 import { formatPrice } from '../../utils/numberUtils';
 import { apiFetch } from '../../utils/authUtils';
-import { deleteMessageByIdEndpoint } from '../../constants/endpoints';
+import { deleteMessageByIdEndpoint, messageByIdEndpoint } from '../../constants/endpoints';
 
 /**
  * MessageItem Component
@@ -17,6 +17,7 @@ import { deleteMessageByIdEndpoint } from '../../constants/endpoints';
  * @param {string} [msg.response] - The response text (optional).
  * @param {number} msg.time - Timestamp of the message creation (Unix epoch).
  * @param {number} [msg.cost] - Cost associated with the message (optional).
+ * @param {boolean} [msg.truncated] - Whether the prompt and response are previews, the full message is fetched on expansion.
  * @param {Function} onDelete - Callback function invoked with message ID upon successful deletion.
  * @param {Function} onSelect - Callback function invoked with the message object when selected.
  * @param {boolean} isSelected - Flag indicating if the message item is currently selected.
@@ -25,6 +26,30 @@ const MessageItem = ({ msg, onDelete, onSelect, isSelected }) => {
     const [isExpanded, setIsExpanded] = useState(false);
     const [isDeleting, setIsDeleting] = useState(false);
     const [error, setError] = useState(null);
+    const [fullMessage, setFullMessage] = useState(null);
+
+    const displayed = fullMessage || msg;
+
+    /**
+     * Fetches the full prompt and response of a message listed as a preview.
+     */
+    const fetchFullMessage = useCallback(async () => {
+        try {
+            const response = await apiFetch(messageByIdEndpoint(msg.id), {
+                method: 'GET',
+            });
+
+            if (!response.ok) {
+                throw new Error("Failed to fetch the message.");
+            }
+
+            const data = await response.json();
+            setFullMessage({ ...msg, ...data.message, truncated: false });
+        } catch (err) {
+            console.error("Error fetching the message:", err);
+            setError("Unable to load the full message. Please try again.");
+        }
+    }, [msg]);
 
     /**
      * Toggles the expansion state of the message item.
@@ -33,6 +58,12 @@ const MessageItem = ({ msg, onDelete, onSelect, isSelected }) => {
         setIsExpanded(prev => !prev);
     }, []);
 
+    useEffect(() => {
+        if (isExpanded && msg.truncated && !fullMessage) {
+            fetchFullMessage();
+        }
+    }, [isExpanded, msg.truncated, fullMessage, fetchFullMessage]);
+
     /**
      * Handles the click event on the message header to toggle expansion,
      * preventing the event from bubbling up to the main selection handler.
@@ -121,10 +152,10 @@ const MessageItem = ({ msg, onDelete, onSelect, isSelected }) => {
                 >
                 {isExpanded ? (
                     <CodeHighlighter>
-                        {msg.prompt}
+                        {displayed.prompt}
                     </CodeHighlighter>
                 ) : (
-                    shortenText(msg.prompt, 100)
+                    shortenText(displayed.prompt, 100)
                 )}
             </div>
             {(isSelected || isExpanded) && 
@@ -149,7 +180,7 @@ const MessageItem = ({ msg, onDelete, onSelect, isSelected }) => {
                     </p>
                     <div className="markdown-output">
                         <CodeHighlighter>
-                            {msg.response || 'No Content.'}
+                            {displayed.response || 'No Content.'}
                         </CodeHighlighter>
                     </div>
                 </div>
@@ -177,6 +208,7 @@ MessageItem.propTypes = {
         prompt: PropTypes.string.isRequired,
         response: PropTypes.string,
         time: PropTypes.number.isRequired,
+        truncated: PropTypes.bool,
     }).isRequired,
     onSelect: PropTypes.func.isRequired,
     onDelete: PropTypes.func.isRequired,
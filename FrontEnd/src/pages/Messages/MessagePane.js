@@ -78,12 +78,14 @@ const MessagePane = ({ isProcessing, onMessageSelect, selectedMessages, removeMe
   }, []);
 
   /**
-   * Fetches messages for a specific category from the backend API.
+   * Fetches a page of message previews for a specific category from the backend API.
+   * Full messages are fetched by MessageItem when expanded.
    *
    * @param {string} categoryName - The name of the category.
    * @param {number} categoryId - The ID of the category.
+   * @param {string|null} cursor - The cursor of the page to append, null to (re)load the first page.
    */
-  const fetchMessagesByCategory = useCallback(async (categoryName, categoryId) => {
+  const fetchMessagesByCategory = useCallback(async (categoryName, categoryId, cursor = null) => {
     const targetCategory = categories.find(cat => cat.id === categoryId);
 
     // Avoid fetching if messages are already loaded and not forcing a refresh
@@ -93,7 +95,7 @@ const MessagePane = ({ isProcessing, onMessageSelect, selectedMessages, removeMe
 
     setError('');
     try {
-      const response = await apiFetch(messagesForCategoryEndpoint(categoryName.toLowerCase()), {
+      const response = await apiFetch(messagesForCategoryEndpoint(categoryName.toLowerCase(), { cursor, view: "summary" }), {
         method: "GET",
       });
 
@@ -106,7 +108,11 @@ const MessagePane = ({ isProcessing, onMessageSelect, selectedMessages, removeMe
       setCategories(prevCategories =>
         prevCategories.map(category =>
           category.name.toLowerCase() === categoryName.toLowerCase()
-            ? { ...category, messages: data.messages }
+            ? {
+                ...category,
+                messages: cursor ? [...(category.messages || []), ...data.messages] : data.messages,
+                nextCursor: data.next_cursor,
+              }
             : category
         )
       );
@@ -275,6 +281,15 @@ const MessagePane = ({ isProcessing, onMessageSelect, selectedMessages, removeMe
                         />
                       ))
                     )}
+                    {category.nextCursor && (
+                      <button
+                        className="button"
+                        type="button"
+                        onClick={() => fetchMessagesByCategory(category.name, category.id, category.nextCursor)}
+                      >
+                        Load more
+                      </button>
+                    )}
                   </div>
                 )}
               </div>